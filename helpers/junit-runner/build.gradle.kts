@@ -20,6 +20,13 @@ tasks.test {
     useJUnitPlatform()
 }
 
+// The jar doubles as the UnhandledExceptionReporterAgent java agent
+tasks.jar {
+    manifest {
+        attributes["Premain-Class"] = "org.pastalab.fray.helpers.UnhandledExceptionReporterAgent"
+    }
+}
+
 
 tasks.named("build") {
   finalizedBy("copyDependencies")
@@ -0,0 +1,172 @@
+package org.pastalab.fray.helpers;
+
+import java.io.FileWriter;
+import java.io.IOException;
+import java.io.Writer;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.Paths;
+import java.util.Map;
+
+/**
+ * Writes machine-readable failure records as JSON lines.
+ *
+ * The record file is given by the {@code concurrency_bench.failure_report} system property
+ * (usually a file in the Fray output directory). If the property is not set, nothing is written.
+ */
+public class FailureReport {
+    public static final String REPORT_PROPERTY = "concurrency_bench.failure_report";
+    public static final String ITERATION_PROPERTY = "concurrency_bench.iteration";
+
+    /**
+     * Advance the iteration counter. System properties survive class loader resets between
+     * Fray iterations, so the counter is kept there rather than in a static field.
+     */
+    public static int nextIteration() {
+        int iteration = Integer.getInteger(ITERATION_PROPERTY, 0) + 1;
+        System.setProperty(ITERATION_PROPERTY, Integer.toString(iteration));
+        return iteration;
+    }
+
+    /**
+     * Append a failure record.
+     *
+     * The thread that threw comes first, with the frames of the error; every other live
+     * application thread follows with its frames at the time of the failure, so the record
+     * shows what the other threads were doing when the bug surfaced.
+     *
+     * @param source What detected the failure ("junit4", "junit5", "uncaught").
+     * @param test The failing test, or null.
+     * @param thread The thread the error was thrown on.
+     * @param error The error.
+     */
+    public static synchronized void write(String source, String test, Thread thread, Throwable error) {
+        String reportPath = System.getProperty(REPORT_PROPERTY);
+        if (reportPath == null || reportPath.isEmpty()) {
+            return;
+        }
+        StringBuilder json = new StringBuilder();
+        json.append("{\"source\":").append(quote(source));
+        json.append(",\"iteration\":").append(Integer.getInteger(ITERATION_PROPERTY, 0));
+        json.append(",\"test\":").append(quote(test));
+        json.append(",\"exception_type\":").append(quote(error.getClass().getName()));
+        json.append(",\"message\":").append(quote(error.getMessage()));
+        json.append(",\"threads\":[");
+        json.append(threadJson(thread, true, error.getStackTrace()));
+        for (Map.Entry<Thread, StackTraceElement[]> entry : Thread.getAllStackTraces().entrySet()) {
+            Thread other = entry.getKey();
+            if (other == thread || entry.getValue().length == 0 || isSystemThread(other)) {
+                continue;
+            }
+            json.append(",").append(threadJson(other, false, entry.getValue()));
+        }
+        json.append("]");
+        json.append(",\"causes\":[");
+        Throwable cause = error.getCause();
+        boolean first = true;
+        while (cause != null && cause != error) {
+            if (!first) {
+                json.append(",");
+            }
+            json.append("{\"exception_type\":").append(quote(cause.getClass().getName()));
+            json.append(",\"message\":").append(quote(cause.getMessage()));
+            json.append(",\"frames\":").append(frames(cause.getStackTrace())).append("}");
+            first = false;
+            error = cause;
+            cause = cause.getCause();
+        }
+        json.append("]}\n");
+
+        try {
+            Path path = Paths.get(reportPath);
+            if (path.getParent() != null) {
+                Files.createDirectories(path.getParent());
+            }
+            try (Writer writer = new FileWriter(path.toFile(), StandardCharsets.UTF_8, true)) {
+                writer.write(json.toString());
+            }
+        } catch (IOException e) {
+            System.err.println("Failed to write failure report: " + e);
+        }
+    }
+
+    /**
+     * Record uncaught exceptions of all threads, then hand them to the handler that was
+     * installed before (or report them the way the JVM does by default).
+     */
+    public static void installUncaughtExceptionHandler() {
+        Thread.UncaughtExceptionHandler previous = Thread.getDefaultUncaughtExceptionHandler();
+        // Installed by an earlier Fray iteration, whose class loader has since been replaced
+        if (previous != null && previous.getClass().getName().equals(UncaughtRecorder.class.getName())) {
+            return;
+        }
+        Thread.setDefaultUncaughtExceptionHandler(new UncaughtRecorder(previous));
+    }
+
+    static class UncaughtRecorder implements Thread.UncaughtExceptionHandler {
+        private final Thread.UncaughtExceptionHandler delegate;
+
+        UncaughtRecorder(Thread.UncaughtExceptionHandler delegate) {
+            this.delegate = delegate;
+        }
+
+        @Override
+        public void uncaughtException(Thread thread, Throwable error) {
+            write("uncaught", null, thread, error);
+            if (delegate != null) {
+                delegate.uncaughtException(thread, error);
+            } else {
+                System.err.print("Exception in thread \"" + thread.getName() + "\" ");
+                error.printStackTrace(System.err);
+            }
+        }
+    }
+
+    private static String threadJson(Thread thread, boolean failing, StackTraceElement[] elements) {
+        return "{\"name\":" + quote(thread.getName())
+                + ",\"state\":" + quote(thread.getState().name())
+                + ",\"failing\":" + failing
+                + ",\"frames\":" + frames(elements) + "}";
+    }
+
+    /** JVM housekeeping threads (Reference Handler, Finalizer, Signal Dispatcher, ...). */
+    private static boolean isSystemThread(Thread thread) {
+        ThreadGroup group = thread.getThreadGroup();
+        return group != null && group.getParent() == null;
+    }
+
+    private static String frames(StackTraceElement[] elements) {
+        StringBuilder json = new StringBuilder("[");
+        for (int i = 0; i < elements.length; i++) {
+            if (i > 0) {
+                json.append(",");
+            }
+            json.append(quote(elements[i].toString()));
+        }
+        return json.append("]").toString();
+    }
+
+    private static String quote(String value) {
+        if (value == null) {
+            return "null";
+        }
+        StringBuilder json = new StringBuilder("\"");
+        for (char c : value.toCharArray()) {
+            switch (c) {
+                case '"': json.append("\\\""); break;
+                case '\\': json.append("\\\\"); break;
+                case '\n': json.append("\\n"); break;
+                case '\r': json.append("\\r"); break;
+                case '\t': json.append("\\t"); break;
+                default:
+                    if (c < 0x20) {
+                        json.append(String.format("\\u%04x", (int) c));
+                    } else {
+                        json.append(c);
+                    }
+            }
+        }
+        return json.append("\"").toString();
+    }
+}
@@ -7,6 +7,7 @@ import java.lang.reflect.Method;
 import org.junit.platform.engine.discovery.DiscoverySelectors;
 import org.junit.platform.launcher.Launcher;
 import org.junit.platform.launcher.LauncherDiscoveryRequest;
+import org.junit.platform.engine.TestExecutionResult;
 import org.junit.platform.launcher.TestExecutionListener;
 import org.junit.platform.launcher.TestIdentifier;
 import org.junit.platform.launcher.TestPlan;
@@ -18,6 +19,7 @@ import org.junit.runner.JUnitCore;
 import org.junit.runner.Request;
 import org.junit.runner.manipulation.Filter;
 import org.junit.runner.notification.Failure;
+import org.junit.runner.notification.RunListener;
 import org.junit.runner.Result;
 
 public class JUnitRunner {
@@ -39,10 +41,29 @@ public class JUnitRunner {
         public void executionSkipped(TestIdentifier testIdentifier, String reason) {
             TestExecutionListener.super.executionSkipped(testIdentifier, reason);
         }
+
+        // Called on the thread that ran the test, while the other threads are still live
+        @Override
+        public void executionFinished(TestIdentifier testIdentifier, TestExecutionResult result) {
+            if (testIdentifier.isTest() && result.getStatus() == TestExecutionResult.Status.FAILED) {
+                result.getThrowable().ifPresent(error -> FailureReport.write(
+                        "junit5", testIdentifier.getDisplayName(), Thread.currentThread(), error));
+            }
+        }
+    }
+
+    public static class Junit4Listener extends RunListener {
+        // Called on the thread that ran the test, while the other threads are still live
+        @Override
+        public void testFailure(Failure failure) {
+            FailureReport.write("junit4", failure.getTestHeader(), Thread.currentThread(), failure.getException());
+        }
     }
 
 
     public static void main(String[] args) throws ClassNotFoundException {
+        FailureReport.nextIteration();
+        FailureReport.installUncaughtExceptionHandler();
         boolean isJunit4 = args[0].equals("junit4");
         String[] classAndMethod = args[1].split("#");
         boolean systemExit = false;
@@ -72,7 +93,9 @@ public class JUnitRunner {
                 }
             });
 
-            Result result = new JUnitCore().run(request);
+            JUnitCore core = new JUnitCore();
+            core.addListener(new Junit4Listener());
+            Result result = core.run(request);
             if (!result.wasSuccessful()) {
                 StringBuilder failureReport = new StringBuilder();
                 for (Failure failure : result.getFailures()) {
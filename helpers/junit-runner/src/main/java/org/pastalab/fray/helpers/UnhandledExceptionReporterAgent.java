@@ -1,11 +1,23 @@
+package org.pastalab.fray.helpers;
+
 import java.lang.instrument.Instrumentation;
 
+/**
+ * Java agent that reports uncaught exceptions and exits.
+ *
+ * The agent argument, if given, is the failure record file (see {@link FailureReport}):
+ * {@code -javaagent:junit-runner.jar=/path/to/failures.jsonl}.
+ */
 public class UnhandledExceptionReporterAgent {
     public static void premain(String agentArgs, Instrumentation inst) {
+        if (agentArgs != null && !agentArgs.isEmpty()) {
+            System.setProperty(FailureReport.REPORT_PROPERTY, agentArgs);
+        }
         Thread.setDefaultUncaughtExceptionHandler(new Thread.UncaughtExceptionHandler() {
             @Override
             public void uncaughtException(Thread t, Throwable e) {
                 System.err.println("Assertion failed: " + e.getMessage());
+                FailureReport.write("uncaught", null, t, e);
                 System.exit(-1);
             }
         });
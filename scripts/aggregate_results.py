@@ -2,14 +2,27 @@
 """
 Aggregate benchmark results from all trace files.
 Creates a summary JSON file with per-model and per-category statistics.
-Averages results over 5 repetitions per model+config combination.
+Averages results over the repetitions of each model+config combination;
+pass@k uses the unbiased estimator with bootstrap confidence intervals
+over tasks (see concurrency_bench/pass_at_k.py).
 """
 
 import json
+import math
 from pathlib import Path
 from collections import defaultdict
 from datetime import datetime, timezone
 
+import numpy as np
+
+from concurrency_bench.pass_at_k import bootstrap_ci, pass_at_k
+from concurrency_bench.trace_analysis import (
+    analyze_events,
+    histogram,
+    load_trace_events,
+    summarize_analysis,
+)
+
 
 def get_friendly_name(model_id):
     """Convert model ID to friendly name."""
@@ -38,6 +51,100 @@ def load_canonical_tasks(tasks_file: Path):
     return tasks
 
 
+# k values reported as pass@k (unbiased estimator, needs at least k reps)
+PASS_K = (1, 5)
+
+# Cost/latency of a fix, reported per successful run
+EFFICIENCY_METRICS = ('wall_seconds', 'steps', 'tokens', 'rerun_fray')
+
+
+def percentile(values, q):
+    """Percentile with linear interpolation between closest ranks (q in 0..100)."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def run_efficiency(trace, profile):
+    """Agent wall time, steps, tokens and Fray reruns of one run."""
+    # Prefer the measured agent span; older results only have event timestamps
+    wall_seconds = next(
+        (s['wall_seconds'] for s in trace.get('timings', []) if s.get('name') == 'agent'),
+        profile['wall_seconds'],
+    )
+    usage = trace.get('token_usage') or {}
+    if usage:
+        tokens = usage.get('prompt_tokens', 0) + usage.get('completion_tokens', 0)
+    elif profile['input_tokens'] is not None:
+        tokens = profile['input_tokens'] + (profile['output_tokens'] or 0)
+    else:
+        tokens = None
+    return {
+        'wall_seconds': wall_seconds,
+        'steps': profile['llm_calls'],
+        'tokens': tokens,
+        'rerun_fray': profile['tool_calls'].get('rerun_fray', 0),
+    }
+
+
+def efficiency_stats(runs):
+    """Median and p90 of each efficiency metric over successful runs."""
+    stats = {'fixes': len(runs)}
+    for metric in EFFICIENCY_METRICS:
+        values = [r[metric] for r in runs if r[metric] is not None]
+        stats[metric] = {
+            'median': percentile(values, 50),
+            'p90': percentile(values, 90),
+        }
+    return stats
+
+
+def pass_at_k_summary(num_reps, solved, task_mask):
+    """Pass@k in percent with a 95% bootstrap CI, per model, over the masked tasks.
+
+    Args:
+        num_reps: Reps per model (models,).
+        solved: Successful reps per model and task (models x tasks).
+        task_mask: Tasks to include (tasks,).
+
+    Returns:
+        list: Per model, {str(k): {'estimate', 'ci_low', 'ci_high'}} for
+        every k the model has enough reps for.
+    """
+    summary = [{} for _ in num_reps]
+    if not task_mask.any():
+        return summary
+    for k in PASS_K:
+        valid = num_reps >= k
+        if not valid.any():
+            continue
+        per_task = pass_at_k(num_reps[valid, None], solved[valid][:, task_mask], k)
+        mean, low, high = bootstrap_ci(per_task)
+        for m, estimate, ci_low, ci_high in zip(np.flatnonzero(valid), mean, low, high):
+            summary[m][str(k)] = {
+                'estimate': float(estimate * 100),
+                'ci_low': float(ci_low * 100),
+                'ci_high': float(ci_high * 100),
+            }
+    return summary
+
+
+def profile_histograms(steps):
+    """Histogram-ready step timings of one model+config (see trace_analysis.py)."""
+    return {
+        'llm_calls': len(steps['llm_latency']),
+        'llm_latency_histogram': histogram(steps['llm_latency']),
+        'tool_calls': {tool: len(seconds) for tool, seconds in steps['tools'].items()},
+        'tool_seconds_histogram': {
+            tool: histogram(seconds) for tool, seconds in sorted(steps['tools'].items())
+        },
+        'idle_gap_histogram': histogram(steps['idle_gaps']),
+    }
+
+
 def aggregate_results(results_dir: Path, output_file: Path, tasks_file: Path):
     """Aggregate all trace results into a summary JSON file."""
 
@@ -62,6 +169,14 @@ def aggregate_results(results_dir: Path, output_file: Path, tasks_file: Path):
     # Track which (model_id, config) combos exist and their repetition counts
     model_config_reps = defaultdict(set)  # key -> set of rep IDs
 
+    # Step timings from the events, for histograms per model+config
+    # Key: (model_id, config) -> {"llm_latency": [...], "tools": {tool: [...]}, "idle_gaps": [...]}
+    model_config_steps = defaultdict(lambda: {
+        'llm_latency': [],
+        'tools': defaultdict(list),
+        'idle_gaps': [],
+    })
+
     # Scan all JSON files
     json_files = list(results_dir.rglob("*.json"))
     print(f"Found {len(json_files)} trace files")
@@ -95,6 +210,15 @@ def aggregate_results(results_dir: Path, output_file: Path, tasks_file: Path):
             # Relative path from results dir
             rel_path = json_file.relative_to(results_dir)
 
+            # Where the run's time and tokens went
+            analysis = analyze_events(load_trace_events(json_file, trace))
+            steps = model_config_steps[(model_id, config)]
+            steps['llm_latency'].extend(c['latency_seconds'] for c in analysis['llm_calls'])
+            for call in analysis['tool_calls']:
+                steps['tools'][call['tool']].append(call['seconds'])
+            steps['idle_gaps'].extend(g['seconds'] for g in analysis['idle_gaps'])
+            profile = summarize_analysis(analysis)
+
             # Store result by model+config+instance+rep
             key = (model_id, config)
             instance_results[key][instance_id][rep_id] = success
@@ -110,20 +234,45 @@ def aggregate_results(results_dir: Path, output_file: Path, tasks_file: Path):
                 'path': str(rel_path),
                 'success': success,
                 'category': category,
-                'task_type': task_type
+                'task_type': task_type,
+                'profile': profile,
+                'efficiency': run_efficiency(trace, profile),
             })
 
         except Exception as e:
             print(f"Error processing {json_file}: {e}")
             continue
 
-    # Now compute averaged statistics for each model+config combination
+    # Dense success array: models+configs x canonical tasks x reps. Runs
+    # that are missing count as failures.
+    keys = list(instance_results)
+    task_ids = list(canonical_tasks)
+    task_index = {task_id: i for i, task_id in enumerate(task_ids)}
+    rep_ids_by_key = {key: sorted(model_config_reps[key]) for key in keys}
+    num_reps = np.array([len(rep_ids_by_key[key]) for key in keys], dtype=int)
+    successes = np.zeros((len(keys), len(task_ids), num_reps.max(initial=0)), dtype=bool)
+    for m, key in enumerate(keys):
+        rep_index = {rep_id: r for r, rep_id in enumerate(rep_ids_by_key[key])}
+        for instance_id, reps in instance_results[key].items():
+            if instance_id not in task_index:
+                continue
+            for rep_id, success in reps.items():
+                successes[m, task_index[instance_id], rep_index[rep_id]] = bool(success)
+    solved = successes.sum(axis=2)  # successful reps per model x task
+    categories = np.array([task_category[task_id] for task_id in task_ids])
+    all_tasks = np.ones(len(task_ids), dtype=bool)
+
+    overall_pass_at_k = pass_at_k_summary(num_reps, solved, all_tasks)
+    category_pass_at_k = {
+        category: pass_at_k_summary(num_reps, solved, categories == category)
+        for category in set(task_category.values())
+    }
+
+    # Now compute the statistics for each model+config combination
     model_stats = {}
 
-    for key, instances in instance_results.items():
+    for m, key in enumerate(keys):
         model_id, config = key
-        rep_ids = sorted(model_config_reps[key])
-        num_reps = len(rep_ids)
 
         # Create display name
         friendly_name = get_friendly_name(model_id)
@@ -132,74 +281,43 @@ def aggregate_results(results_dir: Path, output_file: Path, tasks_file: Path):
         else:
             display_name = friendly_name
 
-        # Ensure every task has results for every rep (fill missing as False)
-        for task_id in canonical_tasks:
-            if task_id not in instances:
-                instances[task_id] = {}
-            # Fill in missing reps for this task
-            for rep_id in rep_ids:
-                if rep_id not in instances[task_id]:
-                    instances[task_id][rep_id] = False
-
-        # Compute success rates over all canonical tasks
-        total_instances = len(canonical_tasks)
-        successful_instances_pass5 = 0
-        total_attempts = 0
-        successful_attempts = 0
-
-        # Per-category tracking
-        cat_total_attempts = defaultdict(int)
-        cat_successful_attempts = defaultdict(int)
-        cat_total_instances = defaultdict(int)
-        cat_pass5 = defaultdict(int)
-
-        for task_id in canonical_tasks:
-            # Convert dict to list of results in rep order
-            successes = [instances[task_id][rep_id] for rep_id in rep_ids]
-            category = task_category[task_id]
-
-            total_attempts += len(successes)
-            successful_attempts += sum(successes)
-            cat_total_attempts[category] += len(successes)
-            cat_successful_attempts[category] += sum(successes)
-            cat_total_instances[category] += 1
-
-            if any(successes):
-                successful_instances_pass5 += 1
-                cat_pass5[category] += 1
-
-        # Pass@1: Average success rate across all individual attempts
-        pass1_rate = (successful_attempts / total_attempts * 100) if total_attempts > 0 else 0
-        pass5_rate = (successful_instances_pass5 / total_instances * 100) if total_instances > 0 else 0
+        # Efficiency of successful fixes, overall and per category
+        fixes = [t for t in model_config_metadata[key]['traces'] if t['success']]
 
         # Compute per-category stats
         by_category = {}
-        for category in set(task_category.values()):
-            ct = cat_total_instances[category]
-            cta = cat_total_attempts[category]
-            csa = cat_successful_attempts[category]
-            cp5 = cat_pass5[category]
+        for category, pass_at_k_by_model in category_pass_at_k.items():
+            in_category = categories == category
+            estimates = pass_at_k_by_model[m]
             by_category[category] = {
-                'total': ct,
-                'total_attempts': cta,
-                'successful_attempts': csa,
-                'pass1_rate': (csa / cta * 100) if cta > 0 else 0,
-                'pass5_success': cp5,
-                'pass5_rate': (cp5 / ct * 100) if ct > 0 else 0,
+                'total': int(in_category.sum()),
+                'total_attempts': int(in_category.sum() * num_reps[m]),
+                'successful_attempts': int(solved[m, in_category].sum()),
+                'pass1_rate': estimates.get('1', {}).get('estimate', 0.0),
+                'pass5_success': int((solved[m, in_category] > 0).sum()),
+                'pass5_rate': estimates.get('5', {}).get('estimate'),
+                'pass_at_k': estimates,
+                'efficiency': efficiency_stats(
+                    [t['efficiency'] for t in fixes if t['category'] == category]
+                ),
             }
 
+        estimates = overall_pass_at_k[m]
         model_stats[display_name] = {
             'model_id': model_id,
             'config': config,
             'display_name': display_name,
-            'total': total_instances,
-            'success_rate': pass1_rate,  # Pass@1: average of single attempts
-            'pass5_success': successful_instances_pass5,
-            'pass5_rate': pass5_rate,
-            'num_repetitions': num_reps,
-            'total_attempts': total_attempts,
-            'successful_attempts': successful_attempts,
+            'total': len(task_ids),
+            'success_rate': estimates.get('1', {}).get('estimate', 0.0),  # Pass@1
+            'pass5_success': int((solved[m] > 0).sum()),  # Tasks solved in any rep
+            'pass5_rate': estimates.get('5', {}).get('estimate'),  # None with < 5 reps
+            'pass_at_k': estimates,
+            'num_repetitions': int(num_reps[m]),
+            'total_attempts': int(len(task_ids) * num_reps[m]),
+            'successful_attempts': int(solved[m].sum()),
             'by_category': by_category,
+            'efficiency': efficiency_stats([t['efficiency'] for t in fixes]),
+            'profile': profile_histograms(model_config_steps[key]),
             'traces': model_config_metadata[key]['traces']
         }
 
@@ -220,14 +338,55 @@ def aggregate_results(results_dir: Path, output_file: Path, tasks_file: Path):
 
     # Print summary
     print("\n=== Leaderboard ===")
-    print(f"{'Model':<50} {'Pass@1':<15} {'Pass@5':<15} {'Attempts':<20}")
-    print("=" * 100)
+    print(f"{'Model':<50} {'Pass@1 (95% CI)':<24} {'Pass@5 (95% CI)':<24} {'Attempts':<20}")
+    print("=" * 118)
+
+    def fmt_pass(estimate):
+        if not estimate:
+            return '-'
+        return f"{estimate['estimate']:.1f}% [{estimate['ci_low']:.1f}, {estimate['ci_high']:.1f}]"
+
     sorted_models = sorted(model_stats.items(), key=lambda x: x[1]['success_rate'], reverse=True)
     for display_name, stats in sorted_models:
-        pass1_pct = f"{stats['success_rate']:.1f}%"
-        pass5_pct = f"{stats['pass5_rate']:.1f}%"
+        pass1_pct = fmt_pass(stats['pass_at_k'].get('1'))
+        pass5_pct = fmt_pass(stats['pass_at_k'].get('5'))
         attempts = f"{stats['successful_attempts']}/{stats['total_attempts']}"
-        print(f"{display_name:<50} {pass1_pct:<15} {pass5_pct:<15} {attempts:<20}")
+        print(f"{display_name:<50} {pass1_pct:<24} {pass5_pct:<24} {attempts:<20}")
+
+    # Print cost/latency per successful fix
+    print("\n=== Efficiency per fix (median / p90) ===")
+    print(f"{'Model':<50} {'Wall (min)':<16} {'Steps':<12} {'Tokens (k)':<16} {'Fray reruns':<12}")
+    print("=" * 110)
+
+    def fmt(stat, scale=1.0, digits=0):
+        if stat['median'] is None:
+            return '-'
+        return f"{stat['median'] / scale:.{digits}f} / {stat['p90'] / scale:.{digits}f}"
+
+    for display_name, stats in sorted_models:
+        eff = stats['efficiency']
+        print(
+            f"{display_name:<50} {fmt(eff['wall_seconds'], 60, 1):<16} {fmt(eff['steps']):<12} "
+            f"{fmt(eff['tokens'], 1000):<16} {fmt(eff['rerun_fray'], 1, 1):<12}"
+        )
+
+    # Print where the agent time went
+    print("\n=== Agent time (from events) ===")
+    print(f"{'Model':<50} {'LLM':<12} {'Tools':<12} {'Fray':<12} {'Idle':<12}")
+    print("=" * 100)
+    for display_name, stats in sorted_models:
+        profiles = [t['profile'] for t in stats['traces']]
+        llm = sum(p['llm_seconds'] for p in profiles)
+        tools = sum(sum(p['tool_seconds'].values()) for p in profiles)
+        fray = sum(p['tool_seconds'].get('rerun_fray', 0.0) for p in profiles)
+        idle = sum(p['idle_seconds'] for p in profiles)
+        total = llm + tools + idle
+        if not total:
+            continue
+        print(
+            f"{display_name:<50} {llm / total:<12.0%} {tools / total:<12.0%} "
+            f"{fray / total:<12.0%} {idle / total:<12.0%}"
+        )
 
 
 if __name__ == "__main__":
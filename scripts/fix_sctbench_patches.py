@@ -1,171 +1,273 @@
 #!/usr/bin/env python3
-"""Post-process SCTBench patches to show only diffs, not entire files."""
+"""Post-process SCTBench patches to show only diffs, not entire files.
 
+SCTBench workspaces are not git checkouts of the benchmark, so stored
+patches add the whole .java file (plus compiled .class files). Each patch
+is reduced to a diff of its .java file against the original benchmark
+source. Sources are indexed once, the diff is computed in-process and
+patches are processed in parallel.
+
+Usage: fix_sctbench_patches.py [--results-dir DIR] [--benchmarks-dir DIR] [--max-workers N]
+"""
+
+import argparse
+import difflib
 import os
-import subprocess
-import tempfile
-import shutil
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
+from concurrency_bench.patch_store import split_file_diffs
+
 RESULTS_DIR = Path("results")
 BENCHMARKS_DIR = Path("benchmarks/SCTBench")
-
-
-def find_original_file(instance_id: str) -> Path | None:
-    """Find the original Java file for an instance_id."""
-    # For SCTBench, instance_id is the class name (e.g., "Reorder3Bad")
-    java_file = f"{instance_id}.java"
-
-    # Search for the file in benchmarks/SCTBench
-    for root, dirs, files in os.walk(BENCHMARKS_DIR):
-        if java_file in files:
-            return Path(root) / java_file
-
-    return None
-
-
-def process_patch_file(patch_file: Path):
-    """Process a single patch file to create a proper diff."""
+# Patches handed to a worker at once
+CHUNK_SIZE = 64
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def build_source_index(benchmarks_dir: Path) -> dict[str, Path]:
+    """Map instance_id (the class name, e.g. "Reorder3Bad") to its .java file.
+
+    The first file found wins when a class name occurs more than once.
+    """
+    index = {}
+    for root, dirs, files in os.walk(benchmarks_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if file.endswith(".java"):
+                index.setdefault(file.removesuffix(".java"), Path(root) / file)
+    return index
+
+
+@lru_cache(maxsize=None)
+def read_source(path: Path) -> str:
+    with open(path, newline="") as f:
+        return f.read()
+
+
+def _hunks(section: str) -> tuple[bool, list[tuple[int, list[str], list[str]]]]:
+    """Parse a single-file diff into (is_new_file, [(old_start, old, new)])."""
+    lines = section.split("\n")
+    is_new_file = any(
+        line.startswith("new file mode") or line == "--- /dev/null" for line in lines[:6]
+    )
+    hunks = []
+    old: list[str] = []
+    new: list[str] = []
+    last: list[list[str]] = []
+    # Lines of the current hunk still to come, from its header
+    old_left = new_left = 0
+    for line in lines:
+        header = _HUNK_HEADER.match(line)
+        if header:
+            old, new = [], []
+            hunks.append((int(header.group(1)), old, new))
+            old_left = int(header.group(2) or 1)
+            new_left = int(header.group(4) or 1)
+            continue
+        if not hunks:
+            continue
+        if line.startswith("\\"):
+            # "\ No newline at end of file" applies to the line before
+            for side in last:
+                side[-1] = side[-1].removesuffix("\n")
+            continue
+        tag, text = line[:1], line[1:] + "\n"
+        if tag == "" and old_left > 0 and new_left > 0:
+            # Blank context line whose leading space was stripped
+            tag = " "
+        if tag == " ":
+            last = [old, new]
+            old_left -= 1
+            new_left -= 1
+        elif tag == "-":
+            last = [old]
+            old_left -= 1
+        elif tag == "+":
+            last = [new]
+            new_left -= 1
+        else:
+            # Trailing empty line of the section
+            continue
+        for side in last:
+            side.append(text)
+    return is_new_file, hunks
+
+
+def apply_file_diff(original: str, section: str) -> str:
+    """Apply a single-file diff to the original source.
+
+    A diff that creates the file replaces the original with its content.
+    Hunks are matched at their line number first, then anywhere after the
+    previous hunk (like git apply's offset search).
+
+    Raises:
+        ValueError: If a hunk does not match the original.
+    """
+    is_new_file, hunks = _hunks(section)
+    if is_new_file:
+        return "".join(line for _, _, new in hunks for line in new)
+
+    lines = original.splitlines(keepends=True)
+    result = []
+    position = 0
+    for old_start, old, new in hunks:
+        expected = max(old_start - 1, position) if old else old_start
+        start = None
+        if lines[expected : expected + len(old)] == old:
+            start = expected
+        else:
+            for candidate in range(position, len(lines) - len(old) + 1):
+                if lines[candidate : candidate + len(old)] == old:
+                    start = candidate
+                    break
+        if start is None:
+            raise ValueError(f"hunk at line {old_start} does not match")
+        result.extend(lines[position:start])
+        result.extend(new)
+        position = start + len(old)
+    result.extend(lines[position:])
+    return "".join(result)
+
+
+def file_diff(path: str, original: str, modified: str) -> str:
+    """git-style diff of one file, empty if nothing changed."""
+    hunks = difflib.unified_diff(
+        original.splitlines(keepends=True),
+        modified.splitlines(keepends=True),
+        fromfile=f"a/{path}",
+        tofile=f"b/{path}",
+    )
+    out = []
+    for line in hunks:
+        out.append(line)
+        if not line.endswith("\n"):
+            out.append("\n\\ No newline at end of file\n")
+    if not out:
+        return ""
+    return f"diff --git a/{path} b/{path}\n" + "".join(out)
+
+
+def process_patch_file(patch_file: Path, source_index: dict[str, Path]) -> str:
+    """Process a single patch file to create a proper diff.
+
+    Returns:
+        str: What was done, for the log.
+    """
     instance_id = patch_file.stem  # e.g., "Reorder3Bad" from "Reorder3Bad.patch"
 
-    # Read the patch
-    with open(patch_file, "r") as f:
+    with open(patch_file, "r", newline="") as f:
         patch_content = f.read()
 
-    # If the patch is empty, skip
     if not patch_content.strip():
-        print(f"Skipping {instance_id}: empty patch")
-        return
+        return f"Skipping {instance_id}: empty patch"
 
-    # Check if this patch has already been fixed (has an actual diff, not just new file mode)
     if "diff --git a/temp.patch" in patch_content:
         # This patch has the embedded temp.patch from a previous run - remove it
-        lines = patch_content.split("\n")
-        clean_lines = []
-        for line in lines:
-            if line.startswith("diff --git a/temp.patch"):
-                break
-            clean_lines.append(line)
-
-        # Write the cleaned patch
+        clean = patch_content.split("diff --git a/temp.patch", 1)[0]
         with open(patch_file, "w") as f:
-            f.write("\n".join(clean_lines).rstrip() + "\n")
+            f.write(clean.rstrip() + "\n")
+        return f"Cleaned patch for {instance_id}"
 
-        print(f"Cleaned patch for {instance_id}")
-        return
-
-    # This is an original patch that needs processing
-    # Find the original file
-    original_file = find_original_file(instance_id)
+    original_file = source_index.get(instance_id)
     if not original_file:
-        print(f"Warning: Could not find original file for {instance_id}")
-        return
+        return f"Warning: Could not find original file for {instance_id}"
 
-    # Extract only the .java file diff from the patch (ignore .class files)
-    # Find the section for the .java file
+    # Only the .java file diff counts (ignore .class files)
     java_filename = f"{instance_id}.java"
-    lines = patch_content.split("\n")
-    java_patch_lines = []
-    in_java_section = False
-
-    for i, line in enumerate(lines):
-        if line.startswith(f"diff --git") and java_filename in line:
-            in_java_section = True
-        elif line.startswith("diff --git") and java_filename not in line:
-            in_java_section = False
-
-        if in_java_section:
-            java_patch_lines.append(line)
-
-    if not java_patch_lines:
-        print(f"Warning: No .java diff found in patch for {instance_id}")
-        return
-
-    java_patch_content = "\n".join(java_patch_lines)
-
-    # Create a temporary directory to work in
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmpdir = Path(tmpdir)
-
-        # Copy original file
-        temp_file = tmpdir / f"{instance_id}.java"
-        shutil.copy2(original_file, temp_file)
-
-        # Initialize git and commit original
-        subprocess.run(["git", "init"], cwd=tmpdir, capture_output=True)
-        subprocess.run(["git", "add", "-A"], cwd=tmpdir, capture_output=True)
-        subprocess.run(
-            ["git", "commit", "-m", "Original"],
-            cwd=tmpdir,
-            capture_output=True,
-        )
-
-        # Write the extracted java-only patch to a temporary file
-        temp_patch = tmpdir / "temp.patch"
-        with open(temp_patch, "w") as f:
-            f.write(java_patch_content)
-
-        # If the patch is creating a new file, remove the existing file first
-        if "new file mode" in java_patch_content or "--- /dev/null" in java_patch_content:
-            temp_file.unlink()
-
-        # Apply the java-only patch
-        patch_result = subprocess.run(
-            ["git", "apply", str(temp_patch)],
-            cwd=tmpdir,
-            capture_output=True,
-            text=True,
-        )
-
-        if patch_result.returncode != 0:
-            print(f"Warning: Failed to apply patch for {instance_id}: {patch_result.stderr}")
-            return
-
-        # Remove the temporary patch file so it doesn't get included in the diff
-        temp_patch.unlink()
-
-        # Create new diff
-        subprocess.run(["git", "add", "-A"], cwd=tmpdir, capture_output=True)
-        diff_result = subprocess.run(
-            ["git", "diff", "--cached"],
-            cwd=tmpdir,
-            capture_output=True,
-            text=True,
-        )
-
-        if not diff_result.stdout.strip():
-            print(f"Skipping {instance_id}: no changes detected")
-            return
-
-        # Write the new patch
-        with open(patch_file, "w") as f:
-            f.write(diff_result.stdout)
-
-        print(f"Fixed patch for {instance_id}")
-
-
-def main():
-    """Process all SCTBench patches in results directory."""
-    if not RESULTS_DIR.exists():
-        print(f"Error: {RESULTS_DIR} does not exist")
-        return
-
-    # Find all patch files in SCTBench results
+    java_sections = [
+        section for path, section in split_file_diffs(patch_content)
+        if Path(path).name == java_filename
+    ]
+    if not java_sections:
+        return f"Warning: No .java diff found in patch for {instance_id}"
+
+    original = read_source(original_file)
+    try:
+        modified = apply_file_diff(original, java_sections[0])
+    except ValueError as e:
+        return f"Warning: Failed to apply patch for {instance_id}: {e}"
+
+    diff = file_diff(java_filename, original, modified)
+    if not diff:
+        return f"Skipping {instance_id}: no changes detected"
+
+    with open(patch_file, "w") as f:
+        f.write(diff)
+    return f"Fixed patch for {instance_id}"
+
+
+def find_patch_files(results_dir: Path) -> list[Path]:
+    """All .patch files below an sctbench directory of the results tree."""
     patch_files = []
-    for root, dirs, files in os.walk(RESULTS_DIR):
-        # Look for sctbench subdirectories
+    for root, dirs, files in os.walk(results_dir):
         if "sctbench" in Path(root).parts:
             for file in files:
                 if file.endswith(".patch"):
                     patch_files.append(Path(root) / file)
+    return patch_files
+
+
+def _process_with_index(patch_file: Path) -> str:
+    try:
+        return process_patch_file(patch_file, _source_index)
+    except Exception as e:
+        return f"Error processing {patch_file}: {e}"
 
-    print(f"Found {len(patch_files)} SCTBench patch files")
 
-    for patch_file in patch_files:
-        process_patch_file(patch_file)
+def _set_source_index(source_index: dict[str, Path]):
+    global _source_index
+    _source_index = source_index
+
+
+_source_index: dict[str, Path] = {}
+
+
+def main():
+    """Process all SCTBench patches in the results directory."""
+    parser = argparse.ArgumentParser(description="Reduce SCTBench patches to .java diffs")
+    parser.add_argument(
+        "--results-dir",
+        type=Path,
+        default=RESULTS_DIR,
+        help="Results directory to rewrite patches in (default: results/)",
+    )
+    parser.add_argument(
+        "--benchmarks-dir",
+        type=Path,
+        default=BENCHMARKS_DIR,
+        help="SCTBench sources (default: benchmarks/SCTBench)",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: one per CPU)",
+    )
+    args = parser.parse_args()
+
+    if not args.results_dir.exists():
+        print(f"Error: {args.results_dir} does not exist")
+        return 1
+
+    source_index = build_source_index(args.benchmarks_dir)
+    patch_files = find_patch_files(args.results_dir)
+    print(f"Found {len(patch_files)} SCTBench patch files, {len(source_index)} sources")
+
+    with ProcessPoolExecutor(
+        max_workers=args.max_workers,
+        initializer=_set_source_index,
+        initargs=(source_index,),
+    ) as executor:
+        for message in executor.map(_process_with_index, patch_files, chunksize=CHUNK_SIZE):
+            print(message)
 
     print("\nDone!")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    exit(main())
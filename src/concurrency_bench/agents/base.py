@@ -12,8 +12,18 @@ from openhands.tools.task_tracker import TaskTrackerTool
 from openhands.tools.terminal import TerminalTool
 
 from concurrency_bench.agents.builtin_agents import GoldenAgent, NoopAgent
+from concurrency_bench.agents.condenser import (
+    DEFAULT_KEEP_FIRST,
+    DEFAULT_MAX_EVENTS,
+    create_condenser,
+)
+from concurrency_bench.agents.llm import BenchLLM
+from concurrency_bench.rate_limit import get_rate_limiter
+from concurrency_bench.resources import get_governor
+from concurrency_bench.response_cache import get_response_cache
 from concurrency_bench.task_config import TaskConfig
 from concurrency_bench.tasks.task import ConcurrencyTask
+from concurrency_bench.tools.governed_terminal import GOVERNED_TERMINAL
 
 NOOP_AGENT_ID = "noop"
 GOLDEN_AGENT_ID = "golden_agent"
@@ -30,6 +40,11 @@ class ConcurrencyAgent(ABC):
         task_instance: ConcurrencyTask,
         api_key: str | None = None,
         base_url: str | None = None,
+        prompt_caching: bool = True,
+        condenser: str = "none",
+        condenser_max_events: int = DEFAULT_MAX_EVENTS,
+        condenser_keep_first: int = DEFAULT_KEEP_FIRST,
+        repetition: int | None = None,
     ):
         """Initialize the ConcurrencyAgent.
 
@@ -39,13 +54,28 @@ class ConcurrencyAgent(ABC):
             api_key: API key for the LLM provider (defaults to env var).
             task_config: Configuration for the task.
             task_instance: Instance of the concurrency task.
+            prompt_caching: Mark the stable prompt prefix (system prompt, tool
+                schemas, task description) for provider-side prompt caching
+                where the provider supports it.
+            condenser: Context condensation strategy (see condenser.py).
+            condenser_max_events: History length that triggers condensation.
+            condenser_keep_first: Leading events that are never condensed.
+            repetition: Repetition of the run; the response cache records
+                and replays each repetition separately.
         """
         self.workdir = workdir
         self.model_id = model_id
         self.api_key = api_key or os.getenv("LLM_API_KEY")
         self.task_config = task_config
         self.task_instance = task_instance
+        self.prompt_caching = prompt_caching
+        self.condenser = condenser
+        self.condenser_max_events = condenser_max_events
+        self.condenser_keep_first = condenser_keep_first
+        self.repetition = repetition
         self.agent = None
+        # Token counts of the initial prompt, filled in by task_description()
+        self.prompt_stats: dict = {}
 
     @abstractmethod
     def task_description(self) -> str:
@@ -76,8 +106,10 @@ class ConcurrencyAgent(ABC):
         Returns:
             list: List of tools for the agent.
         """
+        # With a resource governor, builds and Fray runs from the terminal are admitted
+        terminal = GOVERNED_TERMINAL if get_governor() is not None else TerminalTool.name
         tools = [
-            Tool(name=TerminalTool.name, params={"terminal_type": "subprocess"}),
+            Tool(name=terminal, params={"terminal_type": "subprocess"}),
             Tool(name=FileEditorTool.name),
             Tool(name=TaskTrackerTool.name),
         ]
@@ -91,30 +123,93 @@ class ConcurrencyAgent(ABC):
         if self.model_id == GOLDEN_AGENT_ID:
             self.agent = GoldenAgent()
             return self.agent
-        llm = LLM(
+        # Shared rate limits and the response cache, when configured
+        use_bench_llm = get_rate_limiter() is not None or get_response_cache() is not None
+        llm_class = BenchLLM if use_bench_llm else LLM
+        # The shared rate limiter is the only retry loop (see BenchLLM)
+        retries = {"num_retries": 0} if get_rate_limiter() is not None else {}
+        llm = llm_class(
             model=self.model_id,
             api_key=self.api_key,
             max_output_tokens=8192,
+            # The system prompt, tool schemas and task description never
+            # change within a conversation, so every turn can reuse them (the
+            # SDK's default; --no-prompt-caching turns it off for comparison)
+            caching_prompt=self.prompt_caching,
+            **retries,
         )
+        if use_bench_llm:
+            llm.set_repetition(self.repetition)
 
         tools = self.configure_tools()
 
-        self.agent = Agent(
-            llm=llm,
-            tools=tools,
+        condenser = create_condenser(
+            self.condenser,
+            llm,
+            max_events=self.condenser_max_events,
+            keep_first=self.condenser_keep_first,
         )
+        if condenser is None:
+            self.agent = Agent(llm=llm, tools=tools)
+        else:
+            self.agent = Agent(llm=llm, tools=tools, condenser=condenser)
 
         return self.agent
 
-    def run_agent(self):
+    def token_usage(self) -> dict:
+        """Token usage of the conversation, including prompt cache hits.
+
+        Returns:
+            dict: prompt_tokens, completion_tokens, cache_read_tokens,
+            cache_write_tokens and cache_hit_rate (share of prompt tokens read
+            from the cache); empty for agents without an LLM.
+        """
+        if type(self.agent) is not Agent:
+            return {}
+        try:
+            usage = self.agent.llm.metrics.accumulated_token_usage
+        except AttributeError:
+            return {}
+        prompt_tokens = usage.prompt_tokens or 0
+        cache_read_tokens = getattr(usage, "cache_read_tokens", 0) or 0
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": usage.completion_tokens or 0,
+            "cache_read_tokens": cache_read_tokens,
+            "cache_write_tokens": getattr(usage, "cache_write_tokens", 0) or 0,
+            "cache_hit_rate": cache_read_tokens / prompt_tokens if prompt_tokens else 0.0,
+        }
+
+    def condenser_stats(self) -> dict:
+        """Tokens saved by context condensation; empty without a condenser."""
+        if type(self.agent) is not Agent or self.agent.condenser is None:
+            return {}
+        return getattr(self.agent.condenser, "stats", {})
+
+    def run_agent(self, callbacks: list[ConversationCallbackType] | None = None):
+        """Run the agent on the task.
+
+        Args:
+            callbacks: Called with every conversation event as it happens
+                (e.g. an EventLog streaming the trace to disk).
+
+        Returns:
+            The finished conversation.
+        """
         if self.agent is None:
             self.initialize_agent()
 
         if type(self.agent) is Agent:
-            conversation = Conversation(agent=self.agent, workspace=self.workdir)
+            conversation = Conversation(
+                agent=self.agent, workspace=self.workdir, callbacks=callbacks
+            )
             description = self.task_description()
-            conversation.send_message(description)
-            conversation.run()
+            try:
+                conversation.send_message(description)
+                conversation.run()
+            finally:
+                # Closes the tool executors (terminal sessions, Fray log directory)
+                conversation.close()
             return conversation
         if type(self.agent) is NoopAgent:
             return self.agent.dummy_conversation()
@@ -0,0 +1,103 @@
+"""Context condensation for long agent conversations.
+
+Without a condenser, every turn resends the whole history; on hard
+real-world tasks that grows to hundreds of thousands of tokens and step
+latency keeps climbing. Once the history exceeds `max_events`, the middle
+of the conversation (old tool outputs, stale file views) is replaced by an
+LLM-written summary. The first `keep_first` events, which hold the system
+prompt and the task description with the stack trace, are always kept, as
+are the most recent events.
+"""
+
+from openhands.sdk import LLM
+from openhands.sdk.context.condenser import LLMSummarizingCondenser
+from pydantic import PrivateAttr
+
+from concurrency_bench.text_budget import estimate_tokens
+
+CONDENSERS = ("none", "summarize")
+# Events in the history that trigger a condensation
+DEFAULT_MAX_EVENTS = 80
+# Leading events that are never condensed (system prompt, task description)
+DEFAULT_KEEP_FIRST = 2
+
+
+def _event_tokens(event) -> int:
+    try:
+        return estimate_tokens(str(event.to_llm_message()))
+    except AttributeError:
+        return estimate_tokens(str(event))
+
+
+class TrackedSummarizingCondenser(LLMSummarizingCondenser):
+    """LLMSummarizingCondenser that records how many tokens it saved."""
+
+    _stats: dict = PrivateAttr(
+        default_factory=lambda: {
+            "condensations": 0,
+            "events_forgotten": 0,
+            "tokens_forgotten": 0,
+            "summary_tokens": 0,
+            "tokens_saved": 0,
+        }
+    )
+
+    def get_condensation(self, view):
+        condensation = super().get_condensation(view)
+        forgotten = set(condensation.forgotten_event_ids)
+        tokens_forgotten = sum(
+            _event_tokens(event) for event in view.events if event.id in forgotten
+        )
+        summary_tokens = estimate_tokens(condensation.summary or "")
+
+        self._stats["condensations"] += 1
+        self._stats["events_forgotten"] += len(forgotten)
+        self._stats["tokens_forgotten"] += tokens_forgotten
+        self._stats["summary_tokens"] += summary_tokens
+        self._stats["tokens_saved"] += tokens_forgotten - summary_tokens
+        print(
+            f"Condensed {len(forgotten)} events "
+            f"(~{tokens_forgotten} tokens -> ~{summary_tokens} token summary)"
+        )
+        return condensation
+
+    @property
+    def stats(self) -> dict:
+        """Condensations, forgotten events/tokens and estimated tokens saved.
+
+        Savings are per request: every later turn sends that many fewer
+        tokens.
+        """
+        return dict(self._stats)
+
+
+def create_condenser(
+    strategy: str,
+    llm: LLM,
+    max_events: int = DEFAULT_MAX_EVENTS,
+    keep_first: int = DEFAULT_KEEP_FIRST,
+) -> TrackedSummarizingCondenser | None:
+    """Build the condenser for a strategy.
+
+    Args:
+        strategy: One of CONDENSERS.
+        llm: The agent's LLM; the summaries are written by a copy of it that
+            keeps separate usage metrics.
+        max_events: History length that triggers a condensation.
+        keep_first: Leading events that are never condensed.
+
+    Returns:
+        The condenser, or None for "none".
+
+    Raises:
+        ValueError: If the strategy is unknown.
+    """
+    if strategy == "none":
+        return None
+    if strategy == "summarize":
+        return TrackedSummarizingCondenser(
+            llm=llm.model_copy(update={"usage_id": "condenser"}),
+            max_size=max_events,
+            keep_first=keep_first,
+        )
+    raise ValueError(f"Unknown condenser {strategy!r}, expected one of: {', '.join(CONDENSERS)}")
@@ -1,4 +1,9 @@
 from concurrency_bench.agents.base import ConcurrencyAgent
+from concurrency_bench.agents.prompt_budget import (
+    PROMPT_CONTEXT_TOKEN_BUDGET,
+    budget_failure_context,
+)
+from concurrency_bench.text_budget import estimate_tokens
 
 
 class FixBugAgent(ConcurrencyAgent):
@@ -8,15 +13,24 @@ class FixBugAgent(ConcurrencyAgent):
     deadlocks, and other threading/async problems.
     """
 
-    def __init__(self, *args, enable_fray_tools: bool = False, **kwargs):
+    def __init__(
+        self,
+        *args,
+        enable_fray_tools: bool = False,
+        prompt_token_budget: int = PROMPT_CONTEXT_TOKEN_BUDGET,
+        **kwargs,
+    ):
         """Initialize the FixBugAgent.
 
         Args:
             enable_fray_tools: If True, add Fray-specific tools for debugging.
+            prompt_token_budget: Token budget for the stack trace and stdout
+                sections of the task description.
             *args, **kwargs: Passed to ConcurrencyAgent.__init__
         """
         super().__init__(*args, **kwargs)
         self.enable_fray_tools = enable_fray_tools
+        self.prompt_token_budget = prompt_token_budget
 
     def task_description(self) -> str:
         # TODO: move this to a prompts file
@@ -30,24 +44,32 @@ The test that is failing (nondeterministically) is:
 - Test method: {self.task_config.test_method}
 
 """
+        # Real-world tasks can produce huge traces and logs, so both sections
+        # are ranked and truncated to a fixed budget
+        stack_trace, stdout, context_stats = budget_failure_context(
+            self.task_instance.get_stack_trace() or "",
+            self.task_instance.get_stdout() or "",
+            max_tokens=self.prompt_token_budget,
+        )
+
         # Include stack trace if available
-        if self.task_instance.get_stack_trace().strip():
+        if stack_trace.strip():
             prompt += f"""
 When we ran Fray (a concurrency testing tool) to trigger the bug, we got the following error/stack trace:
 
 ```
-{self.task_instance.get_stack_trace()}
+{stack_trace}
 ```
 
 """
 
         # Include stdout if available
-        if self.task_instance.get_stdout().strip():
+        if stdout.strip():
             prompt += f"""
-The stdout output from the buggy execution was:
+The stdout output from the buggy execution was (library frames and distant lines may be omitted):
 
 ```
-{self.task_instance.get_stdout()}
+{stdout}
 ```
 
 """
@@ -92,6 +114,11 @@ IMPORTANT: After making changes and rebuilding, use the exact Fray command provi
             "When complete, use the finish tool to report what you found and fixed."
         )
 
+        self.prompt_stats = {
+            **context_stats,
+            "budget_tokens": self.prompt_token_budget,
+            "prompt_tokens": estimate_tokens(prompt),
+        }
         return prompt
 
     def add_tools(self, tools: list) -> list:
@@ -0,0 +1,121 @@
+"""LLM wrapper adding shared rate limiting and response record/replay."""
+
+import random
+import time
+import uuid
+
+from openhands.sdk import LLM
+from pydantic import PrivateAttr
+
+from concurrency_bench.rate_limit import (
+    MAX_RATE_LIMIT_RETRIES,
+    TRANSIENT_RETRY_SECONDS,
+    get_rate_limiter,
+    is_rate_limit_error,
+    is_transient_error,
+    provider_of,
+)
+from concurrency_bench.response_cache import (
+    canonical_request,
+    get_response_cache,
+    request_hash,
+)
+from concurrency_bench.text_budget import estimate_tokens
+
+
+class BenchLLM(LLM):
+    """LLM used by the harness when rate limiting or the response cache is on.
+
+    Calls are first looked up in the response cache (see response_cache.py);
+    replayed responses skip the provider and its rate limits entirely. Other
+    calls wait for the provider's rate limits (see rate_limit.py): a call is
+    charged its estimated prompt tokens plus max_output_tokens up front, as
+    providers count the output reservation against the limit too, and the
+    difference to the actual usage is returned to the bucket afterwards.
+
+    With a rate limiter the SDK's own retries are off (num_retries=0, see
+    agents/base.py): every retry, of rate-limit errors as well as timeouts
+    and server errors, goes through the limiter, so it is paced and counted.
+    """
+
+    # Position of the next call and identity of this conversation, for the
+    # response cache
+    _call_index: int = PrivateAttr(default=0)
+    _conversation: str | None = PrivateAttr(default=None)
+    # Repetition of the run: each repetition records its own responses
+    _repetition: int | None = PrivateAttr(default=None)
+    _recording: str = PrivateAttr(
+        default_factory=lambda: f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+    )
+
+    def set_repetition(self, repetition: int | None):
+        """Key cached responses by repetition, so repetitions are independent samples."""
+        self._repetition = repetition
+
+    def completion(self, messages, *args, **kwargs):
+        return self._cached(super().completion, messages, *args, **kwargs)
+
+    def responses(self, messages, *args, **kwargs):
+        return self._cached(super().responses, messages, *args, **kwargs)
+
+    def _cached(self, call, messages, *args, **kwargs):
+        cache = get_response_cache()
+        if cache is None:
+            return self._rate_limited(call, messages, *args, **kwargs)
+
+        options = {"args": args, **kwargs}
+        if self._repetition is not None:
+            options["repetition"] = self._repetition
+        digest = request_hash(canonical_request(self.model, messages, options=options))
+        if self._conversation is None:
+            self._conversation = digest
+        index = self._call_index
+        self._call_index += 1
+
+        response = cache.lookup(digest, self._conversation, index)
+        if response is not None:
+            if cache.mode == "auto":
+                cache.record_call(digest, self._conversation, self._recording, index)
+            return response
+        response = self._rate_limited(call, messages, *args, **kwargs)
+        cache.store(digest, self._conversation, self._recording, index, response)
+        return response
+
+    def _used_tokens(self) -> int | None:
+        try:
+            usage = self.metrics.accumulated_token_usage
+            return usage.prompt_tokens + usage.completion_tokens
+        except AttributeError:
+            return None
+
+    def _rate_limited(self, call, messages, *args, **kwargs):
+        limiter = get_rate_limiter()
+        if limiter is None:
+            return call(messages, *args, **kwargs)
+
+        provider = provider_of(self.model)
+        estimated = estimate_tokens(str(messages)) + (self.max_output_tokens or 0)
+        attempt = 0
+        while True:
+            limiter.acquire(provider, estimated)
+            used_before = self._used_tokens()
+            try:
+                response = call(messages, *args, **kwargs)
+            except Exception as e:
+                if attempt >= MAX_RATE_LIMIT_RETRIES:
+                    raise
+                if is_rate_limit_error(e):
+                    limiter.backoff(provider)
+                elif is_transient_error(e):
+                    # Not the provider's limits: only this call waits
+                    time.sleep(TRANSIENT_RETRY_SECONDS * 2**attempt * random.uniform(0.5, 1.0))
+                else:
+                    raise
+                attempt += 1
+                continue
+
+            limiter.succeeded(provider)
+            used_after = self._used_tokens()
+            if used_before is not None and used_after is not None:
+                limiter.adjust(provider, estimated - (used_after - used_before))
+            return response
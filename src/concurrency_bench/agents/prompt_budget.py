@@ -0,0 +1,147 @@
+"""Budgeted construction of the failure context included in agent prompts."""
+
+import re
+
+from concurrency_bench.text_budget import (
+    collapse_repeated_lines,
+    estimate_tokens,
+    truncate_to_tokens,
+)
+
+# Token budget shared by the stack trace and stdout sections of the prompt
+PROMPT_CONTEXT_TOKEN_BUDGET = 6000
+# Fraction of the budget reserved for the stack trace, which ranks first
+STACK_TRACE_BUDGET_SHARE = 0.6
+# Number of stdout lines kept around the failure
+STDOUT_CONTEXT_LINES = 60
+
+# Frames from these packages are rarely useful for locating the bug
+LIBRARY_FRAME_PREFIXES = (
+    "java.",
+    "javax.",
+    "jdk.",
+    "sun.",
+    "kotlin.",
+    "kotlinx.",
+    "org.junit.",
+    "junit.",
+    "org.pastalab.fray.",
+    "org.gradle.",
+    "org.mockito.",
+    "net.bytebuddy.",
+)
+
+FRAME_PATTERN = re.compile(r"^\s*at\s+([\w$.]+)")
+EXCEPTION_PATTERN = re.compile(r"([\w$.]+(?:Exception|Error))")
+
+
+def is_library_frame(line: str) -> bool:
+    """Check whether a stack trace line is a frame from JDK/test/Fray code."""
+    match = FRAME_PATTERN.match(line)
+    return bool(match) and match.group(1).startswith(LIBRARY_FRAME_PREFIXES)
+
+
+def condense_stack_trace(stack_trace: str) -> str:
+    """Keep the failing assertion and application frames of a stack trace.
+
+    Runs of library frames are replaced by a single marker line so the
+    application frames that point at the bug stay visible.
+
+    Args:
+        stack_trace: Stack trace as reported by Fray.
+
+    Returns:
+        str: The condensed stack trace.
+    """
+    condensed = []
+    skipped = 0
+    for line in stack_trace.splitlines():
+        if is_library_frame(line):
+            skipped += 1
+            continue
+        if skipped:
+            condensed.append(f"\t... {skipped} library frames")
+            skipped = 0
+        condensed.append(line)
+    if skipped:
+        condensed.append(f"\t... {skipped} library frames")
+    return collapse_repeated_lines("\n".join(condensed))
+
+
+def select_stdout_context(
+    stdout: str, stack_trace: str, max_lines: int = STDOUT_CONTEXT_LINES
+) -> str:
+    """Select the stdout lines around the failure.
+
+    If the exception from the stack trace appears in stdout, the window ends
+    a few lines after its last occurrence; otherwise the tail is used.
+
+    Args:
+        stdout: Stdout of the buggy execution.
+        stack_trace: Stack trace of the failure, used to locate it in stdout.
+        max_lines: Maximum number of lines to keep.
+
+    Returns:
+        str: The selected lines, prefixed with a marker if lines were dropped.
+    """
+    lines = stdout.splitlines()
+    if len(lines) <= max_lines:
+        return stdout
+
+    end = len(lines)
+    match = EXCEPTION_PATTERN.search(stack_trace)
+    if match:
+        exception = match.group(1)
+        for i in range(len(lines) - 1, -1, -1):
+            if exception in lines[i]:
+                end = min(i + max_lines // 4, len(lines))
+                break
+
+    start = max(end - max_lines, 0)
+    selected = lines[start:end]
+    if start > 0:
+        selected.insert(0, f"[... {start} earlier lines omitted ...]")
+    if end < len(lines):
+        selected.append(f"[... {len(lines) - end} later lines omitted ...]")
+    return "\n".join(selected)
+
+
+def budget_failure_context(
+    stack_trace: str,
+    stdout: str,
+    max_tokens: int = PROMPT_CONTEXT_TOKEN_BUDGET,
+) -> tuple[str, str, dict]:
+    """Rank and truncate the stack trace and stdout sections of the prompt.
+
+    The stack trace ranks first and gets STACK_TRACE_BUDGET_SHARE of the
+    budget; stdout gets the remainder, including whatever the stack trace
+    did not use.
+
+    Args:
+        stack_trace: Stack trace of the buggy execution.
+        stdout: Stdout of the buggy execution.
+        max_tokens: Token budget for both sections together.
+
+    Returns:
+        tuple: (stack_trace_section, stdout_section, stats) where stats holds
+        token counts before and after budgeting.
+    """
+    stack_budget = int(max_tokens * STACK_TRACE_BUDGET_SHARE)
+    stack_section = ""
+    if stack_trace.strip():
+        stack_section = truncate_to_tokens(condense_stack_trace(stack_trace), stack_budget)
+
+    stdout_section = ""
+    if stdout.strip():
+        stdout_budget = max_tokens - estimate_tokens(stack_section)
+        stdout_section = truncate_to_tokens(
+            select_stdout_context(stdout, stack_trace), stdout_budget
+        )
+
+    stats = {
+        "stack_trace_tokens_original": estimate_tokens(stack_trace),
+        "stack_trace_tokens": estimate_tokens(stack_section),
+        "stdout_tokens_original": estimate_tokens(stdout),
+        "stdout_tokens": estimate_tokens(stdout_section),
+    }
+    return stack_section, stdout_section, stats
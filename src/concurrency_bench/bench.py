@@ -0,0 +1,315 @@
+"""Asyncio API for running benchmark tasks from notebooks and services.
+
+    async with Bench(load_tasks(Path("sctbench.jsonl")), results_dir=Path("results")) as bench:
+        results = await asyncio.gather(
+            bench.run("Reorder3Bad", "openai/gpt-5.2", enable_fray_tools=True),
+            bench.run("Reorder3Bad", "gemini/gemini-3-pro-preview"),
+        )
+
+The agent SDK, builds and Fray runs are synchronous, so the event loop never
+blocks on them directly: setup runs in a bounded thread pool (once per task,
+shared by all runs of that task), and every agent run plus verification
+runs in its own child process that the loop awaits through a pipe.
+Cancelling a run kills the child's process group, including build and Fray
+JVMs. A resource governor, rate limiter or response cache installed in the
+calling process (set_governor, set_rate_limiter, set_response_cache) is
+handed to every run process.
+"""
+
+import asyncio
+import os
+import shutil
+import signal
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from concurrency_bench.matrix import init_worker
+from concurrency_bench.rate_limit import get_rate_limiter
+from concurrency_bench.resources import get_governor
+from concurrency_bench.response_cache import get_response_cache
+from concurrency_bench.run_agent import (
+    PreparedTask,
+    fork_prepared_task,
+    get_task_results_dir,
+    prepare_task,
+    result_status,
+    run_prepared_task,
+)
+from concurrency_bench.task_config import TaskConfig
+from concurrency_bench.workers import worker_context
+
+
+@dataclass
+class RunResult:
+    """Outcome of one agent run started through Bench.run."""
+
+    instance_id: str
+    model_id: str
+    enable_fray_tools: bool
+    repetition: int | None
+    success: bool | None
+    result_file: Path
+    patch_file: Path
+    seconds: float = 0.0
+    skipped: bool = False
+    error: str | None = None
+
+
+def _run_in_child(
+    conn,
+    prepared: PreparedTask,
+    model_id: str,
+    results_dir: Path,
+    api_key: str | None,
+    enable_fray_tools: bool,
+    repetition: int | None,
+    timeout: int,
+    agent_options: dict | None,
+    shared: tuple,
+):
+    """Child process entry point: run the agent and verification, report back."""
+    # Own process group, so cancellation also stops build and Fray JVMs
+    os.setsid()
+    # Not forked, so the parent's governor, rate limiter and response cache
+    # are installed explicitly, as in matrix workers
+    init_worker(*shared)
+    try:
+        result = run_prepared_task(
+            prepared,
+            model_id=model_id,
+            results_dir=results_dir,
+            api_key=api_key,
+            enable_fray_tools=enable_fray_tools,
+            repetition=repetition,
+            timeout=timeout,
+            agent_options=agent_options,
+        )
+        conn.send({"success": result.success, "error": None})
+    except BaseException as e:
+        print(traceback.format_exc())
+        conn.send({"success": False, "error": str(e)})
+    finally:
+        conn.close()
+
+
+class Bench:
+    """Run benchmark tasks concurrently from an asyncio event loop."""
+
+    def __init__(
+        self,
+        tasks: list[TaskConfig],
+        base_path: Path | None = None,
+        results_dir: Path = Path("results"),
+        task_type: str = "fix_bug",
+        api_key: str | None = None,
+        max_concurrent_runs: int = 16,
+        max_concurrent_setups: int = 2,
+        keep_result: bool = False,
+        agent_options: dict | None = None,
+    ):
+        """Initialize the bench.
+
+        Args:
+            tasks: Tasks that can be run, e.g. from load_tasks.
+            base_path: Base path to resolve relative paths from (default:
+                current directory).
+            results_dir: Directory to save conversation results.
+            task_type: Type of task ('fix_bug' or 'run_gold').
+            api_key: Optional API key for the LLM.
+            max_concurrent_runs: Maximum number of agent runs in flight.
+            max_concurrent_setups: Maximum number of task setups (clone,
+                build, Fray) at once.
+            keep_result: Keep workspaces after the runs complete.
+            agent_options: Extra keyword arguments for the agents (e.g.
+                condenser="summarize").
+        """
+        self.tasks = {t.instance_id: t for t in tasks}
+        self.base_path = base_path or Path.cwd()
+        self.results_dir = results_dir
+        self.task_type = task_type
+        self.api_key = api_key
+        self.keep_result = keep_result
+        self.agent_options = agent_options
+        self._run_slots = asyncio.Semaphore(max_concurrent_runs)
+        self._setup_executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_setups, thread_name_prefix="bench-setup"
+        )
+        # instance_id -> setup shared by all runs of the task
+        self._prepared: dict[str, asyncio.Task] = {}
+
+    def _task_config(self, task: TaskConfig | str) -> TaskConfig:
+        if isinstance(task, TaskConfig):
+            return task
+        if task not in self.tasks:
+            raise KeyError(f"No task with instance_id '{task}'")
+        return self.tasks[task]
+
+    async def prepare(self, task: TaskConfig | str) -> PreparedTask:
+        """Set up a task's workspace, once, however many runs await it."""
+        task_config = self._task_config(task)
+        if task_config.instance_id not in self._prepared:
+            loop = asyncio.get_running_loop()
+            self._prepared[task_config.instance_id] = asyncio.ensure_future(
+                loop.run_in_executor(
+                    self._setup_executor,
+                    lambda: prepare_task(
+                        task_config,
+                        self.task_type,
+                        self.base_path,
+                        cleanup_on_error=not self.keep_result,
+                    ),
+                )
+            )
+        # Shield: cancelling one run must not cancel the setup other runs share
+        return await asyncio.shield(self._prepared[task_config.instance_id])
+
+    async def run(
+        self,
+        task: TaskConfig | str,
+        model_id: str,
+        enable_fray_tools: bool = False,
+        repetition: int | None = None,
+        timeout: int = 1200,
+    ) -> RunResult:
+        """Run an agent on a task, verify and save the result.
+
+        Runs whose result JSON and patch already exist are skipped.
+
+        Args:
+            task: Task, or its instance_id.
+            model_id: Model ID to use for the agent.
+            enable_fray_tools: Enable Fray-specific debugging tools.
+            repetition: Repetition ID to include in the results path.
+            timeout: Agent timeout in seconds.
+
+        Returns:
+            RunResult: The outcome; errors are reported in it, not raised.
+
+        Raises:
+            asyncio.CancelledError: If the run was cancelled; its child
+                process has been killed.
+        """
+        task_config = self._task_config(task)
+        task_results_dir = get_task_results_dir(
+            self.results_dir,
+            model_id,
+            enable_fray_tools,
+            repetition,
+            self.task_type,
+            task_config,
+        )
+        result = RunResult(
+            instance_id=task_config.instance_id,
+            model_id=model_id,
+            enable_fray_tools=enable_fray_tools,
+            repetition=repetition,
+            success=None,
+            result_file=task_results_dir / f"{task_config.instance_id}.json",
+            patch_file=task_results_dir / f"{task_config.instance_id}.patch",
+        )
+        json_exists, patch_exists = result_status(task_results_dir, task_config.instance_id)
+        if json_exists and patch_exists:
+            result.skipped = True
+            return result
+
+        start = time.monotonic()
+        async with self._run_slots:
+            fork = None
+            try:
+                prepared = await self.prepare(task_config)
+                loop = asyncio.get_running_loop()
+                fork = await loop.run_in_executor(
+                    None, fork_prepared_task, prepared, self.base_path
+                )
+                outcome = await self._run_child(
+                    fork, model_id, enable_fray_tools, repetition, timeout
+                )
+                result.success = outcome["success"]
+                result.error = outcome["error"]
+            except Exception as e:
+                print(traceback.format_exc())
+                result.success = False
+                result.error = str(e)
+            finally:
+                if fork is not None and not self.keep_result:
+                    shutil.rmtree(fork.workdir, ignore_errors=True)
+        result.seconds = time.monotonic() - start
+        return result
+
+    async def _run_child(
+        self,
+        prepared: PreparedTask,
+        model_id: str,
+        enable_fray_tools: bool,
+        repetition: int | None,
+        timeout: int,
+    ) -> dict:
+        """Run one agent run in a child process and await its outcome."""
+        loop = asyncio.get_running_loop()
+        # Not forked: the loop's and setup pool's threads may hold locks
+        context = worker_context()
+        reader, writer = context.Pipe(duplex=False)
+        process = context.Process(
+            target=_run_in_child,
+            args=(
+                writer,
+                prepared,
+                model_id,
+                self.results_dir,
+                self.api_key,
+                enable_fray_tools,
+                repetition,
+                timeout,
+                self.agent_options,
+                (get_governor(), get_rate_limiter(), get_response_cache()),
+            ),
+        )
+        process.start()
+        writer.close()
+
+        readable = loop.create_future()
+        loop.add_reader(
+            reader.fileno(), lambda: readable.done() or readable.set_result(None)
+        )
+        try:
+            await readable
+            try:
+                return reader.recv()
+            except EOFError:
+                return {
+                    "success": False,
+                    "error": f"Run process exited with code {process.exitcode}",
+                }
+        except asyncio.CancelledError:
+            print(f"Cancelling run of {prepared.task_config.instance_id} ({model_id})")
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                # Not yet in its own process group
+                process.kill()
+            raise
+        finally:
+            loop.remove_reader(reader.fileno())
+            reader.close()
+            await loop.run_in_executor(None, process.join)
+
+    async def close(self):
+        """Wait for pending setups and remove the prepared base workspaces."""
+        for setup in self._prepared.values():
+            try:
+                prepared = await setup
+            except Exception:
+                continue
+            if not self.keep_result:
+                shutil.rmtree(prepared.workdir, ignore_errors=True)
+        self._prepared.clear()
+        self._setup_executor.shutdown(wait=True)
+
+    async def __aenter__(self) -> "Bench":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Coverage of a sweep and the job list that completes it.
+
+A sweep spec names the task file and the matrix to cover:
+
+    {
+      "tasks_file": "src/concurrency_bench/all.jsonl",
+      "task_type": "fix_bug",
+      "models": ["openai/gpt-5.2", "gemini/gemini-3-pro-preview"],
+      "fray_modes": "both",
+      "repetitions": "1-5"
+    }
+
+The task file is resolved against the current directory. Every
+(task, model, Fray mode, repetition) cell is looked up in the results
+tree: complete (result JSON and patch), partial (only one of them, e.g. a
+crashed run) or missing. The cells that are not complete are written as a
+JSONL job list, which run_agent.py --jobs-file runs (with --shard or
+--queue-dir like any matrix sweep), or run directly with --run:
+
+    python src/concurrency_bench/coverage.py --spec sweeps/leaderboard.json \\
+        --results-dir results --jobs-file missing.jsonl
+    python src/concurrency_bench/run_agent.py --tasks-file src/concurrency_bench/all.jsonl \\
+        --task-type fix_bug --jobs-file missing.jsonl --max-workers 8
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+
+from concurrency_bench.matrix import (
+    MatrixCell,
+    expand_matrix,
+    parse_fray_modes,
+    parse_repetitions,
+)
+from concurrency_bench.run_agent import get_task_results_dir, load_tasks, result_status
+from concurrency_bench.sharding import WorkUnit
+from concurrency_bench.task_config import TaskConfig
+
+
+@dataclass
+class SweepSpec:
+    """The tasks and matrix cells a sweep is expected to cover."""
+
+    tasks_file: Path
+    task_type: str
+    models: list[str]
+    fray_modes: list[bool]
+    repetitions: list[int | None]
+
+    def cells(self) -> list[MatrixCell]:
+        return expand_matrix(self.models, self.fray_modes, self.repetitions)
+
+
+def load_sweep_spec(spec_file: Path) -> SweepSpec:
+    """Load a sweep spec (see module docstring).
+
+    Raises:
+        ValueError: If a required field is missing.
+    """
+    with open(spec_file) as f:
+        spec = json.load(f)
+    missing = [key for key in ("tasks_file", "models") if key not in spec]
+    if missing:
+        raise ValueError(f"Sweep spec {spec_file} lacks {', '.join(missing)}")
+    repetitions = spec.get("repetitions")
+    return SweepSpec(
+        tasks_file=Path(spec["tasks_file"]),
+        task_type=spec.get("task_type", "fix_bug"),
+        models=list(spec["models"]),
+        fray_modes=parse_fray_modes(spec.get("fray_modes", "both")),
+        repetitions=parse_repetitions(str(repetitions)) if repetitions is not None else [None],
+    )
+
+
+def cell_state(
+    results_dir: Path, task_type: str, task_config: TaskConfig, cell: MatrixCell
+) -> str:
+    task_results_dir = get_task_results_dir(
+        results_dir,
+        cell.model_id,
+        cell.enable_fray_tools,
+        cell.repetition,
+        task_type,
+        task_config,
+    )
+    json_exists, patch_exists = result_status(task_results_dir, task_config.instance_id)
+    if json_exists and patch_exists:
+        return "complete"
+    if json_exists or patch_exists:
+        return "partial"
+    return "missing"
+
+
+def compute_coverage(
+    spec: SweepSpec, tasks: list[TaskConfig], results_dir: Path
+) -> dict[WorkUnit, str]:
+    """State of every cell of the sweep, keyed by work unit, in sweep order."""
+    coverage = {}
+    for task in tasks:
+        for cell in spec.cells():
+            unit = WorkUnit(
+                instance_id=task.instance_id,
+                model_id=cell.model_id,
+                enable_fray_tools=cell.enable_fray_tools,
+                repetition=cell.repetition,
+            )
+            coverage[unit] = cell_state(results_dir, spec.task_type, task, cell)
+    return coverage
+
+
+def write_jobs(jobs_file: Path, coverage: dict[WorkUnit, str]) -> int:
+    """Write the cells that are not complete as a JSONL job list.
+
+    Returns:
+        int: Number of jobs written.
+    """
+    jobs_file.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with open(jobs_file, "w") as f:
+        for unit, state in coverage.items():
+            if state == "complete":
+                continue
+            job = {
+                "instance_id": unit.instance_id,
+                "model_id": unit.model_id,
+                "enable_fray_tools": unit.enable_fray_tools,
+                "repetition": unit.repetition,
+                "state": state,
+            }
+            f.write(json.dumps(job) + "\n")
+            count += 1
+    return count
+
+
+def load_jobs(jobs_file: Path) -> dict[str, list[MatrixCell]]:
+    """Load a job list as instance_id -> cells to run, in file order."""
+    task_cells: dict[str, list[MatrixCell]] = defaultdict(list)
+    with open(jobs_file) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            job = json.loads(line)
+            task_cells[job["instance_id"]].append(
+                MatrixCell(
+                    model_id=job["model_id"],
+                    enable_fray_tools=job["enable_fray_tools"],
+                    repetition=job.get("repetition"),
+                )
+            )
+    return dict(task_cells)
+
+
+def print_report(spec: SweepSpec, coverage: dict[WorkUnit, str], verbose: bool = False):
+    """Print completeness per model, Fray mode and repetition."""
+    by_cell: dict[tuple, Counter] = defaultdict(Counter)
+    incomplete: dict[tuple, list[str]] = defaultdict(list)
+    for unit, state in coverage.items():
+        key = (unit.model_id, unit.enable_fray_tools, unit.repetition)
+        by_cell[key][state] += 1
+        if state != "complete":
+            incomplete[key].append(f"{unit.instance_id} ({state})")
+
+    print("=" * 100)
+    print("COVERAGE REPORT")
+    print("=" * 100)
+    for model_id in spec.models:
+        print(f"\n{model_id}")
+        print("-" * 100)
+        for fray in spec.fray_modes:
+            print(f"  {'with_fray' if fray else 'without_fray'}:")
+            for rep in spec.repetitions:
+                key = (model_id, fray, rep)
+                counts = by_cell[key]
+                total = sum(counts.values())
+                label = f"rep_{rep}" if rep is not None else "no_rep"
+                if counts["complete"] == total:
+                    print(f"    ✓ {label}: {total}/{total}")
+                    continue
+                print(
+                    f"    ⚠️  {label}: {counts['complete']}/{total} "
+                    f"({counts['missing']} missing, {counts['partial']} partial)"
+                )
+                if verbose:
+                    for entry in incomplete[key]:
+                        print(f"        - {entry}")
+
+    totals = Counter(coverage.values())
+    print("\n" + "=" * 100)
+    print(
+        f"Complete: {totals['complete']}/{len(coverage)} cells, "
+        f"missing: {totals['missing']}, partial: {totals['partial']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report sweep coverage and emit (or run) the missing cells",
+        epilog="Arguments not listed here are passed on to run_agent.py with --run.",
+    )
+    parser.add_argument(
+        "--spec",
+        type=Path,
+        required=True,
+        help="Sweep spec JSON (tasks_file, task_type, models, fray_modes, repetitions)",
+    )
+    parser.add_argument(
+        "--results-dir",
+        type=Path,
+        default=Path("results"),
+        help="Results directory to check (default: results/)",
+    )
+    parser.add_argument(
+        "--jobs-file",
+        type=Path,
+        default=None,
+        help="Write the missing and partial cells to this JSONL job list",
+    )
+    parser.add_argument(
+        "--run",
+        action="store_true",
+        help="Run the missing cells with run_agent.py (implies a job list, by default "
+        "<results-dir>/missing_jobs.jsonl)",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="List the incomplete tasks of every cell",
+    )
+    args, run_agent_args = parser.parse_known_args()
+
+    spec = load_sweep_spec(args.spec)
+    tasks = load_tasks(spec.tasks_file)
+    coverage = compute_coverage(spec, tasks, args.results_dir)
+    print_report(spec, coverage, verbose=args.verbose)
+
+    jobs_file = args.jobs_file
+    if args.run and jobs_file is None:
+        jobs_file = args.results_dir / "missing_jobs.jsonl"
+    if jobs_file is None:
+        return 0
+
+    count = write_jobs(jobs_file, coverage)
+    print(f"Wrote {count} job(s) to {jobs_file}")
+    if not args.run or count == 0:
+        return 0
+
+    command = [
+        sys.executable,
+        str(Path(__file__).resolve().parent / "run_agent.py"),
+        "--tasks-file",
+        str(spec.tasks_file),
+        "--task-type",
+        spec.task_type,
+        "--results-dir",
+        str(args.results_dir),
+        "--jobs-file",
+        str(jobs_file),
+        *run_agent_args,
+    ]
+    print(f"Running: {' '.join(command)}")
+    return subprocess.run(command).returncode
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,107 @@
+"""Stream conversation events to an append-only JSONL file.
+
+Events are written as they happen through a conversation callback instead
+of being serialized from memory once the run is over, so a run that times
+out or crashes still leaves its trace on disk and writing the result file
+does not grow with the length of the conversation:
+
+    {task_results_dir}/{instance_id}.events.jsonl   one event per line
+
+Writes are flushed and fsynced in batches (every `fsync_every` events or
+`fsync_interval` seconds, whichever comes first), so a killed process loses
+at most the last batch.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+EVENTS_SUFFIX = ".events.jsonl"
+# Events written between fsyncs
+DEFAULT_FSYNC_EVERY = 32
+# Seconds between fsyncs, however few events were written
+DEFAULT_FSYNC_INTERVAL = 2.0
+
+
+def events_path(task_results_dir: Path, instance_id: str) -> Path:
+    return task_results_dir / f"{instance_id}{EVENTS_SUFFIX}"
+
+
+class EventLog:
+    """Conversation callback appending every event to a JSONL file."""
+
+    def __init__(
+        self,
+        path: Path,
+        fsync_every: int = DEFAULT_FSYNC_EVERY,
+        fsync_interval: float = DEFAULT_FSYNC_INTERVAL,
+    ):
+        """Open the log, replacing the events of an earlier run.
+
+        Args:
+            path: File to write the events to.
+            fsync_every: Events written between fsyncs.
+            fsync_interval: Maximum seconds between fsyncs.
+        """
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.count = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "w", encoding="utf-8")
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def __call__(self, event):
+        if self._file.closed:
+            return
+        self._file.write(json.dumps(event.model_dump(mode="json"), default=str) + "\n")
+        self.count += 1
+        self._pending += 1
+        if (
+            self._pending >= self.fsync_every
+            or time.monotonic() - self._last_sync >= self.fsync_interval
+        ):
+            self.sync()
+
+    def sync(self):
+        """Flush buffered events to disk."""
+        if self._file.closed or not self._pending:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.sync()
+        self._file.close()
+
+    def __enter__(self) -> "EventLog":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_events(path: Path) -> list[dict]:
+    """Load the events of a log.
+
+    A truncated last line (the process was killed mid-write) is skipped, and
+    a missing log (the run died before its agent started) has no events.
+    """
+    events = []
+    if not path.exists():
+        return events
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return events
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""Export run results to Parquet, one row per run.
+
+Walking thousands of result JSONs for every question is slow; the export
+is a columnar dataset that DuckDB, pandas or Polars query directly:
+
+    duckdb -c "SELECT model_id, avg(success::int) FROM 'results_parquet/*.parquet' GROUP BY 1"
+
+Exports are incremental. Every run appends one Parquet part file holding
+the results that are new or changed since the last export, and
+_manifest.jsonl records what has been exported. A result that changed
+after it was exported (e.g. a rerun) appears again in a later part: keep
+the row with the latest exported_at per result_file, or rebuild the
+dataset with --full.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from concurrency_bench.patch_store import patch_hash, split_file_diffs, strip_artefacts
+
+MANIFEST_FILE = "_manifest.jsonl"
+# Top-level timing spans exported as <phase>_seconds columns (see spans.py)
+SPAN_PHASES = ("setup", "agent", "verify", "diff")
+CONFIGS = ("with_fray", "without_fray")
+_REP_DIR = re.compile(r"rep_(\d+)")
+
+SCHEMA = pa.schema(
+    [
+        ("result_file", pa.string()),
+        ("model_id", pa.string()),
+        ("config", pa.string()),
+        ("enable_fray_tools", pa.bool_()),
+        ("repetition", pa.int32()),
+        ("task_type", pa.string()),
+        ("benchmark_category", pa.string()),
+        ("subcategory", pa.string()),
+        ("instance_id", pa.string()),
+        ("success", pa.bool_()),
+        *[(f"{phase}_seconds", pa.float64()) for phase in SPAN_PHASES],
+        ("cpu_seconds", pa.float64()),
+        ("peak_rss_mb", pa.float64()),
+        ("prompt_tokens", pa.int64()),
+        ("completion_tokens", pa.int64()),
+        ("cache_read_tokens", pa.int64()),
+        ("event_count", pa.int64()),
+        ("patch_hash", pa.string()),
+        ("patch_bytes", pa.int64()),
+        ("patch_files", pa.int32()),
+        ("result_mtime", pa.timestamp("us", tz="UTC")),
+        ("exported_at", pa.timestamp("us", tz="UTC")),
+    ]
+)
+
+
+def result_layout(relative: Path) -> tuple[str, str, int | None, str, str] | None:
+    """(model, config, repetition, task_type, category) of a result path.
+
+    Results live in {model}/{config}/[rep_N/]{task_type}/{category}/{id}.json
+    (see run_agent.get_task_results_dir); runs without --repetition have no
+    rep_N component.
+
+    Returns:
+        The layout fields, or None if the path is not a result.
+    """
+    parts = list(relative.parts)
+    repetition = None
+    if len(parts) == 6 and (rep := _REP_DIR.fullmatch(parts[2])):
+        repetition = int(rep.group(1))
+        del parts[2]
+    if len(parts) != 5 or parts[1] not in CONFIGS:
+        return None
+    model_id, config, task_type, category, _ = parts
+    return model_id, config, repetition, task_type, category
+
+
+def find_result_files(results_dir: Path) -> list[Path]:
+    """Result JSONs of the results tree, with or without a rep_N level.
+
+    Top-level files and hidden directories (e.g. .patch_store) are
+    bookkeeping; any other JSON that is not a result is reported.
+    """
+    result_files = []
+    for path in sorted(results_dir.rglob("*.json")):
+        relative = path.relative_to(results_dir)
+        if len(relative.parts) == 1 or any(part.startswith(".") for part in relative.parts):
+            continue
+        if result_layout(relative) is None:
+            print(f"Warning: {relative} is not in a results layout, skipping")
+            continue
+        result_files.append(path)
+    return result_files
+
+
+def load_manifest(output_dir: Path) -> dict[str, float]:
+    """result_file -> mtime of the exported version."""
+    manifest_file = output_dir / MANIFEST_FILE
+    exported = {}
+    if not manifest_file.exists():
+        return exported
+    with open(manifest_file) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                exported[entry["result_file"]] = entry["mtime"]
+    return exported
+
+
+def result_row(results_dir: Path, result_file: Path, exported_at: datetime) -> dict:
+    """One run as a row of SCHEMA."""
+    with open(result_file) as f:
+        result = json.load(f)
+    model_id, config, repetition, task_type, category = result_layout(
+        result_file.relative_to(results_dir)
+    )
+
+    timings = {span["name"]: span for span in result.get("timings", [])}
+    token_usage = result.get("token_usage") or {}
+    patch_file = result_file.with_suffix(".patch")
+    patch_text = patch_file.read_text() if patch_file.exists() else None
+    source_patch = strip_artefacts(patch_text) if patch_text is not None else None
+
+    if "event_count" in result:
+        event_count = result["event_count"]
+    else:
+        event_count = len(result["events"]) if "events" in result else None
+
+    return {
+        "result_file": str(result_file.relative_to(results_dir)),
+        "model_id": model_id,
+        "config": config,
+        "enable_fray_tools": config == "with_fray",
+        "repetition": repetition,
+        "task_type": result.get("task_type", task_type),
+        "benchmark_category": result.get("benchmark_category", category),
+        "subcategory": result.get("subcategory"),
+        "instance_id": result.get("instance_id", result_file.stem),
+        "success": result.get("success"),
+        **{
+            f"{phase}_seconds": timings[phase].get("wall_seconds") if phase in timings else None
+            for phase in SPAN_PHASES
+        },
+        "cpu_seconds": sum(s.get("cpu_seconds", 0.0) for s in timings.values()) if timings else None,
+        "peak_rss_mb": max((s.get("peak_rss_mb", 0.0) for s in timings.values()), default=None),
+        "prompt_tokens": token_usage.get("prompt_tokens"),
+        "completion_tokens": token_usage.get("completion_tokens"),
+        "cache_read_tokens": token_usage.get("cache_read_tokens"),
+        "event_count": event_count,
+        "patch_hash": patch_hash(patch_text) if patch_text is not None else None,
+        "patch_bytes": len(source_patch.encode()) if source_patch is not None else None,
+        "patch_files": len(split_file_diffs(source_patch)) if source_patch is not None else None,
+        "result_mtime": datetime.fromtimestamp(result_file.stat().st_mtime, timezone.utc),
+        "exported_at": exported_at,
+    }
+
+
+def export_results(results_dir: Path, output_dir: Path, full: bool = False) -> Path | None:
+    """Append the new and changed results to the Parquet dataset.
+
+    Args:
+        results_dir: Root of the results tree.
+        output_dir: Dataset directory (part files and manifest).
+        full: Drop the existing dataset and export everything again.
+
+    Returns:
+        The part file written, or None if nothing was new.
+    """
+    if full and output_dir.exists():
+        shutil.rmtree(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    exported = load_manifest(output_dir)
+
+    exported_at = datetime.now(timezone.utc)
+    rows = []
+    mtimes = {}
+    for result_file in find_result_files(results_dir):
+        key = str(result_file.relative_to(results_dir))
+        mtime = result_file.stat().st_mtime
+        if exported.get(key) == mtime:
+            continue
+        try:
+            rows.append(result_row(results_dir, result_file, exported_at))
+        except Exception as e:
+            print(f"Error exporting {result_file}: {e}")
+            continue
+        mtimes[key] = mtime
+
+    if not rows:
+        print(f"No new results to export ({len(exported)} already exported)")
+        return None
+
+    part_file = output_dir / f"part-{exported_at.strftime('%Y%m%dT%H%M%S%f')}.parquet"
+    tmp = part_file.with_suffix(f".tmp-{os.getpid()}")
+    pq.write_table(pa.Table.from_pylist(rows, schema=SCHEMA), tmp)
+    os.replace(tmp, part_file)
+    # Only recorded once the part is in place, so a crash re-exports rather than loses rows
+    with open(output_dir / MANIFEST_FILE, "a") as f:
+        for key, mtime in mtimes.items():
+            f.write(json.dumps({"result_file": key, "mtime": mtime}) + "\n")
+
+    print(f"Exported {len(rows)} runs to {part_file}")
+    return part_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export run results to Parquet")
+    parser.add_argument(
+        "--results-dir",
+        type=Path,
+        default=Path("results"),
+        help="Directory with stored results (default: results/)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("results_parquet"),
+        help="Parquet dataset directory to append to (default: results_parquet/)",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Rebuild the dataset from scratch instead of appending new results",
+    )
+    args = parser.parse_args()
+
+    if not args.results_dir.exists():
+        print(f"Error: Results directory not found: {args.results_dir}")
+        return 1
+    export_results(args.results_dir, args.output_dir, full=args.full)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
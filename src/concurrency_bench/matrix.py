@@ -0,0 +1,280 @@
+"""Matrix runs: many models × Fray modes × repetitions sharing one task setup."""
+
+import shutil
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+
+from concurrency_bench.rate_limit import get_rate_limiter, set_rate_limiter
+from concurrency_bench.resources import get_governor, set_governor
+from concurrency_bench.response_cache import get_response_cache, set_response_cache
+from concurrency_bench.run_agent import (
+    PreparedTask,
+    cell_key,
+    fork_prepared_task,
+    get_task_results_dir,
+    prepare_task,
+    result_status,
+    run_prepared_task,
+)
+from concurrency_bench.task_config import TaskConfig
+from concurrency_bench.work_queue import Lease
+from concurrency_bench.workers import worker_context
+
+FRAY_MODES = {
+    "with": [True],
+    "without": [False],
+    "both": [True, False],
+}
+
+
+@dataclass
+class MatrixCell:
+    """One (model, Fray mode, repetition) combination to run a task with."""
+
+    model_id: str
+    enable_fray_tools: bool
+    repetition: int | None
+
+    def describe(self) -> str:
+        fray_mode = "with_fray" if self.enable_fray_tools else "without_fray"
+        rep = f"rep_{self.repetition}" if self.repetition is not None else "no_rep"
+        return f"{self.model_id}/{fray_mode}/{rep}"
+
+
+def parse_repetitions(spec: str) -> list[int]:
+    """Parse a repetition spec such as "1-5", "2" or "1,3,5-7".
+
+    Raises:
+        ValueError: If the spec is malformed or a range is empty.
+    """
+    repetitions = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = (int(x) for x in part.split("-", 1))
+            if end < start:
+                raise ValueError(f"Empty repetition range: {part}")
+            repetitions.extend(range(start, end + 1))
+        else:
+            repetitions.append(int(part))
+    if not repetitions:
+        raise ValueError(f"No repetitions in spec: {spec!r}")
+    return sorted(set(repetitions))
+
+
+def parse_fray_modes(spec: str) -> list[bool]:
+    """Parse a Fray mode spec ("with", "without" or "both")."""
+    if spec not in FRAY_MODES:
+        raise ValueError(
+            f"Unknown Fray mode {spec!r}, expected one of: {', '.join(FRAY_MODES)}"
+        )
+    return FRAY_MODES[spec]
+
+
+def expand_matrix(
+    model_ids: list[str],
+    fray_modes: list[bool],
+    repetitions: list[int | None],
+) -> list[MatrixCell]:
+    """Build the cross product of models, Fray modes and repetitions."""
+    return [
+        MatrixCell(model_id=model_id, enable_fray_tools=fray, repetition=rep)
+        for model_id in model_ids
+        for fray in fray_modes
+        for rep in repetitions
+    ]
+
+
+def init_worker(governor, rate_limiter, response_cache):
+    """Install the parent's governor, rate limiter and response cache in a worker."""
+    set_governor(governor)
+    set_rate_limiter(rate_limiter)
+    set_response_cache(response_cache)
+
+
+def run_cell(
+    prepared: PreparedTask,
+    cell: MatrixCell,
+    base_path: Path,
+    results_dir: Path,
+    api_key: str | None,
+    timeout: int,
+    keep_result: bool,
+    agent_options: dict | None = None,
+    lease: Lease | None = None,
+) -> dict:
+    """Run one matrix cell on its own fork of the prepared workspace.
+
+    Executed in a worker process, so the SIGALRM based agent timeout in
+    run_prepared_task still runs on a main thread. The fork is made when the
+    cell starts and removed when it ends, so at most one copy per worker
+    exists at a time.
+    """
+    fork = None
+    try:
+        fork = fork_prepared_task(prepared, base_path)
+        result = run_prepared_task(
+            fork,
+            model_id=cell.model_id,
+            results_dir=results_dir,
+            api_key=api_key,
+            enable_fray_tools=cell.enable_fray_tools,
+            repetition=cell.repetition,
+            timeout=timeout,
+            agent_options=agent_options,
+            lease=lease,
+        )
+        return {"success": result.success}
+    except Exception as e:
+        print(traceback.format_exc())
+        return {"success": False, "error": str(e)}
+    finally:
+        if fork is not None and not keep_result and fork.workdir.exists():
+            shutil.rmtree(fork.workdir, ignore_errors=True)
+
+
+def pending_cells(
+    task_config: TaskConfig,
+    task_type: str,
+    cells: list[MatrixCell],
+    results_dir: Path,
+) -> list[MatrixCell]:
+    """Drop cells whose result JSON and patch already exist."""
+    pending = []
+    for cell in cells:
+        task_results_dir = get_task_results_dir(
+            results_dir,
+            cell.model_id,
+            cell.enable_fray_tools,
+            cell.repetition,
+            task_type,
+            task_config,
+        )
+        json_exists, patch_exists = result_status(task_results_dir, task_config.instance_id)
+        if not (json_exists and patch_exists):
+            pending.append(cell)
+    return pending
+
+
+def cell_result(task_config: TaskConfig, cell: MatrixCell, outcome: dict) -> dict:
+    """Build the summary entry for one executed cell."""
+    return {
+        "instance_id": task_config.instance_id,
+        "model_id": cell.model_id,
+        "enable_fray_tools": cell.enable_fray_tools,
+        "repetition": cell.repetition,
+        **outcome,
+    }
+
+
+def run_matrix_task(
+    task_config: TaskConfig,
+    task_type: str,
+    cells: list[MatrixCell],
+    base_path: Path,
+    results_dir: Path,
+    api_key: str | None = None,
+    keep_result: bool = False,
+    timeout: int = 1200,
+    max_workers: int = 4,
+    prepared: PreparedTask | None = None,
+    agent_options: dict | None = None,
+    leases: dict | None = None,
+) -> list[dict]:
+    """Run a task for every matrix cell, preparing the workspace only once.
+
+    The clone/build/Fray setup and git baseline are done once; each cell then
+    runs in a worker process on its own copy of the prepared workspace, made
+    when the cell starts.
+
+    Args:
+        task_config: Task object from JSONL.
+        task_type: Type of task ('fix_bug' or 'run_gold').
+        cells: Matrix cells to run.
+        base_path: Base path to resolve relative paths from.
+        results_dir: Directory to save conversation results.
+        api_key: Optional API key for the LLM.
+        keep_result: Keep the workspaces after completion.
+        timeout: Agent timeout in seconds, per cell.
+        max_workers: Maximum number of cells running at once.
+        prepared: Workspace already prepared in the background (see
+            pipeline.py); setup is skipped when given.
+        agent_options: Extra keyword arguments for the agents.
+        leases: Work queue claims of the cells, keyed by cell_key (see
+            run_prepared_task).
+
+    Returns:
+        list[dict]: One entry per executed cell with instance_id, model_id,
+        enable_fray_tools, repetition, success and (on failure) error.
+    """
+    print(f"\n{'=' * 80}")
+    print(f"Running task: {task_config.instance_id} ({len(cells)} matrix cells)")
+    print(f"Description: {task_config.description}")
+    print(f"Task type: {task_type}")
+    print(f"{'=' * 80}\n")
+
+    pending = pending_cells(task_config, task_type, cells, results_dir)
+    if len(pending) < len(cells):
+        print(f"✓ Skipping {len(cells) - len(pending)} cell(s) - results already exist")
+    cells = pending
+    if not cells:
+        print("All matrix cells already have results, skipping setup")
+        if prepared is not None and not keep_result:
+            shutil.rmtree(prepared.workdir, ignore_errors=True)
+        return []
+
+    try:
+        if prepared is None:
+            prepared = prepare_task(
+                task_config, task_type, base_path, cleanup_on_error=not keep_result
+            )
+    except Exception as e:
+        print(traceback.format_exc())
+        print(f"Error preparing task {task_config.instance_id}: {e}")
+        return [
+            cell_result(task_config, cell, {"success": False, "error": str(e)})
+            for cell in cells
+        ]
+
+    results = []
+    try:
+        # Workers share the parent's governor, rate limiter and response cache
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=worker_context(),
+            initializer=init_worker,
+            initargs=(get_governor(), get_rate_limiter(), get_response_cache()),
+        ) as executor:
+            futures = {
+                executor.submit(
+                    run_cell,
+                    prepared,
+                    cell,
+                    base_path,
+                    results_dir,
+                    api_key,
+                    timeout,
+                    keep_result,
+                    agent_options,
+                    (leases or {}).get(cell_key(cell)),
+                ): cell
+                for cell in cells
+            }
+            for future in as_completed(futures):
+                cell = futures[future]
+                outcome = future.result()
+                print(
+                    f"Completed: {task_config.instance_id} [{cell.describe()}] - "
+                    f"Success: {outcome['success']}"
+                )
+                results.append(cell_result(task_config, cell, outcome))
+    finally:
+        if not keep_result and prepared.workdir.exists():
+            print(f"\nCleaning up base workdir: {prepared.workdir}")
+            shutil.rmtree(prepared.workdir, ignore_errors=True)
+
+    return results
@@ -0,0 +1,75 @@
+"""Unbiased pass@k with bootstrap confidence intervals.
+
+With c successes out of n runs of a task, the probability that at least
+one of k runs drawn without replacement succeeds is
+
+    pass@k = 1 - C(n - c, k) / C(n, k)
+           = 1 - prod_{i=0}^{k-1} (n - c - i) / (n - i)
+
+(Chen et al., "Evaluating Large Language Models Trained on Code", 2021).
+Using any(success) as pass@k is only right when k == n and overestimates
+pass@k whenever more runs were made.
+
+Everything works on dense arrays (models x tasks x reps), so the
+statistics of a large sweep are a handful of vectorized operations.
+"""
+
+import numpy as np
+
+# Bootstrap resamples of the task set
+BOOTSTRAP_SAMPLES = 1000
+CONFIDENCE = 0.95
+
+
+def pass_at_k(n: np.ndarray, c: np.ndarray, k: int) -> np.ndarray:
+    """Unbiased pass@k per task.
+
+    Args:
+        n: Runs per task (broadcast against c).
+        c: Successful runs per task.
+        k: Number of samples.
+
+    Returns:
+        np.ndarray: pass@k per task; NaN where fewer than k runs exist.
+    """
+    n = np.asarray(n, dtype=float)
+    c = np.asarray(c, dtype=float)
+    i = np.arange(k)
+    remaining = (n - c)[..., None] - i
+    total = n[..., None] - i
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # A factor hits 0 once fewer than k failures are left: pass@k = 1
+        all_fail = np.prod(np.clip(remaining, 0, None) / total, axis=-1)
+    estimate = 1.0 - all_fail
+    return np.where(np.broadcast_to(n, estimate.shape) >= k, estimate, np.nan)
+
+
+def bootstrap_ci(
+    per_task: np.ndarray,
+    samples: int = BOOTSTRAP_SAMPLES,
+    confidence: float = CONFIDENCE,
+    seed: int = 0,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Mean over tasks with a percentile bootstrap interval (tasks resampled).
+
+    Args:
+        per_task: Scores with tasks on the last axis (e.g. models x tasks).
+        samples: Bootstrap resamples.
+        confidence: Coverage of the interval.
+        seed: Seed of the resampling, so reruns report the same interval.
+
+    Returns:
+        tuple: (mean, low, high), each with the task axis removed.
+    """
+    per_task = np.asarray(per_task, dtype=float)
+    num_tasks = per_task.shape[-1]
+    mean = np.nanmean(per_task, axis=-1) if num_tasks else np.full(per_task.shape[:-1], np.nan)
+    if num_tasks == 0:
+        return mean, mean, mean
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, num_tasks, size=(samples, num_tasks))
+    # (..., samples, tasks) -> (..., samples)
+    resampled = np.nanmean(per_task[..., picks], axis=-1)
+    alpha = (1.0 - confidence) / 2
+    low, high = np.nanpercentile(resampled, [100 * alpha, 100 * (1 - alpha)], axis=-1)
+    return mean, low, high
@@ -0,0 +1,144 @@
+"""Content-addressed store of verification results, keyed by normalized patch.
+
+Many stored patches are identical across models and repetitions (most
+commonly: empty), and SCTBench patches additionally contain compiled
+.class files. Patches are normalized before hashing, so every patch that
+makes the same source change is verified only once per task:
+
+    store_dir/<instance_id>/<hash>.json   verification outcome of one patch
+"""
+
+import hashlib
+import json
+import os
+import re
+import uuid
+from pathlib import Path
+
+# Paths that are build or harness artefacts, not part of a fix
+ARTEFACT_SUFFIXES = (".class", ".jar")
+ARTEFACT_NAMES = ("temp.patch", "golden_patch.diff")
+ARTEFACT_DIRS = (".fray_workdir", ".gradle")
+# Build output roots (Gradle, Maven); a package of the same name below a
+# source root (e.g. src/main/java/org/x/build/) is source
+OUTPUT_DIRS = ("build", "target")
+SOURCE_ROOT = "src"
+
+_DIFF_HEADER = re.compile(r"^diff --git a/(\S+) b/(\S+)", re.MULTILINE)
+# String and char literals, whose whitespace is part of the program
+_LITERAL = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
+
+
+def split_file_diffs(patch_text: str) -> list[tuple[str, str]]:
+    """Split a git diff into (path, section) pairs, one per file."""
+    headers = list(_DIFF_HEADER.finditer(patch_text))
+    sections = []
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(patch_text)
+        sections.append((header.group(2), patch_text[header.start() : end]))
+    return sections
+
+
+def is_artefact(path: str) -> bool:
+    dirs = Path(path).parts[:-1]
+    source_root = dirs.index(SOURCE_ROOT) if SOURCE_ROOT in dirs else len(dirs)
+    return (
+        path.endswith(ARTEFACT_SUFFIXES)
+        or Path(path).name in ARTEFACT_NAMES
+        or any(part in ARTEFACT_DIRS for part in dirs)
+        or any(part in OUTPUT_DIRS for part in dirs[:source_root])
+    )
+
+
+def _collapse_whitespace(text: str) -> str:
+    """Collapse runs of whitespace to one space, except inside literals."""
+    pieces = []
+    position = 0
+    for literal in _LITERAL.finditer(text):
+        pieces.append(re.sub(r"\s+", " ", text[position : literal.start()]))
+        pieces.append(literal.group())
+        position = literal.end()
+    pieces.append(re.sub(r"\s+", " ", text[position:]))
+    return "".join(pieces).strip()
+
+
+def _normalize_section(section: str) -> str:
+    lines = []
+    for line in section.splitlines():
+        if line.startswith(("diff --git", "index ", "similarity index")):
+            continue
+        if line.startswith("@@"):
+            # Line numbers shift with unrelated edits; keep only hunk boundaries
+            lines.append("@@")
+            continue
+        if line.startswith("\\ No newline"):
+            continue
+        if line[:1] in ("+", "-", " ") and not line.startswith(("+++", "---")):
+            body = _collapse_whitespace(line[1:])
+            if body:
+                lines.append(f"{line[0]}{body}")
+            continue
+        lines.append(line.rstrip())
+    return "\n".join(lines)
+
+
+def normalize_patch(patch_text: str) -> str:
+    """Normalize a diff so equivalent source changes compare equal.
+
+    Drops build artefacts, index lines and hunk line numbers, collapses
+    whitespace within lines (outside string literals), drops
+    whitespace-only lines and orders files by path.
+    """
+    sections = [
+        (path, _normalize_section(section))
+        for path, section in split_file_diffs(patch_text)
+        if not is_artefact(path)
+    ]
+    return "\n".join(section for _, section in sorted(sections))
+
+
+def patch_hash(patch_text: str) -> str:
+    """Hash of the normalized patch (empty and artefact-only patches share one)."""
+    return hashlib.sha256(normalize_patch(patch_text).encode()).hexdigest()
+
+
+def strip_artefacts(patch_text: str) -> str:
+    """Remove artefact sections from a diff, keeping the rest verbatim."""
+    if not _DIFF_HEADER.search(patch_text):
+        return patch_text
+    return "".join(
+        section for path, section in split_file_diffs(patch_text) if not is_artefact(path)
+    )
+
+
+class PatchStore:
+    """Verification outcomes shared by all patches with the same normalized hash."""
+
+    def __init__(self, store_dir: Path):
+        self.store_dir = store_dir
+
+    def _path(self, instance_id: str, digest: str) -> Path:
+        return self.store_dir / instance_id / f"{digest}.json"
+
+    def get(self, instance_id: str, patch_text: str) -> dict | None:
+        """Look up the stored outcome for a patch of a task, if any."""
+        path = self._path(instance_id, patch_hash(patch_text))
+        if not path.exists():
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def put(self, instance_id: str, patch_text: str, outcome: dict) -> str:
+        """Store the outcome of verifying a patch.
+
+        Returns:
+            str: The patch hash the outcome is stored under.
+        """
+        digest = patch_hash(patch_text)
+        path = self._path(instance_id, digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".tmp-{uuid.uuid4().hex}")
+        with open(tmp, "w") as f:
+            json.dump({"patch_hash": digest, **outcome}, f, indent=2)
+        os.replace(tmp, path)
+        return digest
@@ -0,0 +1,119 @@
+"""Prepare upcoming tasks in the background while the current agent runs."""
+
+import shutil
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from concurrency_bench.run_agent import PreparedTask, prepare_task
+from concurrency_bench.task_config import TaskConfig
+
+
+@dataclass
+class PrefetchedTask:
+    """Outcome of preparing one task in the background."""
+
+    task_config: TaskConfig
+    prepared: PreparedTask | None = None
+    error: BaseException | None = None
+    skipped: bool = False
+
+
+class SetupPrefetcher:
+    """Iterate over tasks while preparing the next ones in background threads.
+
+    Setup (clone, build, Fray run) is dominated by subprocesses, so threads
+    are enough to overlap it with the agent conversation. At most `prefetch`
+    tasks are being prepared or waiting in the ready queue at any time,
+    which bounds the disk space used by prepared workspaces.
+
+    Usage:
+        with SetupPrefetcher(tasks, "fix_bug", base_path, prefetch=2) as prefetcher:
+            for item in prefetcher:
+                ...
+    """
+
+    def __init__(
+        self,
+        tasks: list[TaskConfig],
+        task_type: str,
+        base_path: Path,
+        prefetch: int = 1,
+        should_prepare: Callable[[TaskConfig], bool] | None = None,
+        keep_result: bool = False,
+    ):
+        """Initialize the prefetcher.
+
+        Args:
+            tasks: Tasks to prepare, in execution order.
+            task_type: Type of task ('fix_bug' or 'run_gold').
+            base_path: Base path to resolve relative paths from.
+            prefetch: Number of tasks prepared ahead of the consumer.
+            should_prepare: Predicate deciding whether a task needs to run at
+                all; tasks it rejects are yielded as skipped without setup.
+            keep_result: Keep workdirs of tasks whose setup failed.
+        """
+        self.tasks = tasks
+        self.task_type = task_type
+        self.base_path = base_path
+        self.prefetch = max(prefetch, 1)
+        self.should_prepare = should_prepare or (lambda task: True)
+        self.keep_result = keep_result
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.prefetch, thread_name_prefix="setup-prefetch"
+        )
+        self._pending: deque[tuple[TaskConfig, Future | None]] = deque()
+        self._next_index = 0
+
+    def _fill(self):
+        """Submit setup work until the ready queue holds `prefetch` tasks."""
+        while len(self._pending) < self.prefetch and self._next_index < len(self.tasks):
+            task = self.tasks[self._next_index]
+            self._next_index += 1
+            if not self.should_prepare(task):
+                self._pending.append((task, None))
+                continue
+            future = self._executor.submit(
+                prepare_task,
+                task,
+                self.task_type,
+                self.base_path,
+                cleanup_on_error=not self.keep_result,
+            )
+            self._pending.append((task, future))
+
+    def __iter__(self) -> Iterator[PrefetchedTask]:
+        self._fill()
+        while self._pending:
+            task, future = self._pending.popleft()
+            # Start preparing the next task before blocking on this one
+            self._fill()
+            if future is None:
+                yield PrefetchedTask(task_config=task, skipped=True)
+                continue
+            try:
+                prepared = future.result()
+            except Exception as e:
+                yield PrefetchedTask(task_config=task, error=e)
+                continue
+            yield PrefetchedTask(task_config=task, prepared=prepared)
+
+    def close(self):
+        """Stop background setup and remove workspaces that were never used."""
+        for _, future in self._pending:
+            if future is not None:
+                future.cancel()
+        self._executor.shutdown(wait=True)
+        while self._pending:
+            _, future = self._pending.popleft()
+            if future is None or future.cancelled() or future.exception() is not None:
+                continue
+            shutil.rmtree(future.result().workdir, ignore_errors=True)
+
+    def __enter__(self) -> "SetupPrefetcher":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,211 @@
+"""Process-wide rate limiting of LLM calls per provider.
+
+Every agent builds its own LLM, so parallel runs against the same provider
+would otherwise hit its limits uncoordinated and trigger 429 storms. All
+calls go through one token bucket per provider (requests and tokens per
+minute). Waiters are served first-come first-served, so no worker starves,
+and a rate-limit error pauses the whole provider with jittered exponential
+backoff instead of having every worker retry at once.
+
+State lives in multiprocessing primitives, so, like the resource governor,
+one limiter is shared by threads and by matrix worker processes.
+"""
+
+import random
+import time
+
+from concurrency_bench.workers import worker_context
+
+# Seconds the head of the queue may go silent before it is presumed dead
+# (e.g. a cancelled run's process was killed) and skipped
+HEAD_GRACE_SECONDS = 10.0
+# Backoff after rate-limit errors: base * 2^consecutive failures, capped, jittered
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 120.0
+# Rate-limit errors tolerated per call before giving up
+MAX_RATE_LIMIT_RETRIES = 6
+# Wait before retrying a timeout or server error: base * 2^attempt, jittered
+TRANSIENT_RETRY_SECONDS = 2.0
+
+_rate_limiter: "RateLimiter | None" = None
+
+
+def provider_of(model_id: str) -> str:
+    """Provider prefix of a LiteLLM model id, e.g. "openai" for "openai/gpt-5.2"."""
+    return model_id.split("/", 1)[0] if "/" in model_id else model_id
+
+
+def parse_rate_limit(spec: str) -> tuple[str, float, float]:
+    """Parse "provider=RPM:TPM"; either limit may be omitted or 0 (unlimited).
+
+    Raises:
+        ValueError: If the spec is malformed.
+    """
+    try:
+        provider, limits = spec.split("=", 1)
+        rpm, _, tpm = limits.partition(":")
+        return provider.strip(), float(rpm or 0), float(tpm or 0)
+    except ValueError:
+        raise ValueError(f"Invalid rate limit {spec!r}, expected 'provider=RPM:TPM'")
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    return "RateLimit" in type(error).__name__ or getattr(error, "status_code", None) == 429
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Timeouts, dropped connections and server errors, which are worth retrying."""
+    name = type(error).__name__
+    return (
+        "Timeout" in name
+        or "Connection" in name
+        or (getattr(error, "status_code", None) or 0) >= 500
+    )
+
+
+class _Bucket:
+    """Shared token-bucket state of one provider."""
+
+    def __init__(self, context, rpm: float, tpm: float):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = context.Value("d", rpm, lock=False)
+        self.tokens = context.Value("d", tpm, lock=False)
+        self.updated = context.Value("d", time.monotonic(), lock=False)
+        self.paused_until = context.Value("d", 0.0, lock=False)
+        self.failures = context.Value("i", 0, lock=False)
+        self.next_ticket = context.Value("q", 0, lock=False)
+        self.now_serving = context.Value("q", 0, lock=False)
+        self.head_deadline = context.Value("d", 0.0, lock=False)
+
+    def refill(self, now: float):
+        elapsed = max(now - self.updated.value, 0.0)
+        if self.rpm:
+            self.requests.value = min(self.rpm, self.requests.value + elapsed * self.rpm / 60)
+        if self.tpm:
+            self.tokens.value = min(self.tpm, self.tokens.value + elapsed * self.tpm / 60)
+        self.updated.value = now
+
+    def wait_time(self, tokens: float, now: float) -> float:
+        """Seconds until a request of `tokens` fits (0 if it fits now)."""
+        waits = [self.paused_until.value - now]
+        if self.rpm and self.requests.value < 1:
+            waits.append((1 - self.requests.value) * 60 / self.rpm)
+        if self.tpm:
+            # Requests larger than the whole bucket wait for a full bucket
+            needed = min(tokens, self.tpm)
+            if self.tokens.value < needed:
+                waits.append((needed - self.tokens.value) * 60 / self.tpm)
+        return max(max(waits), 0.0)
+
+    def advance(self, now: float):
+        self.now_serving.value += 1
+        self.head_deadline.value = now + HEAD_GRACE_SECONDS
+
+
+class RateLimiter:
+    """Token buckets per provider with fair queuing and shared backoff."""
+
+    def __init__(self, limits: dict[str, tuple[float, float]]):
+        """Initialize the limiter.
+
+        Args:
+            limits: provider -> (requests per minute, tokens per minute);
+                0 means unlimited. Providers without limits are not throttled.
+        """
+        context = worker_context()
+        self._condition = context.Condition()
+        self._buckets = {
+            provider: _Bucket(context, rpm, tpm) for provider, (rpm, tpm) in limits.items()
+        }
+
+    def acquire(self, provider: str, tokens: float = 0.0) -> float:
+        """Block until the provider's limits allow a request of `tokens` tokens.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        bucket = self._buckets.get(provider)
+        if bucket is None:
+            return 0.0
+
+        start = time.monotonic()
+        with self._condition:
+            ticket = bucket.next_ticket.value
+            bucket.next_ticket.value += 1
+            if bucket.now_serving.value == ticket:
+                bucket.head_deadline.value = start + HEAD_GRACE_SECONDS
+            while True:
+                now = time.monotonic()
+                bucket.refill(now)
+                timeout = HEAD_GRACE_SECONDS / 2
+                if bucket.now_serving.value == ticket:
+                    wait = bucket.wait_time(tokens, now)
+                    if wait <= 0:
+                        break
+                    # Show we are alive while waiting for the bucket
+                    bucket.head_deadline.value = now + HEAD_GRACE_SECONDS
+                    timeout = min(wait, timeout)
+                elif now > bucket.head_deadline.value:
+                    print(f"Rate limiter: skipping stalled waiter for {provider}")
+                    bucket.advance(now)
+                    self._condition.notify_all()
+                    continue
+                self._condition.wait(timeout)
+
+            if bucket.rpm:
+                bucket.requests.value -= 1
+            if bucket.tpm:
+                bucket.tokens.value -= min(tokens, bucket.tpm)
+            bucket.advance(time.monotonic())
+            self._condition.notify_all()
+        return time.monotonic() - start
+
+    def adjust(self, provider: str, tokens: float):
+        """Correct an estimate: return unused tokens (or charge extra if negative)."""
+        bucket = self._buckets.get(provider)
+        if bucket is None or not bucket.tpm:
+            return
+        with self._condition:
+            bucket.refill(time.monotonic())
+            bucket.tokens.value = min(bucket.tpm, bucket.tokens.value + tokens)
+            self._condition.notify_all()
+
+    def backoff(self, provider: str) -> float:
+        """Pause the provider after a rate-limit error.
+
+        Consecutive failures double the pause; jitter keeps workers from
+        retrying in lockstep.
+
+        Returns:
+            float: Seconds the provider is paused for.
+        """
+        bucket = self._buckets.get(provider)
+        if bucket is None:
+            return 0.0
+        with self._condition:
+            delay = min(BACKOFF_BASE_SECONDS * 2**bucket.failures.value, BACKOFF_MAX_SECONDS)
+            delay *= random.uniform(0.5, 1.5)
+            bucket.failures.value += 1
+            bucket.paused_until.value = max(
+                bucket.paused_until.value, time.monotonic() + delay
+            )
+        print(f"Rate limited by {provider}, pausing for {delay:.1f}s")
+        return delay
+
+    def succeeded(self, provider: str):
+        """Reset the backoff after a successful call."""
+        bucket = self._buckets.get(provider)
+        if bucket is not None and bucket.failures.value:
+            with self._condition:
+                bucket.failures.value = 0
+
+
+def set_rate_limiter(rate_limiter: "RateLimiter | None"):
+    """Install the process-wide rate limiter."""
+    global _rate_limiter
+    _rate_limiter = rate_limiter
+
+
+def get_rate_limiter() -> "RateLimiter | None":
+    return _rate_limiter
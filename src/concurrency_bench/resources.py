@@ -0,0 +1,371 @@
+"""Resource measurement and admission control for builds and Fray runs.
+
+Builds (Gradle/Maven) and Fray JVMs are the memory- and CPU-hungry parts of
+a task. When several of them run at once (setup prefetching, matrix cells)
+the machine can run out of memory, and timing-sensitive Fray runs get
+noisy. The governor admits a phase only when its expected memory and CPUs
+are free, and pins the phase to its own CPU set.
+
+Pinning uses sched_setaffinity on the calling thread (the same mechanism
+as taskset), which every subprocess started from that thread inherits.
+
+Builds and Fray runs the agent starts during a conversation are admitted
+too (see admit_agent_command), against the task's verification demand.
+"""
+
+import math
+import os
+import re
+import resource
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from concurrency_bench.task_config import TaskConfig
+from concurrency_bench.workers import worker_context
+
+# Assumed demands for categories without history
+DEFAULT_DEMANDS = {
+    "sctbench": {"memory_mb": 1024.0, "cpus": 1},
+    "real-world": {"memory_mb": 6144.0, "cpus": 4},
+}
+FALLBACK_DEMAND = DEFAULT_DEMANDS["real-world"]
+# Interval between memory samples of the process tree
+SAMPLE_INTERVAL = 0.5
+# Seconds between checks for leases held by dead processes while waiting
+RECLAIM_INTERVAL = 5.0
+# Agent commands that build or run Fray, admitted like the task's verification
+HEAVY_COMMAND = re.compile(r"\b(gradlew?|mvnw?|javac|fray)\b")
+
+_governor: "ResourceGovernor | None" = None
+# Task whose agent runs in this process (one conversation per process)
+_agent_task: TaskConfig | None = None
+
+
+def _child_cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _process_tree() -> dict[int, list[int]]:
+    """Parent PID -> child PIDs of all processes (Linux /proc only)."""
+    children: dict[int, list[int]] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return children
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields after ')' are fixed
+                fields = f.read().rsplit(")", 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+
+def _descendants(roots: list[int], tree: dict[int, list[int]]) -> list[int]:
+    """The given PIDs and all of their descendants."""
+    result = []
+    stack = list(roots)
+    while stack:
+        pid = stack.pop()
+        result.append(pid)
+        stack.extend(tree.get(pid, []))
+    return result
+
+
+def _thread_processes(pid: int, tid: int) -> list[int]:
+    """Processes started by one thread of a process, with their descendants.
+
+    Falls back to all descendants of the process where the kernel does not
+    expose per-thread children.
+    """
+    tree = _process_tree()
+    try:
+        with open(f"/proc/{pid}/task/{tid}/children") as f:
+            roots = [int(child) for child in f.read().split()]
+    except (OSError, ValueError):
+        roots = tree.get(pid, [])
+    return _descendants(roots, tree)
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether a process exists and is not a zombie."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+def _rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+@contextmanager
+def sample_rss():
+    """Sample the RSS of the calling thread's child processes in the background.
+
+    Yields a list that receives (monotonic time, total RSS in MB) samples
+    every SAMPLE_INTERVAL until the block exits. The total covers the
+    processes started by the calling thread and their descendants, so phases
+    running concurrently in other threads are not counted.
+    """
+    samples: list[tuple[float, float]] = []
+    stop = threading.Event()
+    pid = os.getpid()
+    tid = threading.get_native_id()
+
+    def sample():
+        while True:
+            now = time.monotonic()
+            samples.append((now, sum(_rss_mb(child) for child in _thread_processes(pid, tid))))
+            if stop.wait(SAMPLE_INTERVAL):
+                return
+
+    sampler = threading.Thread(target=sample, name="rss-sampler", daemon=True)
+    sampler.start()
+    try:
+        yield samples
+    finally:
+        stop.set()
+        sampler.join()
+
+
+def peak_rss_mb(samples: list[tuple[float, float]], since: float) -> float:
+    """Largest RSS sampled since `since`.
+
+    Falls back to the latest earlier sample for intervals shorter than
+    SAMPLE_INTERVAL that no sample fell into.
+    """
+    # The sampler thread may append while we read
+    snapshot = list(samples)
+    before = [total for taken, total in snapshot if taken <= since]
+    during = [total for taken, total in snapshot if taken > since]
+    if during:
+        return max(during)
+    return before[-1] if before else 0.0
+
+
+@contextmanager
+def measure_phase(samples: list[tuple[float, float]] | None = None):
+    """Measure wall time, child CPU time and peak RSS of child processes.
+
+    Yields a dict that is filled with wall_seconds, cpu_seconds and
+    peak_rss_mb when the block exits. Peak RSS is the largest sampled total
+    of the processes started by the calling thread (see sample_rss). CPU
+    time covers all children of the process that were waited for, which
+    errs on the side of over-estimating.
+
+    Args:
+        samples: RSS samples of an enclosing measurement in the same thread
+            (see sample_rss). When given, no sampler is started and peak RSS
+            is taken from the samples that fall into the block.
+    """
+    usage: dict = {}
+    sampling = nullcontext(samples) if samples is not None else sample_rss()
+    with sampling as samples:
+        start_wall = time.monotonic()
+        start_cpu = _child_cpu_seconds()
+        try:
+            yield usage
+        finally:
+            usage["wall_seconds"] = time.monotonic() - start_wall
+            usage["cpu_seconds"] = _child_cpu_seconds() - start_cpu
+            usage["peak_rss_mb"] = peak_rss_mb(samples, start_wall)
+
+
+class ResourceGovernor:
+    """Admit phases only when their memory and CPU demands fit.
+
+    State lives in multiprocessing primitives, so one governor is shared by
+    the prefetch threads and, via set_governor as a pool initializer, by
+    matrix worker processes.
+
+    Every admitted phase holds a lease (memory and CPUs) recorded under its
+    process id. A process killed without unwinding (OOM kill, cancellation,
+    a broken pool) cannot return its lease, so waiters reclaim the leases
+    of dead processes before and while they wait.
+    """
+
+    def __init__(
+        self,
+        memory_mb: float,
+        cpus: list[int],
+        history: dict[str, dict] | None = None,
+    ):
+        """Initialize the governor.
+
+        Args:
+            memory_mb: Memory available to admitted phases.
+            cpus: CPU ids available for pinning.
+            history: Duration history (see scheduling.py) with measured
+                per-phase resources.
+        """
+        context = worker_context()
+        self.memory_mb = memory_mb
+        self.cpus = sorted(cpus)
+        self.history = history or {}
+        self._condition = context.Condition()
+        # Every lease holds at least one CPU, so there are never more leases than CPUs
+        self._lease_pids = context.Array("q", [0] * len(self.cpus), lock=False)
+        self._lease_memory = context.Array("d", [0.0] * len(self.cpus), lock=False)
+        # Lease slot holding each CPU, -1 if free
+        self._cpu_leases = context.Array("i", [-1] * len(self.cpus), lock=False)
+
+    def demand(self, task_config: TaskConfig, phase: str) -> dict:
+        """Expected memory (MB) and CPUs of a phase, from history or defaults.
+
+        Demands are clamped to the governor's capacity so a phase that needs
+        more than the whole machine still runs, alone.
+        """
+        measured = self.history.get(task_config.instance_id, {}).get("resources", {})
+        default = DEFAULT_DEMANDS.get(task_config.benchmark_category, FALLBACK_DEMAND)
+        if phase in measured and measured[phase].get("peak_rss_mb"):
+            usage = measured[phase]
+            memory_mb = usage["peak_rss_mb"]
+            wall = max(usage.get("wall_seconds", 0.0), 1.0)
+            cpus = math.ceil(usage.get("cpu_seconds", 0.0) / wall)
+        else:
+            memory_mb = default["memory_mb"]
+            cpus = default["cpus"]
+        return {
+            "memory_mb": min(memory_mb, self.memory_mb),
+            "cpus": max(min(cpus, len(self.cpus)), 1),
+        }
+
+    def _try_acquire(self, demand: dict) -> tuple[int, list[int]] | None:
+        """Take a lease for the demand, or None if it does not fit yet."""
+        free = [i for i, lease in enumerate(self._cpu_leases) if lease == -1]
+        used_memory = sum(
+            memory for pid, memory in zip(self._lease_pids, self._lease_memory) if pid
+        )
+        if self.memory_mb - used_memory < demand["memory_mb"] or len(free) < demand["cpus"]:
+            return None
+        lease = list(self._lease_pids).index(0)
+        self._lease_pids[lease] = os.getpid()
+        self._lease_memory[lease] = demand["memory_mb"]
+        taken = free[: demand["cpus"]]
+        for i in taken:
+            self._cpu_leases[i] = lease
+        return lease, taken
+
+    def _release(self, lease: int):
+        self._lease_pids[lease] = 0
+        self._lease_memory[lease] = 0.0
+        for i, holder in enumerate(self._cpu_leases):
+            if holder == lease:
+                self._cpu_leases[i] = -1
+
+    def _reclaim(self):
+        """Release the leases of processes that died while holding them."""
+        for lease, pid in enumerate(self._lease_pids):
+            if pid and not _pid_alive(pid):
+                print(
+                    f"Reclaiming {self._lease_memory[lease]:.0f} MB and "
+                    f"{sum(1 for holder in self._cpu_leases if holder == lease)} CPU(s) "
+                    f"held by dead process {pid}"
+                )
+                self._release(lease)
+
+    @contextmanager
+    def admit(self, task_config: TaskConfig, phase: str):
+        """Block until the phase fits, then run it pinned to its CPU set.
+
+        Yields:
+            list[int]: The CPU ids the phase is pinned to.
+        """
+        demand = self.demand(task_config, phase)
+        with self._condition:
+            self._reclaim()
+            acquired = self._try_acquire(demand)
+            if acquired is None:
+                print(
+                    f"Waiting for resources to {phase} {task_config.instance_id} "
+                    f"({demand['memory_mb']:.0f} MB, {demand['cpus']} CPU(s))"
+                )
+            while acquired is None:
+                # A lease of a killed process is never released with a notify
+                self._condition.wait(RECLAIM_INTERVAL)
+                self._reclaim()
+                acquired = self._try_acquire(demand)
+        lease, slots = acquired
+
+        cpu_ids = {self.cpus[i] for i in slots}
+        previous_affinity = None
+        if hasattr(os, "sched_setaffinity"):
+            previous_affinity = os.sched_getaffinity(0)
+            os.sched_setaffinity(0, cpu_ids)
+        try:
+            yield sorted(cpu_ids)
+        finally:
+            if previous_affinity is not None:
+                os.sched_setaffinity(0, previous_affinity)
+            with self._condition:
+                self._release(lease)
+                self._condition.notify_all()
+
+
+def available_memory_mb() -> float:
+    """Physical memory of the machine in MB."""
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / (1024 * 1024)
+
+
+def available_cpus() -> list[int]:
+    """CPU ids this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def set_governor(governor: "ResourceGovernor | None"):
+    """Install the process-wide governor (also used as a pool initializer)."""
+    global _governor
+    _governor = governor
+
+
+def get_governor() -> "ResourceGovernor | None":
+    return _governor
+
+
+def admit(task_config: TaskConfig, phase: str):
+    """Admission context for a phase; a no-op when no governor is installed."""
+    if _governor is None:
+        return nullcontext([])
+    return _governor.admit(task_config, phase)
+
+
+def set_agent_task(task_config: TaskConfig | None):
+    """Name the task whose agent runs in this process (None when it is done)."""
+    global _agent_task
+    _agent_task = task_config
+
+
+def admit_agent_command(command: str):
+    """Admission context for a command the agent runs.
+
+    Builds and Fray runs are admitted with the demand of the task's
+    verification (a build plus a Fray run); anything else runs directly.
+    The agent's shell was started before admission, so these commands are
+    not pinned to the granted CPUs, but they count against the budget.
+    """
+    if _governor is None or _agent_task is None or not HEAVY_COMMAND.search(command):
+        return nullcontext([])
+    return _governor.admit(_agent_task, "verify")
@@ -0,0 +1,174 @@
+"""Record and replay LLM responses for offline reruns.
+
+Responses are stored by a hash of the canonical request (model, messages,
+tools and call options, with workspace temp paths normalized, plus the
+repetition of the run, so repetitions are recorded as separate samples),
+so a rerun that sends the same requests is served locally at zero LLM
+latency:
+
+    cache_dir/responses/<hash>.pkl        pickled response object
+    cache_dir/cassettes/<conversation>/<recording>.jsonl
+                                          request hashes of one recorded
+                                          conversation, in call order
+
+Tool output is produced live on replay and may differ slightly from the
+recording (timings, Fray seeds), which changes the request hash. Replay
+then falls back to the response recorded at the same position of the
+first recording of the same conversation (identified by its first
+request), so a recorded run can be replayed to the end.
+
+Replayed responses are not fresh samples: use replay to benchmark the
+harness, not the models.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import uuid
+from pathlib import Path
+
+CACHE_MODES = ("auto", "record", "replay")
+
+# Workspace temp directories (tempfile.mkdtemp adds 8 random characters)
+_WORKDIR_PATTERN = re.compile(
+    r"[^\s\"'=:]*/concurrency_bench_[^/\s\"']+?_[a-z0-9_]{8}(?=[/\s\"']|$)"
+)
+
+_response_cache: "ResponseCache | None" = None
+
+
+class ReplayMissError(KeyError):
+    """Raised in replay mode when no recorded response matches a request."""
+
+
+def _canonical(value):
+    """Convert request parts (pydantic models, lists, dicts) to plain JSON data."""
+    if hasattr(value, "model_dump"):
+        return _canonical(value.model_dump(mode="json"))
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def canonical_request(model: str, messages, tools=None, options: dict | None = None) -> str:
+    """Serialize a request deterministically, with workspace paths normalized."""
+    text = json.dumps(
+        {
+            "model": model,
+            "messages": _canonical(messages),
+            "tools": _canonical(tools),
+            "options": _canonical(options or {}),
+        },
+        sort_keys=True,
+    )
+    return _WORKDIR_PATTERN.sub("<workdir>", text)
+
+
+def request_hash(canonical: str) -> str:
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Store and look up LLM responses by canonical request hash."""
+
+    def __init__(self, cache_dir: Path, mode: str = "auto"):
+        """Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding responses and cassettes.
+            mode: "record" always calls the provider and stores responses;
+                "replay" never calls it and fails on misses; "auto" replays
+                hits and records misses.
+        """
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}, expected one of {CACHE_MODES}")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.response_dir = cache_dir / "responses"
+        self.cassette_dir = cache_dir / "cassettes"
+        self.response_dir.mkdir(parents=True, exist_ok=True)
+        self.cassette_dir.mkdir(parents=True, exist_ok=True)
+
+    def _response_path(self, digest: str) -> Path:
+        return self.response_dir / f"{digest}.pkl"
+
+    def _cassette_path(self, conversation: str, recording: str) -> Path:
+        return self.cassette_dir / conversation / f"{recording}.jsonl"
+
+    def _load(self, digest: str):
+        path = self._response_path(digest)
+        if not path.exists():
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def lookup(self, digest: str, conversation: str, index: int):
+        """Find the recorded response for a request.
+
+        Args:
+            digest: Hash of the canonical request.
+            conversation: Hash identifying the conversation (its first request).
+            index: Position of the call within the conversation.
+
+        Returns:
+            The recorded response, or None (only outside replay mode).
+
+        Raises:
+            ReplayMissError: In replay mode, if nothing was recorded.
+        """
+        if self.mode == "record":
+            return None
+        response = self._load(digest)
+        if response is None and self.mode == "replay":
+            cassettes = sorted((self.cassette_dir / conversation).glob("*.jsonl"))
+            if cassettes:
+                with open(cassettes[0]) as f:
+                    recorded = [json.loads(line) for line in f if line.strip()]
+                if index < len(recorded):
+                    response = self._load(recorded[index]["request_hash"])
+            if response is None:
+                raise ReplayMissError(
+                    f"No recorded response for call {index} of conversation {conversation}"
+                )
+        return response
+
+    def store(self, digest: str, conversation: str, recording: str, index: int, response):
+        """Record a response and its position in the conversation.
+
+        Args:
+            digest: Hash of the canonical request.
+            conversation: Hash identifying the conversation.
+            recording: Identifier of this recording of the conversation
+                (one per LLM instance), sortable by start time.
+            index: Position of the call within the conversation.
+            response: Response object to store.
+        """
+        path = self._response_path(digest)
+        tmp = path.with_suffix(f".tmp-{uuid.uuid4().hex}")
+        with open(tmp, "wb") as f:
+            pickle.dump(response, f)
+        os.replace(tmp, path)
+        self.record_call(digest, conversation, recording, index)
+
+    def record_call(self, digest: str, conversation: str, recording: str, index: int):
+        """Append a call to the conversation's cassette (also for cache hits)."""
+        cassette = self._cassette_path(conversation, recording)
+        cassette.parent.mkdir(parents=True, exist_ok=True)
+        with open(cassette, "a") as f:
+            f.write(json.dumps({"index": index, "request_hash": digest}) + "\n")
+
+
+def set_response_cache(response_cache: "ResponseCache | None"):
+    """Install the process-wide response cache."""
+    global _response_cache
+    _response_cache = response_cache
+
+
+def get_response_cache() -> "ResponseCache | None":
+    return _response_cache
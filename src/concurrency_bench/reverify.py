@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""Re-verify stored agent patches without running the agent again.
+
+Each task's workspace is set up once; every stored patch for the task is
+then applied to the git baseline, built incrementally and verified. Results
+are written to a mirror of the results tree (default: results_reverified/)
+with updated success flags and timings, so changes to Fray or its
+configuration can be re-scored across all stored patches.
+
+Outcomes are kept in a content-addressed patch store (see patch_store.py),
+so patches that are identical after normalization are verified only once.
+"""
+
+import argparse
+import json
+import shutil
+import subprocess
+import time
+import traceback
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+
+from concurrency_bench.patch_store import PatchStore, patch_hash, strip_artefacts
+from concurrency_bench.resources import admit, get_governor, set_governor
+from concurrency_bench.run_agent import (
+    PreparedTask,
+    get_git_dir,
+    load_tasks,
+    prepare_task,
+)
+from concurrency_bench.spans import span
+from concurrency_bench.task_config import TaskConfig
+
+@dataclass
+class StoredResult:
+    """A result JSON and patch saved by run_agent.py."""
+
+    instance_id: str
+    result_file: Path
+    patch_file: Path
+    # Directory of the result relative to the results root
+    relative_dir: Path
+
+
+def find_stored_results(results_dir: Path, task_type: str = "fix_bug") -> list[StoredResult]:
+    """Find all result/patch pairs of a task type under a results directory.
+
+    Results live in .../{task_type}/{benchmark_category}/{instance_id}.patch.
+    """
+    stored = []
+    for patch_file in sorted(results_dir.rglob("*.patch")):
+        result_file = patch_file.with_suffix(".json")
+        relative_dir = patch_file.parent.relative_to(results_dir)
+        if not result_file.exists() or len(relative_dir.parts) < 2:
+            continue
+        if relative_dir.parts[-2] != task_type:
+            continue
+        stored.append(
+            StoredResult(
+                instance_id=patch_file.stem,
+                result_file=result_file,
+                patch_file=patch_file,
+                relative_dir=relative_dir,
+            )
+        )
+    return stored
+
+
+def reset_to_baseline(workdir: Path):
+    """Drop all changes since the git baseline, keeping ignored build outputs."""
+    git_dir = get_git_dir(workdir)
+    subprocess.run(["git", "reset", "--hard", "-q"], cwd=git_dir, capture_output=True)
+    subprocess.run(["git", "clean", "-fdq"], cwd=git_dir, capture_output=True)
+
+
+def apply_patch(workdir: Path, patch_text: str) -> tuple[bool, str]:
+    """Apply a stored patch to the workspace baseline.
+
+    Build artefacts (e.g. .class files) are stripped first; their binary
+    diffs carry no full index and never apply.
+
+    Returns:
+        tuple: (applied, git apply output)
+    """
+    patch_text = strip_artefacts(patch_text)
+    if not patch_text.strip():
+        return True, ""
+    result = subprocess.run(
+        ["git", "apply", "--whitespace=nowarn", "-"],
+        cwd=get_git_dir(workdir),
+        input=patch_text,
+        capture_output=True,
+        text=True,
+    )
+    return result.returncode == 0, result.stdout + result.stderr
+
+
+def verify_patch(prepared: PreparedTask, patch_text: str) -> dict:
+    """Apply a patch to a prepared workspace and verify it.
+
+    The workspace is reset to its baseline first, so patches can be verified
+    one after another on the same build.
+
+    Returns:
+        dict: success, patch_applied, verify_output, verify_seconds and
+        verify_usage (the verification's timing span, see spans.py).
+    """
+    reset_to_baseline(prepared.workdir)
+    applied, apply_output = apply_patch(prepared.workdir, patch_text)
+    if not applied:
+        return {
+            "success": False,
+            "patch_applied": False,
+            "verify_output": f"Patch does not apply:\n{apply_output}",
+            "verify_seconds": 0.0,
+            "verify_usage": {},
+        }
+
+    verify_start = time.monotonic()
+    with admit(prepared.task_config, "verify"), span("verify") as verify_usage:
+        result = prepared.task_obj.verify()
+    return {
+        "success": result.success,
+        "patch_applied": True,
+        "verify_output": result.verify_output,
+        "verify_seconds": time.monotonic() - verify_start,
+        "verify_usage": verify_usage,
+    }
+
+
+def write_reverified(
+    stored: StoredResult, output_dir: Path, outcome: dict, deduplicated: bool = False
+):
+    """Write the stored result with the new verification to the output tree.
+
+    Args:
+        stored: The stored result that was re-verified.
+        output_dir: Root of the re-verified results tree.
+        outcome: Verification outcome (see verify_patch).
+        deduplicated: The outcome was reused from an identical patch.
+    """
+    with open(stored.result_file) as f:
+        data = json.load(f)
+
+    data["reverify"] = {
+        "original_success": data.get("success"),
+        "patch_applied": outcome["patch_applied"],
+        "verify_seconds": outcome["verify_seconds"],
+        "verify_usage": outcome["verify_usage"],
+        "patch_hash": outcome.get("patch_hash"),
+        "deduplicated": deduplicated,
+        "reverified_at": time.time(),
+    }
+    data["success"] = outcome["success"]
+    data["verify_output"] = outcome["verify_output"]
+
+    target_dir = output_dir / stored.relative_dir
+    target_dir.mkdir(parents=True, exist_ok=True)
+    with open(target_dir / stored.result_file.name, "w") as f:
+        json.dump(data, f, indent=2)
+    shutil.copyfile(stored.patch_file, target_dir / stored.patch_file.name)
+
+
+def reverify_task(
+    task_config: TaskConfig,
+    stored_results: list[StoredResult],
+    base_path: Path,
+    output_dir: Path,
+    store_dir: Path,
+    keep_result: bool = False,
+    force: bool = False,
+) -> list[dict]:
+    """Set up a task once and re-verify all of its stored patches.
+
+    Patches whose normalized hash is already in the patch store reuse the
+    stored outcome. Runs in a worker process.
+
+    Args:
+        task_config: Task the patches belong to.
+        stored_results: Stored results of the task to re-verify.
+        base_path: Base path to resolve relative paths from.
+        output_dir: Root of the re-verified results tree.
+        store_dir: Directory of the patch store.
+        keep_result: Keep the workspace after re-verification.
+        force: Ignore outcomes already in the patch store.
+
+    Returns:
+        list[dict]: One entry per patch with result_file, original_success,
+        success and (on failure) error.
+    """
+    store = PatchStore(store_dir)
+    prepared = None
+    # When every patch duplicates one verified before, no setup is needed
+    if force or not all(
+        store.get(task_config.instance_id, s.patch_file.read_text()) for s in stored_results
+    ):
+        try:
+            prepared = prepare_task(
+                task_config, "fix_bug", base_path, cleanup_on_error=not keep_result
+            )
+        except Exception as e:
+            print(traceback.format_exc())
+            print(f"Error preparing task {task_config.instance_id}: {e}")
+            return [
+                {"result_file": str(s.result_file), "success": None, "error": str(e)}
+                for s in stored_results
+            ]
+
+    # Hashes verified by this call; with `force` only these are reused
+    verified = set()
+    summaries = []
+    try:
+        for stored in stored_results:
+            with open(stored.result_file) as f:
+                original_success = json.load(f).get("success")
+            patch_text = stored.patch_file.read_text()
+            try:
+                outcome = None
+                if not force or patch_hash(patch_text) in verified:
+                    outcome = store.get(task_config.instance_id, patch_text)
+                deduplicated = outcome is not None
+                if outcome is None:
+                    outcome = verify_patch(prepared, patch_text)
+                    outcome["patch_hash"] = store.put(
+                        task_config.instance_id, patch_text, outcome
+                    )
+                    verified.add(outcome["patch_hash"])
+                write_reverified(stored, output_dir, outcome, deduplicated)
+                summary = {"success": outcome["success"], "deduplicated": deduplicated}
+            except Exception as e:
+                print(traceback.format_exc())
+                summary = {"success": None, "error": str(e)}
+            print(
+                f"Re-verified: {stored.relative_dir / stored.instance_id} - "
+                f"Success: {original_success} -> {summary['success']}"
+                + (" (duplicate patch)" if summary.get("deduplicated") else "")
+            )
+            summaries.append(
+                {
+                    "result_file": str(stored.result_file),
+                    "original_success": original_success,
+                    **summary,
+                }
+            )
+    finally:
+        if prepared is not None and not keep_result:
+            shutil.rmtree(prepared.workdir, ignore_errors=True)
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-verify stored agent patches without running the agent"
+    )
+    parser.add_argument(
+        "--tasks-file",
+        type=Path,
+        required=True,
+        help="Path to JSONL file containing the tasks the results belong to",
+    )
+    parser.add_argument(
+        "--results-dir",
+        type=Path,
+        default=Path("results"),
+        help="Directory with stored results and patches (default: results/)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("results_reverified"),
+        help="Directory to write re-verified results to (default: results_reverified/)",
+    )
+    parser.add_argument(
+        "--base-path",
+        type=Path,
+        default=Path.cwd(),
+        help="Base path to resolve relative paths from (default: current directory)",
+    )
+    parser.add_argument(
+        "--instance-id",
+        type=str,
+        help="Re-verify only patches of the task with this instance_id",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=4,
+        help="Maximum number of tasks re-verified in parallel (default: 4)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-verify patches that already have a re-verified result, ignoring "
+        "outcomes in the patch store",
+    )
+    parser.add_argument(
+        "--patch-store",
+        type=Path,
+        default=None,
+        help="Directory of verification outcomes keyed by normalized patch hash "
+        "(default: <output-dir>/.patch_store)",
+    )
+    parser.add_argument(
+        "--keep-result",
+        action="store_true",
+        help="Keep the task workspaces after re-verification",
+    )
+    parser.add_argument(
+        "--resource-governor",
+        action="store_true",
+        help="Admit builds and Fray runs only when their memory/CPU demands fit "
+        "(see run_agent.py)",
+    )
+    args = parser.parse_args()
+
+    tasks = {t.instance_id: t for t in load_tasks(args.tasks_file)}
+    stored_by_task: dict[str, list[StoredResult]] = defaultdict(list)
+    unknown = set()
+    for stored in find_stored_results(args.results_dir):
+        if args.instance_id and stored.instance_id != args.instance_id:
+            continue
+        if stored.instance_id not in tasks:
+            unknown.add(stored.instance_id)
+            continue
+        target = args.output_dir / stored.relative_dir / stored.result_file.name
+        if target.exists() and not args.force:
+            continue
+        stored_by_task[stored.instance_id].append(stored)
+
+    if unknown:
+        print(f"Warning: {len(unknown)} task(s) not in {args.tasks_file}: {sorted(unknown)}")
+    total = sum(len(s) for s in stored_by_task.values())
+    unique = sum(
+        len({patch_hash(s.patch_file.read_text()) for s in stored_results})
+        for stored_results in stored_by_task.values()
+    )
+    print(
+        f"Re-verifying {total} patch(es) across {len(stored_by_task)} task(s), "
+        f"{unique} unique after normalization"
+    )
+    store_dir = args.patch_store or args.output_dir / ".patch_store"
+
+    if args.resource_governor:
+        from concurrency_bench.resources import (
+            ResourceGovernor,
+            available_cpus,
+            available_memory_mb,
+        )
+        from concurrency_bench.scheduling import DURATIONS_FILE, load_durations
+
+        history = load_durations(args.results_dir / DURATIONS_FILE)
+        set_governor(
+            ResourceGovernor(0.8 * available_memory_mb(), available_cpus(), history)
+        )
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=args.max_workers,
+        initializer=set_governor,
+        initargs=(get_governor(),),
+    ) as executor:
+        futures = [
+            executor.submit(
+                reverify_task,
+                tasks[instance_id],
+                stored_results,
+                args.base_path,
+                args.output_dir,
+                store_dir,
+                args.keep_result,
+                args.force,
+            )
+            for instance_id, stored_results in stored_by_task.items()
+        ]
+        for future in as_completed(futures):
+            results.extend(future.result())
+
+    # Print summary
+    print(f"\n{'=' * 80}")
+    print("SUMMARY")
+    print(f"{'=' * 80}")
+    errors = sum(1 for r in results if r["success"] is None)
+    print(f"Re-verified: {len(results) - errors}")
+    print(f"Reused from identical patches: {sum(1 for r in results if r.get('deduplicated'))}")
+    print(f"Errors: {errors}")
+    print(f"Successful: {sum(1 for r in results if r['success'])}")
+    flipped = [
+        r
+        for r in results
+        if r["success"] is not None and bool(r["success"]) != bool(r.get("original_success"))
+    ]
+    print(f"Changed outcome: {len(flipped)}")
+    for r in flipped:
+        print(f"  {r['result_file']}: {r.get('original_success')} -> {r['success']}")
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -8,15 +8,23 @@ import shutil
 import signal
 import subprocess
 import tempfile
+import time
 import traceback
+from dataclasses import dataclass, field
 from pathlib import Path
 
-from concurrency_bench.agents import FixBugAgent, TriggerBugAgent
-from concurrency_bench.agents.builtin_agents import GoldenAgent
+from concurrency_bench.agents import ConcurrencyAgent, FixBugAgent, TriggerBugAgent
+from concurrency_bench.agents.builtin_agents import DummyConversation, GoldenAgent
+from concurrency_bench.event_log import EventLog, events_path
+from concurrency_bench.resources import admit, set_agent_task
+from concurrency_bench.scheduling import DURATIONS_FILE, record_durations
+from concurrency_bench.spans import RESULTS_INDEX, append_index, flatten_spans, span
 from concurrency_bench.task_config import TaskConfig
 from concurrency_bench.tasks import loaders
 from concurrency_bench.tasks.fix_bug import FixBugTask
+from concurrency_bench.tasks.task import ConcurrencyTask, TaskOutput
 from concurrency_bench.tasks.trigger_bug import TriggerBugTask
+from concurrency_bench.work_queue import Lease
 
 
 class TimeoutError(Exception):
@@ -96,6 +104,430 @@ def setup_workdir(task: TaskConfig, base_path: Path) -> Path:
     return temp_dir
 
 
+@dataclass
+class PreparedTask:
+    """A task whose workspace is set up and committed as the git baseline."""
+
+    task_config: TaskConfig
+    task_type: str
+    workdir: Path
+    task_obj: ConcurrencyTask
+    setup_output: str
+    setup_seconds: float = 0.0
+    # Measured CPU time and peak RSS of the setup (see resources.py)
+    setup_usage: dict = field(default_factory=dict)
+    # Timing spans of the whole setup and its phases (see spans.py)
+    setup_span: dict = field(default_factory=dict)
+
+
+def get_task_results_dir(
+    results_dir: Path,
+    model_id: str,
+    enable_fray_tools: bool,
+    repetition: int | None,
+    task_type: str,
+    task_config: TaskConfig,
+) -> Path:
+    """Compute the directory a task's result and patch are written to."""
+    sanitized_model_id = model_id.replace("/", "_").replace(":", "_")
+    fray_mode = "with_fray" if enable_fray_tools else "without_fray"
+
+    if repetition is not None:
+        return (
+            results_dir
+            / sanitized_model_id
+            / fray_mode
+            / f"rep_{repetition}"
+            / task_type
+            / task_config.benchmark_category
+        )
+    return (
+        results_dir
+        / sanitized_model_id
+        / fray_mode
+        / task_type
+        / task_config.benchmark_category
+    )
+
+
+def result_status(task_results_dir: Path, instance_id: str) -> tuple[bool, bool]:
+    """Check whether a non-empty result JSON and patch exist.
+
+    Returns:
+        tuple: (json_exists, patch_exists)
+    """
+    result_file = task_results_dir / f"{instance_id}.json"
+    patch_file = task_results_dir / f"{instance_id}.patch"
+    json_exists = result_file.exists() and result_file.stat().st_size > 0
+    patch_exists = patch_file.exists() and patch_file.stat().st_size > 0
+    return json_exists, patch_exists
+
+
+def create_task_loader(task_config: TaskConfig):
+    """Instantiate the task loader named by the task's loader field."""
+    loader_name = task_config.loader
+    if not loader_name:
+        return None
+
+    loader_class = getattr(loaders, loader_name, None)
+    if loader_class is None:
+        raise ValueError(f"Unknown loader: {loader_name}")
+
+    # Real-world loaders need additional parameters
+    if loader_name in [
+        "KafkaLoader",
+        "GuavaLoader",
+        "LuceneLoader",
+        "UniffleLoader",
+        "MercuryLoader",
+    ]:
+        return loader_class(
+            task_name=task_config.instance_id,
+            repo_url=task_config.repo_url,
+            commit=task_config.commit,
+            test_class=task_config.test_class,
+            test_method=task_config.test_method,
+            fray_args=task_config.fray_args,
+        )
+    # SCTBench and other simple loaders
+    return loader_class(task_name=task_config.instance_id)
+
+
+def get_git_dir(workdir: Path) -> Path:
+    """Directory that holds the git baseline for a workdir."""
+    return workdir / "repo" if (workdir / "repo").exists() else workdir
+
+
+def create_git_baseline(workdir: Path):
+    """Create a git baseline after setup, before the agent runs."""
+    git_dir = get_git_dir(workdir)
+    subprocess.run(["git", "init"], cwd=git_dir, capture_output=True)
+    subprocess.run(
+        ["git", "config", "user.name", "Concurrency Bench"],
+        cwd=git_dir,
+        capture_output=True,
+    )
+    subprocess.run(
+        ["git", "config", "user.email", "bench@example.com"],
+        cwd=git_dir,
+        capture_output=True,
+    )
+    subprocess.run(["git", "add", "-A"], cwd=git_dir, capture_output=True)
+    subprocess.run(
+        ["git", "commit", "-m", "Baseline after setup"],
+        cwd=git_dir,
+        capture_output=True,
+    )
+
+
+def prepare_task(
+    task_config: TaskConfig,
+    task_type: str,
+    base_path: Path,
+    cleanup_on_error: bool = True,
+) -> PreparedTask:
+    """Set up the workspace for a task: copy/clone, build, run Fray, commit baseline.
+
+    Args:
+        task_config: Task object from JSONL.
+        task_type: Type of task ('fix_bug', 'trigger_bug' or 'run_gold').
+        base_path: Base path to resolve relative paths from.
+        cleanup_on_error: Remove the workdir again if setup fails.
+
+    Returns:
+        PreparedTask: The prepared workspace and task object.
+    """
+    setup_start = time.monotonic()
+    with span("setup") as setup_span:
+        with span("workspace"):
+            workdir = setup_workdir(task_config, base_path)
+        task_loader = create_task_loader(task_config)
+
+        try:
+            if task_type == "fix_bug":
+                task_obj = FixBugTask(workdir=workdir, loader=task_loader)
+            elif task_type == "trigger_bug":
+                # FIXME: This part is broken rn
+                task_obj = TriggerBugTask(workdir=workdir, loader=task_loader)
+            elif task_type == "run_gold":
+                if task_config.patch_url is None:
+                    raise ValueError(
+                        f"Task {task_config.instance_id} has no patch_url for run_gold task type"
+                    )
+                task_obj = FixBugTask(workdir=workdir, loader=task_loader)
+            else:
+                raise ValueError(f"Unknown task type: {task_type}")
+
+            # Setup the task (clone repo, build, trigger the bug to get the stack trace)
+            print("Setting up task...")
+            with admit(task_config, "setup"), span("task") as setup_usage:
+                setup_output = task_obj.setup()
+            print("Setup complete!")
+
+            if task_type == "run_gold":
+                # Golden agent: apply patch from URL before the baseline is taken
+                print(f"Applying golden patch from: {task_config.patch_url}")
+                with span("golden_patch"):
+                    GoldenAgent().run(workdir=workdir, patch_url=task_config.patch_url)
+                print("Golden patch applied!")
+
+            with span("baseline"):
+                create_git_baseline(workdir)
+        except BaseException:
+            if cleanup_on_error:
+                print(f"\nCleaning up workdir: {workdir}")
+                shutil.rmtree(workdir, ignore_errors=True)
+            raise
+
+    return PreparedTask(
+        task_config=task_config,
+        task_type=task_type,
+        workdir=workdir,
+        task_obj=task_obj,
+        setup_output=setup_output,
+        setup_seconds=time.monotonic() - setup_start,
+        setup_usage=setup_usage,
+        setup_span=setup_span,
+    )
+
+
+def fork_prepared_task(prepared: PreparedTask, base_path: Path) -> PreparedTask:
+    """Copy a prepared workspace so another agent run can start from it.
+
+    Uses copy-on-write reflinks where the filesystem supports them, which
+    makes forking a built Kafka checkout nearly free.
+
+    Args:
+        prepared: The prepared task to fork.
+        base_path: Base path containing the workspaces directory.
+
+    Returns:
+        PreparedTask: A prepared task backed by the new workdir.
+    """
+    workdir = Path(
+        tempfile.mkdtemp(
+            prefix=f"concurrency_bench_{prepared.task_config.instance_id}_",
+            dir=base_path / "workspaces",
+        )
+    )
+    result = subprocess.run(
+        ["cp", "-a", "--reflink=auto", f"{prepared.workdir}/.", str(workdir)],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        shutil.rmtree(workdir, ignore_errors=True)
+        shutil.copytree(prepared.workdir, workdir, symlinks=True)
+    print(f"Forked workdir: {prepared.workdir} -> {workdir}")
+
+    return PreparedTask(
+        task_config=prepared.task_config,
+        task_type=prepared.task_type,
+        workdir=workdir,
+        task_obj=prepared.task_obj.fork(workdir),
+        setup_output=prepared.setup_output,
+        setup_seconds=prepared.setup_seconds,
+        setup_usage=prepared.setup_usage,
+        setup_span=prepared.setup_span,
+    )
+
+
+def run_prepared_task(
+    prepared: PreparedTask,
+    model_id: str,
+    results_dir: Path,
+    api_key: str | None = None,
+    enable_fray_tools: bool = False,
+    repetition: int | None = None,
+    timeout: int = 1200,
+    agent_options: dict | None = None,
+    lease: Lease | None = None,
+) -> TaskOutput:
+    """Run the agent on a prepared workspace, verify, and save the results.
+
+    Args:
+        prepared: Task whose workspace has been set up by prepare_task.
+        model_id: Model ID to use for the agent.
+        results_dir: Directory to save conversation results.
+        api_key: Optional API key for the LLM.
+        enable_fray_tools: Enable Fray-specific debugging tools for fix_bug tasks.
+        repetition: Repetition ID to include in the results path.
+        timeout: Timeout for the agent in seconds.
+        agent_options: Extra keyword arguments for the agent (e.g. the
+            condenser settings, see agent_options).
+        lease: Work queue claim of the run; results are not saved if another
+            host took it over meanwhile (see work_queue.py).
+
+    Returns:
+        TaskOutput: The verification result.
+    """
+    task_config = prepared.task_config
+    task_type = prepared.task_type
+    workdir = prepared.workdir
+    task_obj = prepared.task_obj
+    setup_output = prepared.setup_output
+
+    if task_type == "fix_bug":
+        agent = FixBugAgent(
+            workdir=workdir,
+            model_id=model_id,
+            api_key=api_key,
+            task_config=task_config,
+            task_instance=task_obj,
+            repetition=repetition,
+            enable_fray_tools=enable_fray_tools,
+            **(agent_options or {}),
+        )
+    elif task_type == "trigger_bug":
+        # FIXME: This part is broken rn
+        agent = TriggerBugAgent(
+            workdir=workdir,
+            model_id=model_id,
+            api_key=api_key,
+            task_info=task_info,
+        )
+    else:
+        # run_gold: the golden patch was applied during preparation
+        agent = GoldenAgent()
+        conversation = DummyConversation()
+
+    task_results_dir = get_task_results_dir(
+        results_dir, model_id, enable_fray_tools, repetition, task_type, task_config
+    )
+    task_results_dir.mkdir(parents=True, exist_ok=True)
+
+    # Run the agent (unless it's run_gold which already ran)
+    agent_start = time.monotonic()
+    event_log = None
+    agent_span = None
+    if task_type != "run_gold":
+        print(f"Starting agent (timeout: {timeout}s)...")
+        # Events are streamed to disk, so a timed-out run still leaves a trace
+        event_log = EventLog(events_path(task_results_dir, task_config.instance_id))
+        # Set up timeout
+        signal.signal(signal.SIGALRM, timeout_handler)
+        signal.alarm(timeout)
+        # Builds and Fray runs the agent starts are admitted against this task
+        set_agent_task(task_config)
+        try:
+            with span("agent") as agent_span:
+                conversation = agent.run_agent(callbacks=[event_log])
+            signal.alarm(0)  # Cancel the alarm
+            print("\nAgent finished!")
+        except TimeoutError as e:
+            signal.alarm(0)  # Cancel the alarm
+            print(f"\n{e}")
+            print(f"Events so far saved to: {event_log.path}")
+            raise
+        finally:
+            set_agent_task(None)
+            event_log.close()
+
+    agent_seconds = time.monotonic() - agent_start
+    token_usage = agent.token_usage() if isinstance(agent, ConcurrencyAgent) else {}
+    condenser_stats = agent.condenser_stats() if isinstance(agent, ConcurrencyAgent) else {}
+    if token_usage:
+        print(
+            f"Tokens: {token_usage['prompt_tokens']} prompt "
+            f"({token_usage['cache_read_tokens']} from cache, "
+            f"{token_usage['cache_hit_rate']:.0%}), "
+            f"{token_usage['completion_tokens']} completion"
+        )
+
+    # Verify the result
+    print("\nVerifying results...")
+    verify_start = time.monotonic()
+    with admit(task_config, "verify"), span("verify") as verify_usage:
+        result = task_obj.verify()
+    verify_seconds = time.monotonic() - verify_start
+    print(f"Success: {result.success}")
+
+    # Duration history drives longest-job-first ordering and shard balancing
+    record_durations(
+        results_dir / DURATIONS_FILE,
+        task_config.instance_id,
+        {
+            "setup": prepared.setup_seconds,
+            "agent": agent_seconds,
+            "verify": verify_seconds,
+        },
+        resources={"setup": prepared.setup_usage, "verify": verify_usage},
+    )
+
+    # Save git diff of changes made by the agent
+    with span("diff") as diff_span:
+        git_dir = get_git_dir(workdir)
+        subprocess.run(["git", "add", "-A"], cwd=git_dir, capture_output=True)
+
+        # Generate diff against baseline commit
+        diff_result = subprocess.run(
+            ["git", "diff", "--cached"],
+            cwd=git_dir,
+            capture_output=True,
+            text=True,
+        )
+
+    # Where the run's time went: setup (shared by forked runs), agent,
+    # verification and diff, each with its sub-phases
+    timings = [
+        timing
+        for timing in (prepared.setup_span, agent_span, verify_usage, diff_span)
+        if timing
+    ]
+
+    # Save conversation data
+    conversation_data = {
+        "instance_id": task_config.instance_id,
+        "task_type": task_type,
+        "model_id": model_id,
+        "description": task_config.description,
+        "benchmark_category": task_config.benchmark_category,
+        "subcategory": task_config.subcategory,
+        "conversation_id": str(conversation.id),
+        "success": result.success,
+        "timings": timings,
+        "setup_output": setup_output,
+        "verify_output": result.verify_output,
+        "prompt_stats": getattr(agent, "prompt_stats", {}),
+        "token_usage": token_usage,
+        "condenser_stats": condenser_stats,
+        "events_file": event_log.path.name if event_log else None,
+        "event_count": event_log.count if event_log else 0,
+    }
+
+    if lease is not None and not lease.held():
+        # The unit runs on the host that took it over; its results win
+        print(f"Lost the work queue lease for {task_config.instance_id}, not saving results")
+        return result
+
+    result_file = task_results_dir / f"{task_config.instance_id}.json"
+    with open(result_file, "w") as f:
+        json.dump(conversation_data, f, indent=2)
+    print(f"Saved conversation to: {result_file}")
+
+    patch_file = task_results_dir / f"{task_config.instance_id}.patch"
+    with open(patch_file, "w") as f:
+        f.write(diff_result.stdout)
+    print(f"Saved patch to: {patch_file}")
+
+    append_index(
+        results_dir / RESULTS_INDEX,
+        {
+            "result_file": str(result_file.relative_to(results_dir)),
+            "instance_id": task_config.instance_id,
+            "task_type": task_type,
+            "model_id": model_id,
+            "enable_fray_tools": enable_fray_tools,
+            "repetition": repetition,
+            "benchmark_category": task_config.benchmark_category,
+            "success": result.success,
+            "timings": flatten_spans(timings),
+        },
+    )
+
+    return result
+
+
 def run_task(
     task_config: TaskConfig,
     task_type: str,
@@ -107,6 +539,9 @@ def run_task(
     keep_result: bool = False,
     repetition: int | None = None,
     timeout: int = 1200,
+    prepared: PreparedTask | None = None,
+    agent_options: dict | None = None,
+    lease: Lease | None = None,
 ):
     """Run a single task with the specified agent.
 
@@ -118,6 +553,10 @@ def run_task(
         results_dir: Directory to save conversation results.
         api_key: Optional API key for the LLM.
         enable_fray_tools: Enable Fray-specific debugging tools for fix_bug tasks.
+        prepared: Workspace already prepared in the background (see
+            pipeline.py); setup is skipped when given.
+        agent_options: Extra keyword arguments for the agent.
+        lease: Work queue claim of the run (see run_prepared_task).
     """
     print(f"\n{'=' * 80}")
     print(f"Running task: {task_config.instance_id}")
@@ -129,42 +568,19 @@ def run_task(
     print(f"{'=' * 80}\n")
 
     # Check if result already exists
-    sanitized_model_id = model_id.replace("/", "_").replace(":", "_")
-    fray_mode = "with_fray" if enable_fray_tools else "without_fray"
-
-    if repetition is not None:
-        task_results_dir = (
-            results_dir
-            / sanitized_model_id
-            / fray_mode
-            / f"rep_{repetition}"
-            / task_type
-            / task_config.benchmark_category
-        )
-    else:
-        task_results_dir = (
-            results_dir
-            / sanitized_model_id
-            / fray_mode
-            / task_type
-            / task_config.benchmark_category
-        )
-
-    result_file = task_results_dir / f"{task_config.instance_id}.json"
-    patch_file = task_results_dir / f"{task_config.instance_id}.patch"
-
-    # Skip if both JSON and patch files exist and are not empty
-    json_exists = result_file.exists() and result_file.stat().st_size > 0
-    patch_exists = patch_file.exists() and patch_file.stat().st_size > 0
+    task_results_dir = get_task_results_dir(
+        results_dir, model_id, enable_fray_tools, repetition, task_type, task_config
+    )
+    json_exists, patch_exists = result_status(task_results_dir, task_config.instance_id)
 
     if json_exists and patch_exists:
         print(f"✓ Skipping task - result already exists:")
-        print(f"  JSON: {result_file}")
-        print(f"  Patch: {patch_file}")
+        print(f"  JSON: {task_results_dir / f'{task_config.instance_id}.json'}")
+        print(f"  Patch: {task_results_dir / f'{task_config.instance_id}.patch'}")
         print(f"{'=' * 80}\n")
+        if prepared is not None and not keep_result:
+            shutil.rmtree(prepared.workdir, ignore_errors=True)
         # Return a mock result indicating it was skipped
-        from concurrency_bench.tasks.task import TaskOutput
-
         return TaskOutput(success=None, verify_output="Skipped - result already exists")
     elif json_exists or patch_exists:
         print(
@@ -173,182 +589,335 @@ def run_task(
     else:
         print(f"No existing result found, running task...")
 
-    # Setup workdir
-    workdir = setup_workdir(task_config, base_path)
-
-    # Initialize task loader based on task.loader field
-    loader_name = task_config.loader
-    if loader_name:
-        loader_class = getattr(loaders, loader_name, None)
-        if loader_class is None:
-            raise ValueError(f"Unknown loader: {loader_name}")
-
-        # Real-world loaders need additional parameters
-        if loader_name in [
-            "KafkaLoader",
-            "GuavaLoader",
-            "LuceneLoader",
-            "UniffleLoader",
-            "MercuryLoader",
-        ]:
-            task_loader = loader_class(
-                task_name=task_config.instance_id,
-                repo_url=task_config.repo_url,
-                commit=task_config.commit,
-                test_class=task_config.test_class,
-                test_method=task_config.test_method,
-                fray_args=task_config.fray_args,
-            )
-        else:
-            # SCTBench and other simple loaders
-            task_loader = loader_class(task_name=task_config.instance_id)
-    else:
-        task_loader = None
+    if prepared is None:
+        prepared = prepare_task(
+            task_config, task_type, base_path, cleanup_on_error=not keep_result
+        )
+    workdir = prepared.workdir
 
     try:
-        # Initialize task
-        if task_type == "fix_bug":
-            task_obj = FixBugTask(workdir=workdir, loader=task_loader)
+        return run_prepared_task(
+            prepared,
+            model_id=model_id,
+            results_dir=results_dir,
+            api_key=api_key,
+            enable_fray_tools=enable_fray_tools,
+            repetition=repetition,
+            timeout=timeout,
+            agent_options=agent_options,
+            lease=lease,
+        )
+    finally:
+        # Cleanup temporary directory
+        if not keep_result and workdir.exists():
+            print(f"\nCleaning up workdir: {workdir}")
+            shutil.rmtree(workdir, ignore_errors=True)
 
-            # Setup the task to get the stack trace
-            print("Setting up task...")
-            setup_output = task_obj.setup()
-            print("Setup complete!")
 
-            agent = FixBugAgent(
-                workdir=workdir,
-                model_id=model_id,
-                api_key=api_key,
-                task_config=task_config,
-                task_instance=task_obj,
-                enable_fray_tools=enable_fray_tools,
-            )
-        elif task_type == "trigger_bug":
-            # FIXME: This part is broken rn
-            task_obj = TriggerBugTask(workdir=workdir, loader=task_loader)
+def select_shard_cells(
+    tasks: list[TaskConfig],
+    task_cells: dict[str, list],
+    shard_spec: str,
+    durations_file: Path | None = None,
+) -> dict[str, list]:
+    """Select the (task, cell) pairs that belong to this shard.
 
-            # Setup the task for trigger_bug
-            print("Setting up task...")
-            setup_output = task_obj.setup()
-            print("Setup complete!")
+    Args:
+        tasks: All tasks of the sweep.
+        task_cells: instance_id -> matrix cells to run for the task.
+        shard_spec: Shard spec "i/n".
+        durations_file: Optional historical durations for weighted partitioning.
 
-            agent = TriggerBugAgent(
-                workdir=workdir,
-                model_id=model_id,
-                api_key=api_key,
-                task_info=task_info,
-            )
-        elif task_type == "run_gold":
-            # Golden agent: apply patch from URL
-            if task_config.patch_url is None:
-                raise ValueError(
-                    f"Task {task_config.instance_id} has no patch_url for run_gold task type"
-                )
+    Returns:
+        dict: instance_id -> cells of that task assigned to this shard.
+    """
+    from concurrency_bench.sharding import (
+        WorkUnit,
+        load_historical_durations,
+        parse_shard,
+        select_shard,
+    )
 
-            task_obj = FixBugTask(workdir=workdir, loader=task_loader)
+    shard_index, shard_count = parse_shard(shard_spec)
+    durations = load_historical_durations(durations_file) if durations_file else None
 
-            # Setup the task (clone repo, build)
-            print("Setting up task...")
-            setup_output = task_obj.setup()
-            print("Setup complete!")
+    units = {
+        WorkUnit(
+            instance_id=task.instance_id,
+            model_id=cell.model_id,
+            enable_fray_tools=cell.enable_fray_tools,
+            repetition=cell.repetition,
+        ): cell
+        for task in tasks
+        for cell in task_cells[task.instance_id]
+    }
+    selected = select_shard(list(units), shard_index, shard_count, durations)
 
-            # Apply the golden patch
-            agent = GoldenAgent()
-            print(f"Applying golden patch from: {task_config.patch_url}")
-            conversation = agent.run(workdir=workdir, patch_url=task_config.patch_url)
-            print("Golden patch applied!")
+    task_cells = {task.instance_id: [] for task in tasks}
+    for unit in selected:
+        task_cells[unit.instance_id].append(units[unit])
+    return task_cells
 
-            # Skip the normal agent run since GoldenAgent doesn't use the SDK
-            # Jump directly to verification after creating git baseline
-        else:
-            raise ValueError(f"Unknown task type: {task_type}")
 
-        # Create a git baseline after setup, before the agent runs
-        git_dir = workdir / "repo" if (workdir / "repo").exists() else workdir
-        subprocess.run(["git", "init"], cwd=git_dir, capture_output=True)
-        subprocess.run(
-            ["git", "config", "user.name", "Concurrency Bench"],
-            cwd=git_dir,
-            capture_output=True,
-        )
-        subprocess.run(
-            ["git", "config", "user.email", "bench@example.com"],
-            cwd=git_dir,
-            capture_output=True,
+def iterate_tasks(tasks: list[TaskConfig], args, needs_setup):
+    """Yield tasks in order, preparing upcoming ones in the background if --prefetch is set.
+
+    Args:
+        tasks: Tasks to run.
+        args: Parsed command-line arguments.
+        needs_setup: Predicate telling whether a task still has work to do
+            (and claiming it when a shared work queue is used).
+
+    Yields:
+        PrefetchedTask: The task with its prepared workspace (or setup error)
+        when prefetching, just the task otherwise, or a skipped marker if
+        needs_setup rejected it.
+    """
+    from concurrency_bench.pipeline import PrefetchedTask, SetupPrefetcher
+
+    if args.prefetch <= 0:
+        for task in tasks:
+            yield PrefetchedTask(task_config=task, skipped=not needs_setup(task))
+        return
+
+    print(f"Prefetching setup for up to {args.prefetch} upcoming task(s)")
+    with SetupPrefetcher(
+        tasks,
+        args.task_type,
+        args.base_path,
+        prefetch=args.prefetch,
+        should_prepare=needs_setup,
+        keep_result=args.keep_result,
+    ) as prefetcher:
+        yield from prefetcher
+
+
+def unit_key(task: TaskConfig, cell) -> str:
+    """Key identifying one (task, model, Fray mode, repetition) run in the work queue."""
+    from concurrency_bench.sharding import WorkUnit
+
+    return WorkUnit(
+        instance_id=task.instance_id,
+        model_id=cell.model_id,
+        enable_fray_tools=cell.enable_fray_tools,
+        repetition=cell.repetition,
+    ).key()
+
+
+def finish_unit(
+    queue, key: str, lease: Lease | None, task_results_dir: Path, instance_id: str, outcome: dict
+):
+    """Complete a claimed unit in the work queue, or release it to be retried.
+
+    Only a run that saved its result is complete, as without a queue, where a
+    rerun of the sweep retries everything without a result JSON and patch
+    (failed setups, crashed runs). A unit whose lease was taken over is left
+    to its new holder.
+    """
+    if lease is None or not lease.held():
+        return
+    if all(result_status(task_results_dir, instance_id)):
+        queue.complete(key, outcome.get("success"), outcome.get("error"))
+    else:
+        queue.release(key)
+
+
+def cell_key(cell) -> tuple:
+    """(model_id, enable_fray_tools, repetition) of a matrix cell, e.g. to key its lease."""
+    return (cell.model_id, cell.enable_fray_tools, cell.repetition)
+
+
+def complete_cells(
+    queue,
+    task: TaskConfig,
+    cells: list,
+    cell_results: list[dict],
+    task_type: str,
+    results_dir: Path,
+):
+    """Finish the claimed cells of a task in the work queue (see finish_unit)."""
+    if queue is None:
+        return
+    outcomes = {
+        (r["model_id"], r["enable_fray_tools"], r["repetition"]): r for r in cell_results
+    }
+    for cell in cells:
+        key = unit_key(task, cell)
+        task_results_dir = get_task_results_dir(
+            results_dir, cell.model_id, cell.enable_fray_tools, cell.repetition, task_type, task
         )
-        subprocess.run(["git", "add", "-A"], cwd=git_dir, capture_output=True)
-        subprocess.run(
-            ["git", "commit", "-m", "Baseline after setup"],
-            cwd=git_dir,
-            capture_output=True,
+        finish_unit(
+            queue,
+            key,
+            queue.lease(key),
+            task_results_dir,
+            task.instance_id,
+            outcomes.get(cell_key(cell), {}),
         )
 
-        # Run the agent (unless it's run_gold which already ran)
-        if task_type != "run_gold":
-            print(f"Starting agent (timeout: {timeout}s)...")
-            # Set up timeout
-            signal.signal(signal.SIGALRM, timeout_handler)
-            signal.alarm(timeout)
-            try:
-                conversation = agent.run_agent()
-                signal.alarm(0)  # Cancel the alarm
-                print("\nAgent finished!")
-            except TimeoutError as e:
-                signal.alarm(0)  # Cancel the alarm
-                print(f"\n{e}")
-                raise
-
-        # Verify the result
-        print("\nVerifying results...")
-        result = task_obj.verify()
-        print(f"Success: {result.success}")
 
-        # Save conversation data
-        conversation_data = {
-            "instance_id": task_config.instance_id,
-            "task_type": task_type,
-            "model_id": model_id,
-            "description": task_config.description,
-            "benchmark_category": task_config.benchmark_category,
-            "subcategory": task_config.subcategory,
-            "conversation_id": str(conversation.id),
-            "success": result.success,
-            "setup_output": setup_output,
-            "verify_output": result.verify_output,
-            "events": [event.model_dump() for event in conversation.state.events],
-        }
-
-        # Create results directory (sanitized_model_id, fray_mode, task_results_dir already computed above)
-        task_results_dir.mkdir(parents=True, exist_ok=True)
-        result_file = task_results_dir / f"{task_config.instance_id}.json"
-        with open(result_file, "w") as f:
-            json.dump(conversation_data, f, indent=2)
-        print(f"Saved conversation to: {result_file}")
-
-        # Save git diff of changes made by the agent
-        git_dir = workdir / "repo" if (workdir / "repo").exists() else workdir
-        subprocess.run(["git", "add", "-A"], cwd=git_dir, capture_output=True)
+def agent_options(args) -> dict:
+    """Agent keyword arguments selected on the command line."""
+    return {
+        "condenser": args.condenser,
+        "condenser_max_events": args.condenser_max_events,
+        "condenser_keep_first": args.condenser_keep_first,
+        "prompt_caching": not args.no_prompt_caching,
+    }
 
-        # Generate diff against baseline commit
-        diff_result = subprocess.run(
-            ["git", "diff", "--cached"],
-            cwd=git_dir,
-            capture_output=True,
-            text=True,
-        )
 
-        patch_file = task_results_dir / f"{task_config.instance_id}.patch"
-        with open(patch_file, "w") as f:
-            f.write(diff_result.stdout)
-        print(f"Saved patch to: {patch_file}")
+def run_matrix_tasks(
+    tasks: list[TaskConfig], args, task_cells: dict[str, list], queue=None
+) -> tuple[list[dict], int]:
+    """Run every task for its matrix cells.
 
-        return result
+    Returns:
+        tuple: (results, number of skipped cells)
+    """
+    from concurrency_bench.matrix import cell_result, pending_cells, run_matrix_task
+
+    results = []
+    skipped = 0
+
+    def needs_setup(task: TaskConfig) -> bool:
+        # Narrow the task's cells down to those still missing (and claimed
+        # by this host when a work queue is shared)
+        nonlocal skipped
+        cells = task_cells[task.instance_id]
+        cells_to_run = pending_cells(task, args.task_type, cells, args.results_dir)
+        if queue is not None:
+            cells_to_run = [
+                cell for cell in cells_to_run if queue.try_claim(unit_key(task, cell))
+            ]
+        skipped += len(cells) - len(cells_to_run)
+        task_cells[task.instance_id] = cells_to_run
+        return bool(cells_to_run)
+
+    for item in iterate_tasks(tasks, args, needs_setup):
+        task = item.task_config
+        cells = task_cells[task.instance_id]
+        if item.skipped:
+            print(f"Skipped: {task.instance_id}")
+            continue
+        leases = None
+        if queue is not None:
+            leases = {cell_key(cell): queue.lease(unit_key(task, cell)) for cell in cells}
+        if item.error is not None:
+            print(f"Error preparing task {task.instance_id}: {item.error}")
+            task_results = [
+                cell_result(task, cell, {"success": False, "error": str(item.error)})
+                for cell in cells
+            ]
+        else:
+            task_results = run_matrix_task(
+                prepared=item.prepared,
+                task_config=task,
+                task_type=args.task_type,
+                cells=cells,
+                base_path=args.base_path,
+                results_dir=args.results_dir,
+                api_key=args.api_key,
+                keep_result=args.keep_result,
+                timeout=args.timeout,
+                max_workers=args.max_workers,
+                agent_options=agent_options(args),
+                leases=leases,
+            )
+        results.extend(task_results)
+        complete_cells(queue, task, cells, task_results, args.task_type, args.results_dir)
+
+    return results, skipped
 
-    finally:
-        # Cleanup temporary directory
-        if not keep_result and workdir.exists():
-            print(f"\nCleaning up workdir: {workdir}")
-            shutil.rmtree(workdir, ignore_errors=True)
+
+def run_sequential_tasks(
+    tasks: list[TaskConfig], args, queue=None
+) -> tuple[list[dict], int]:
+    """Run tasks one at a time with a single model, Fray mode and repetition.
+
+    Returns:
+        tuple: (results, number of skipped tasks)
+    """
+    from concurrency_bench.matrix import MatrixCell
+
+    cell = MatrixCell(args.model_id, args.enable_fray_tools, args.repetition)
+    results = []
+    skipped = 0
+
+    def needs_setup(task: TaskConfig) -> bool:
+        task_results_dir = get_task_results_dir(
+            args.results_dir,
+            args.model_id,
+            args.enable_fray_tools,
+            args.repetition,
+            args.task_type,
+            task,
+        )
+        if all(result_status(task_results_dir, task.instance_id)):
+            return False
+        return queue is None or queue.try_claim(unit_key(task, cell))
+
+    print("Running tasks sequentially")
+    for item in iterate_tasks(tasks, args, needs_setup):
+        task = item.task_config
+        if item.skipped:
+            skipped += 1
+            print(f"Skipped: {task.instance_id}")
+            continue
+        outcome = {}
+        key = unit_key(task, cell)
+        lease = queue.lease(key) if queue is not None else None
+        try:
+            if item.error is not None:
+                raise item.error
+            result = run_task(
+                prepared=item.prepared,
+                task_config=task,
+                task_type=args.task_type,
+                model_id=args.model_id,
+                base_path=args.base_path,
+                results_dir=args.results_dir,
+                api_key=args.api_key,
+                enable_fray_tools=args.enable_fray_tools,
+                keep_result=args.keep_result,
+                repetition=args.repetition,
+                timeout=args.timeout,
+                agent_options=agent_options(args),
+                lease=lease,
+            )
+            if result.success is None:
+                # Task was skipped
+                skipped += 1
+                print(f"Skipped: {task.instance_id}")
+            else:
+                outcome = {
+                    "instance_id": task.instance_id,
+                    "success": result.success,
+                }
+                results.append(outcome)
+                print(f"Completed: {task.instance_id} - Success: {result.success}")
+        except Exception as e:
+            tb = traceback.format_exc()
+            print(tb)
+            print(f"Error running task {task.instance_id}: {e}")
+            outcome = {
+                "instance_id": task.instance_id,
+                "success": False,
+                "error": str(e),
+            }
+            results.append(outcome)
+        finally:
+            if queue is not None:
+                task_results_dir = get_task_results_dir(
+                    args.results_dir,
+                    args.model_id,
+                    args.enable_fray_tools,
+                    args.repetition,
+                    args.task_type,
+                    task,
+                )
+                finish_unit(queue, key, lease, task_results_dir, task.instance_id, outcome)
+
+    return results, skipped
 
 
 def main():
@@ -374,7 +943,8 @@ def main():
         type=str,
         required=False,
         default="golden",
-        help="Model ID to use (e.g., 'anthropic/claude-sonnet-4-5-20250929'). Defaults to 'golden' for run_gold task type.",
+        help="Model ID to use (e.g., 'anthropic/claude-sonnet-4-5-20250929'). Defaults to 'golden' for run_gold task type. "
+        "A comma-separated list runs every model in matrix mode.",
     )
     parser.add_argument(
         "--base-path",
@@ -420,6 +990,144 @@ def main():
         default=1200,
         help="Timeout for agent execution in seconds (default: 1200 = 20 minutes)",
     )
+    parser.add_argument(
+        "--repetitions",
+        type=str,
+        default=None,
+        help="Matrix mode: repetitions to run, e.g. '1-5' or '1,3' (overrides --repetition)",
+    )
+    parser.add_argument(
+        "--fray-modes",
+        type=str,
+        choices=["with", "without", "both"],
+        default=None,
+        help="Matrix mode: run with Fray tools, without, or both (overrides --enable-fray-tools)",
+    )
+    parser.add_argument(
+        "--jobs-file",
+        type=Path,
+        default=None,
+        help="Matrix mode: run exactly the (task, model, Fray mode, repetition) cells of "
+        "this JSONL job list, e.g. the missing cells written by coverage.py (overrides "
+        "--model-id, --repetitions and --fray-modes)",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=4,
+        help="Matrix mode: maximum number of agent runs in parallel per task (default: 4)",
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=0,
+        help="Prepare (clone, build, Fray setup) up to this many upcoming tasks in the "
+        "background while the current agent runs (default: 0 = no prefetching)",
+    )
+    parser.add_argument(
+        "--shard",
+        type=str,
+        default=None,
+        help="Run only shard i of n (e.g. '0/4'); every machine must use the same task "
+        "file and options",
+    )
+    parser.add_argument(
+        "--durations-file",
+        type=Path,
+        default=None,
+        help="JSON file of historical per-task durations used to balance --shard by "
+        "expected wall time and to order tasks (default for ordering: "
+        "<results-dir>/durations.json, which every run updates)",
+    )
+    parser.add_argument(
+        "--order",
+        type=str,
+        choices=["file", "lpt"],
+        default="file",
+        help="Task order: as in the tasks file, or longest-processing-time first using "
+        "duration history (default: file)",
+    )
+    parser.add_argument(
+        "--queue-dir",
+        type=Path,
+        default=None,
+        help="Shared directory for a lease-based work queue, so several hosts can drain "
+        "the same sweep without running a task twice",
+    )
+    parser.add_argument(
+        "--lease-seconds",
+        type=int,
+        default=600,
+        help="Work queue: seconds without heartbeat after which a claimed run is "
+        "re-queued (default: 600)",
+    )
+    parser.add_argument(
+        "--resource-governor",
+        action="store_true",
+        help="Admit builds and Fray runs only when their measured memory and CPU demands "
+        "fit, and pin each to its own CPU set",
+    )
+    parser.add_argument(
+        "--max-memory-mb",
+        type=float,
+        default=None,
+        help="Resource governor: memory available to builds and Fray runs "
+        "(default: 80%% of physical memory)",
+    )
+    parser.add_argument(
+        "--cpus",
+        type=str,
+        default=None,
+        help="Resource governor: comma-separated CPU ids to pin work to "
+        "(default: all CPUs available to this process)",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=str,
+        action="append",
+        default=[],
+        help="Shared LLM rate limit per provider as 'provider=RPM:TPM', e.g. "
+        "'openai=500:200000' (repeatable; omit or 0 for unlimited)",
+    )
+    parser.add_argument(
+        "--condenser",
+        type=str,
+        choices=["none", "summarize"],
+        default="none",
+        help="Context condensation: 'summarize' replaces the middle of long histories "
+        "with an LLM summary, keeping the task description (default: none)",
+    )
+    parser.add_argument(
+        "--condenser-max-events",
+        type=int,
+        default=80,
+        help="Condenser: history length (events) that triggers condensation (default: 80)",
+    )
+    parser.add_argument(
+        "--condenser-keep-first",
+        type=int,
+        default=2,
+        help="Condenser: leading events that are never condensed (default: 2)",
+    )
+    parser.add_argument(
+        "--no-prompt-caching",
+        action="store_true",
+        help="Do not mark the prompt prefix for provider-side prompt caching",
+    )
+    parser.add_argument(
+        "--llm-cache-dir",
+        type=Path,
+        default=None,
+        help="Record LLM responses to / replay them from this directory",
+    )
+    parser.add_argument(
+        "--llm-cache-mode",
+        type=str,
+        choices=["auto", "record", "replay"],
+        default="auto",
+        help="LLM cache: 'record' always calls the model, 'replay' never does (offline), "
+        "'auto' replays recorded requests and records new ones (default: auto)",
+    )
 
     args = parser.parse_args()
 
@@ -436,48 +1144,148 @@ def main():
             return 1
         print(f"Running single task: {args.instance_id}")
 
-    # Run tasks sequentially
-    results = []
-    skipped = 0
+    model_ids = [m.strip() for m in args.model_id.split(",") if m.strip()]
+    matrix_mode = (
+        args.repetitions is not None
+        or args.fray_modes is not None
+        or len(model_ids) > 1
+        or args.jobs_file is not None
+    )
 
-    print("Running tasks sequentially")
-    for task in tasks:
-        try:
-            result = run_task(
-                task_config=task,
-                task_type=args.task_type,
-                model_id=args.model_id,
-                base_path=args.base_path,
-                results_dir=args.results_dir,
-                api_key=args.api_key,
-                enable_fray_tools=args.enable_fray_tools,
-                keep_result=args.keep_result,
-                repetition=args.repetition,
-                timeout=args.timeout,
+    from concurrency_bench.matrix import (
+        MatrixCell,
+        expand_matrix,
+        parse_fray_modes,
+        parse_repetitions,
+    )
+
+    if matrix_mode:
+        if args.repetitions is not None:
+            repetitions = parse_repetitions(args.repetitions)
+        else:
+            repetitions = [args.repetition]
+        if args.fray_modes is not None:
+            fray_modes = parse_fray_modes(args.fray_modes)
+        else:
+            fray_modes = [args.enable_fray_tools]
+        cells = expand_matrix(model_ids, fray_modes, repetitions)
+    else:
+        cells = [MatrixCell(args.model_id, args.enable_fray_tools, args.repetition)]
+
+    # Cells to run for each task; sharding may drop some of them
+    task_cells = {task.instance_id: list(cells) for task in tasks}
+    if args.jobs_file:
+        from concurrency_bench.coverage import load_jobs
+
+        jobs = load_jobs(args.jobs_file)
+        unknown = set(jobs) - set(task_cells)
+        if unknown:
+            print(f"Warning: {len(unknown)} job task(s) not in {args.tasks_file}: {sorted(unknown)}")
+        task_cells = {task.instance_id: jobs.get(task.instance_id, []) for task in tasks}
+        tasks = [t for t in tasks if task_cells[t.instance_id]]
+        print(
+            f"Job list {args.jobs_file}: {sum(len(c) for c in task_cells.values())} run(s) "
+            f"across {len(tasks)} task(s)"
+        )
+    if args.shard:
+        task_cells = select_shard_cells(tasks, task_cells, args.shard, args.durations_file)
+        tasks = [t for t in tasks if task_cells[t.instance_id]]
+        print(
+            f"Shard {args.shard}: {sum(len(c) for c in task_cells.values())} run(s) "
+            f"across {len(tasks)} task(s)"
+        )
+
+    # Order and predict using the duration history of previous runs
+    from concurrency_bench.scheduling import (
+        DurationModel,
+        format_duration,
+        load_durations,
+        order_tasks,
+        predict_wall_time,
+    )
+
+    history = load_durations(args.durations_file or args.results_dir / DURATIONS_FILE)
+    duration_model = DurationModel(history, tasks)
+    # Longest-first only shortens the makespan when runs overlap: parallel
+    # matrix cells, setup prefetched during agent runs, or other hosts
+    # pulling from the same queue. Run one at a time, it only reorders output.
+    overlapping = (matrix_mode and args.max_workers > 1) or args.prefetch > 0 or args.queue_dir
+    if args.order == "lpt" and not overlapping:
+        print("Keeping file order: --order lpt has no effect when runs do not overlap")
+    elif args.order == "lpt":
+        tasks = order_tasks(tasks, duration_model, interleave=args.prefetch > 0)
+        print("Ordering tasks longest-first (heavy real-world builds before SCTBench)")
+    predicted = predict_wall_time(
+        tasks,
+        {instance_id: len(c) for instance_id, c in task_cells.items()},
+        duration_model,
+        workers=args.max_workers if matrix_mode else 1,
+        prefetch=args.prefetch,
+    )
+    without_history = sum(1 for t in tasks if not duration_model.has_history(t))
+    print(
+        f"Predicted wall-clock time: {format_duration(predicted)} "
+        f"({without_history} of {len(tasks)} task(s) without duration history)"
+    )
+
+    if args.resource_governor:
+        from concurrency_bench.resources import (
+            ResourceGovernor,
+            available_cpus,
+            available_memory_mb,
+            set_governor,
+        )
+
+        memory_mb = args.max_memory_mb or 0.8 * available_memory_mb()
+        if args.cpus:
+            cpus = [int(c) for c in args.cpus.split(",") if c.strip()]
+        else:
+            cpus = available_cpus()
+        set_governor(ResourceGovernor(memory_mb, cpus, history))
+        print(f"Resource governor: {memory_mb:.0f} MB, CPUs {','.join(map(str, cpus))}")
+
+    if args.rate_limit:
+        from concurrency_bench.rate_limit import (
+            RateLimiter,
+            parse_rate_limit,
+            set_rate_limiter,
+        )
+
+        limits = {}
+        for spec in args.rate_limit:
+            provider, rpm, tpm = parse_rate_limit(spec)
+            limits[provider] = (rpm, tpm)
+            print(
+                f"Rate limit for {provider}: {rpm or 'unlimited'} RPM, "
+                f"{tpm or 'unlimited'} TPM"
             )
-            if result.success is None:
-                # Task was skipped
-                skipped += 1
-                print(f"Skipped: {task.instance_id}")
-            else:
-                results.append(
-                    {
-                        "instance_id": task.instance_id,
-                        "success": result.success,
-                    }
-                )
-                print(f"Completed: {task.instance_id} - Success: {result.success}")
-        except Exception as e:
-            tb = traceback.format_exc()
-            print(tb)
-            print(f"Error running task {task.instance_id}: {e}")
-            results.append(
-                {
-                    "instance_id": task.instance_id,
-                    "success": False,
-                    "error": str(e),
-                }
+        set_rate_limiter(RateLimiter(limits))
+
+    if args.llm_cache_dir:
+        from concurrency_bench.response_cache import ResponseCache, set_response_cache
+
+        set_response_cache(ResponseCache(args.llm_cache_dir, args.llm_cache_mode))
+        print(f"LLM response cache: {args.llm_cache_dir} ({args.llm_cache_mode})")
+
+    queue = None
+    if args.queue_dir:
+        from concurrency_bench.work_queue import FileWorkQueue
+
+        queue = FileWorkQueue(args.queue_dir, lease_seconds=args.lease_seconds)
+        print(f"Using shared work queue: {args.queue_dir} (owner {queue.owner})")
+
+    try:
+        if matrix_mode:
+            print(
+                f"Matrix mode: {sum(len(c) for c in task_cells.values())} run(s) across "
+                f"{len(tasks)} task(s), up to {args.max_workers} in parallel"
             )
+            results, skipped = run_matrix_tasks(tasks, args, task_cells, queue)
+        else:
+            results, skipped = run_sequential_tasks(tasks, args, queue)
+    finally:
+        if queue is not None:
+            queue.close()
 
     # Print summary
     print(f"\n{'=' * 80}")
@@ -0,0 +1,228 @@
+"""Historical task durations and longest-job-first ordering of work."""
+
+import fcntl
+import heapq
+import json
+import os
+import statistics
+from contextlib import contextmanager
+from pathlib import Path
+
+from concurrency_bench.task_config import TaskConfig
+
+# File (inside the results directory) holding per-task duration history
+DURATIONS_FILE = "durations.json"
+# Phases recorded for every run
+PHASES = ("setup", "agent", "verify")
+# Assumed phase durations (seconds) for categories without any history
+DEFAULT_PHASE_SECONDS = {
+    "sctbench": {"setup": 30.0, "agent": 300.0, "verify": 30.0},
+    "real-world": {"setup": 900.0, "agent": 900.0, "verify": 600.0},
+}
+FALLBACK_PHASE_SECONDS = DEFAULT_PHASE_SECONDS["real-world"]
+# Peak RSS is the maximum over this many most recent runs of a phase
+PEAK_RSS_WINDOW = 5
+
+
+@contextmanager
+def _locked(path: Path):
+    """Hold an exclusive lock next to `path` (matrix workers write concurrently)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_suffix(path.suffix + ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def load_durations(durations_file: Path) -> dict[str, dict]:
+    """Load duration history: instance_id -> {phase: mean seconds, "total", "runs"}.
+
+    Entries may also hold "resources": phase -> {"wall_seconds",
+    "cpu_seconds", "peak_rss_mb"} as measured by resources.measure_phase.
+    """
+    if not durations_file.exists():
+        return {}
+    with open(durations_file) as f:
+        return json.load(f)
+
+
+def record_durations(
+    durations_file: Path,
+    instance_id: str,
+    phases: dict[str, float],
+    resources: dict[str, dict] | None = None,
+):
+    """Fold the phase durations of one run into the running means.
+
+    Args:
+        durations_file: Duration history file to update.
+        instance_id: Task the run belongs to.
+        phases: Seconds spent per phase (see PHASES).
+        resources: Measured usage per phase. Times are averaged; peak RSS
+            is the maximum of the last PEAK_RSS_WINDOW runs, conservative
+            for admission control without one outlier inflating it forever.
+    """
+    with _locked(durations_file):
+        durations = load_durations(durations_file)
+        entry = durations.get(instance_id, {"runs": 0})
+        runs = entry.get("runs", 0)
+        for phase in PHASES:
+            if phase in phases:
+                previous = entry.get(phase, phases[phase])
+                entry[phase] = (previous * runs + phases[phase]) / (runs + 1)
+        for phase, usage in (resources or {}).items():
+            if not usage:
+                continue
+            known = entry.setdefault("resources", {}).get(phase, {})
+            known_runs = known.get("runs", 0)
+            merged = {"runs": known_runs + 1}
+            for key in ("wall_seconds", "cpu_seconds"):
+                previous = known.get(key, usage[key])
+                merged[key] = (previous * known_runs + usage[key]) / (known_runs + 1)
+            recent = known.get("recent_peak_rss_mb", [known["peak_rss_mb"]] if known else [])
+            merged["recent_peak_rss_mb"] = (recent + [usage["peak_rss_mb"]])[-PEAK_RSS_WINDOW:]
+            merged["peak_rss_mb"] = max(merged["recent_peak_rss_mb"])
+            entry["resources"][phase] = merged
+        entry["runs"] = runs + 1
+        entry["total"] = sum(entry.get(phase, 0.0) for phase in PHASES)
+        durations[instance_id] = entry
+
+        tmp = durations_file.with_suffix(f".tmp-{os.getpid()}")
+        with open(tmp, "w") as f:
+            json.dump(durations, f, indent=2, sort_keys=True)
+        os.replace(tmp, durations_file)
+
+
+def is_heavy(task: TaskConfig) -> bool:
+    """Whether a task needs a real-world build (clone + Gradle/Maven)."""
+    return task.repo_url is not None
+
+
+class DurationModel:
+    """Expected phase durations per task, based on history.
+
+    Tasks without history are assumed to take the median of the tasks in
+    the same category, or a fixed per-category default if none is known.
+    """
+
+    def __init__(self, history: dict[str, dict], tasks: list[TaskConfig]):
+        self.history = history
+        self.by_category: dict[str, dict[str, float]] = {}
+        for category in {t.benchmark_category for t in tasks}:
+            known = [
+                history[t.instance_id]
+                for t in tasks
+                if t.benchmark_category == category and t.instance_id in history
+            ]
+            defaults = DEFAULT_PHASE_SECONDS.get(category, FALLBACK_PHASE_SECONDS)
+            self.by_category[category] = {
+                phase: statistics.median(e[phase] for e in known if phase in e)
+                if any(phase in e for e in known)
+                else defaults[phase]
+                for phase in PHASES
+            }
+
+    def has_history(self, task: TaskConfig) -> bool:
+        return task.instance_id in self.history
+
+    def phase(self, task: TaskConfig, phase: str) -> float:
+        entry = self.history.get(task.instance_id, {})
+        if phase in entry:
+            return entry[phase]
+        return self.by_category[task.benchmark_category][phase]
+
+    def setup(self, task: TaskConfig) -> float:
+        return self.phase(task, "setup")
+
+    def run(self, task: TaskConfig) -> float:
+        """Seconds for one agent run plus verification."""
+        return self.phase(task, "agent") + self.phase(task, "verify")
+
+    def total(self, task: TaskConfig) -> float:
+        return self.setup(task) + self.run(task)
+
+
+def order_tasks(
+    tasks: list[TaskConfig], model: DurationModel, interleave: bool = False
+) -> list[TaskConfig]:
+    """Order tasks longest-processing-time first.
+
+    Heavy real-world tasks and light SCTBench tasks are sorted separately so
+    the slow builds start first and never land at the end of a run. With
+    `interleave`, heavy and light tasks alternate, so that when setup is
+    prefetched a heavy build overlaps a light task's agent run instead of
+    another heavy build.
+
+    Args:
+        tasks: Tasks to order.
+        model: Expected durations.
+        interleave: Alternate heavy and light tasks.
+
+    Returns:
+        list[TaskConfig]: Tasks in execution order.
+    """
+    heavy = sorted((t for t in tasks if is_heavy(t)), key=model.total, reverse=True)
+    light = sorted((t for t in tasks if not is_heavy(t)), key=model.total, reverse=True)
+    if not interleave:
+        return heavy + light
+
+    ordered = []
+    for i in range(max(len(heavy), len(light))):
+        if i < len(heavy):
+            ordered.append(heavy[i])
+        if i < len(light):
+            ordered.append(light[i])
+    return ordered
+
+
+def lpt_makespan(durations: list[float], workers: int) -> float:
+    """Makespan of packing jobs onto `workers` lanes, longest job first."""
+    if not durations:
+        return 0.0
+    lanes = [0.0] * max(min(workers, len(durations)), 1)
+    heapq.heapify(lanes)
+    for duration in sorted(durations, reverse=True):
+        heapq.heappush(lanes, heapq.heappop(lanes) + duration)
+    return max(lanes)
+
+
+def predict_wall_time(
+    tasks: list[TaskConfig],
+    runs_per_task: dict[str, int],
+    model: DurationModel,
+    workers: int = 1,
+    prefetch: int = 0,
+) -> float:
+    """Predict the wall-clock time of running tasks in the given order.
+
+    Each task is set up once and then runs `runs_per_task` agent runs packed
+    onto `workers` lanes. With prefetching, the next task's setup overlaps
+    the current task's runs.
+
+    Returns:
+        float: Predicted seconds.
+    """
+    run_times = [
+        lpt_makespan([model.run(t)] * runs_per_task.get(t.instance_id, 1), workers)
+        for t in tasks
+    ]
+    setup_times = [model.setup(t) for t in tasks]
+
+    if prefetch <= 0:
+        return sum(setup_times) + sum(run_times)
+
+    # The first setup cannot be hidden; afterwards each step takes as long as
+    # the slower of the current runs and the next task's setup.
+    total = setup_times[0] if setup_times else 0.0
+    for i, run_time in enumerate(run_times):
+        next_setup = setup_times[i + 1] if i + 1 < len(setup_times) else 0.0
+        total += max(run_time, next_setup)
+    return total
+
+
+def format_duration(seconds: float) -> str:
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes = remainder // 60
+    return f"{hours}h {minutes:02d}m"
@@ -0,0 +1,131 @@
+"""Deterministic partitioning of benchmark work across machines.
+
+Every machine is given the same task file, the same command-line options
+and its own `--shard i/n`; each one computes the full list of work units
+and keeps only its own share, so no coordination service is needed.
+"""
+
+import hashlib
+import json
+import statistics
+from dataclasses import dataclass
+from pathlib import Path
+
+# Weight of a unit without historical data when nothing is known at all
+DEFAULT_DURATION = 1.0
+
+
+@dataclass(frozen=True)
+class WorkUnit:
+    """One task run: a task for a given model, Fray mode and repetition."""
+
+    instance_id: str
+    model_id: str
+    enable_fray_tools: bool
+    repetition: int | None
+
+    def key(self) -> str:
+        fray_mode = "with_fray" if self.enable_fray_tools else "without_fray"
+        return f"{self.instance_id}|{self.model_id}|{fray_mode}|{self.repetition}"
+
+    def stable_hash(self) -> int:
+        """Hash that is identical on every machine and Python process."""
+        return int.from_bytes(hashlib.sha256(self.key().encode()).digest()[:8], "big")
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """Parse a shard spec "i/n" with 0 <= i < n.
+
+    Raises:
+        ValueError: If the spec is malformed or out of range.
+    """
+    try:
+        index, count = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard spec {spec!r}, expected 'i/n'")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {spec!r}: need 0 <= i < n")
+    return index, count
+
+
+def load_historical_durations(durations_file: Path) -> dict[str, float]:
+    """Load historical per-task durations in seconds.
+
+    The file maps instance_id to either a number of seconds or an object with
+    a "total" field (as written by the duration recorder).
+    """
+    with open(durations_file) as f:
+        data = json.load(f)
+
+    durations = {}
+    for instance_id, value in data.items():
+        if isinstance(value, dict):
+            value = value.get("total")
+        if isinstance(value, (int, float)) and value > 0:
+            durations[instance_id] = float(value)
+    return durations
+
+
+def unit_weights(units: list[WorkUnit], durations: dict[str, float]) -> dict[WorkUnit, float]:
+    """Weight each unit by its task's historical duration.
+
+    Tasks without history get the median known duration, so a new task is
+    assumed to be typical rather than free.
+    """
+    default = statistics.median(durations.values()) if durations else DEFAULT_DURATION
+    return {unit: durations.get(unit.instance_id, default) for unit in units}
+
+
+def hash_partition(units: list[WorkUnit], shard_index: int, shard_count: int) -> list[WorkUnit]:
+    """Keep the units whose stable hash falls into this shard."""
+    return [u for u in units if u.stable_hash() % shard_count == shard_index]
+
+
+def weighted_partition(
+    units: list[WorkUnit],
+    shard_index: int,
+    shard_count: int,
+    durations: dict[str, float],
+) -> list[WorkUnit]:
+    """Balance units across shards by expected duration.
+
+    Greedy longest-processing-time assignment: units are sorted by weight
+    (ties broken by stable hash) and each one goes to the least loaded shard.
+    The result only depends on the inputs, so all machines agree on it.
+    """
+    weights = unit_weights(units, durations)
+    ordered = sorted(units, key=lambda u: (-weights[u], u.stable_hash()))
+    loads = [0.0] * shard_count
+    assigned = []
+    for unit in ordered:
+        shard = min(range(shard_count), key=lambda s: (loads[s], s))
+        loads[shard] += weights[unit]
+        if shard == shard_index:
+            assigned.append(unit)
+
+    # Keep the original order for execution
+    selected = set(assigned)
+    return [u for u in units if u in selected]
+
+
+def select_shard(
+    units: list[WorkUnit],
+    shard_index: int,
+    shard_count: int,
+    durations: dict[str, float] | None = None,
+) -> list[WorkUnit]:
+    """Select this machine's share of the work units.
+
+    Args:
+        units: All work units of the sweep, in execution order.
+        shard_index: Index of this shard (0-based).
+        shard_count: Total number of shards.
+        durations: Historical durations per instance_id; if given, shards are
+            balanced by expected wall time instead of by hash.
+
+    Returns:
+        list[WorkUnit]: Units assigned to this shard, in their original order.
+    """
+    if durations:
+        return weighted_partition(units, shard_index, shard_count, durations)
+    return hash_partition(units, shard_index, shard_count)
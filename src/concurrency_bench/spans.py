@@ -0,0 +1,105 @@
+"""Hierarchical timing spans of the phases of a run.
+
+Each span measures wall time, child-process CPU time and peak RSS of its
+block (see resources.measure_phase) and collects the spans opened inside
+it, so a run's result records where its time went:
+
+    {"name": "setup", "wall_seconds": 412.3, "cpu_seconds": 1630.2,
+     "peak_rss_mb": 5120.0, "children": [{"name": "clone", ...},
+                                         {"name": "build", ...},
+                                         {"name": "fray", ...}]}
+
+Spans nest per thread, so setups prefetched in background threads do not
+get mixed up with the agent run in the main thread. Only the outermost
+span of a thread samples RSS; nested spans read its samples.
+
+Every finished run is also appended to the results index, one JSON line
+per run with the spans flattened, which is cheap to scan across a sweep:
+
+    results/index.jsonl
+"""
+
+import fcntl
+import json
+import threading
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+from concurrency_bench.resources import measure_phase, sample_rss
+
+# File (inside the results directory) listing every finished run
+RESULTS_INDEX = "index.jsonl"
+
+_local = threading.local()
+
+
+@contextmanager
+def span(name: str):
+    """Measure a phase and attach it to the enclosing span of this thread.
+
+    Yields the span dict, which is filled with wall_seconds, cpu_seconds,
+    peak_rss_mb and the spans opened inside the block when the block exits.
+    """
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    node = {"name": name}
+    children = []
+    # Only the outermost span of a thread samples RSS; nested spans take
+    # their peak from its samples instead of scanning /proc themselves
+    sampling = nullcontext(stack[-1][1]) if stack else sample_rss()
+    with sampling as samples:
+        stack.append((children, samples))
+        try:
+            with measure_phase(samples) as usage:
+                yield node
+        finally:
+            stack.pop()
+            node.update(usage)
+            if children:
+                node["children"] = children
+            if stack:
+                stack[-1][0].append(node)
+
+
+def flatten_spans(spans: list[dict], prefix: str = "") -> dict[str, dict]:
+    """Flatten span trees to "parent/child" -> measurements."""
+    flat = {}
+    for node in spans:
+        path = f"{prefix}{node['name']}"
+        flat[path] = {
+            key: node[key]
+            for key in ("wall_seconds", "cpu_seconds", "peak_rss_mb")
+            if key in node
+        }
+        flat.update(flatten_spans(node.get("children", []), prefix=f"{path}/"))
+    return flat
+
+
+def append_index(index_file: Path, entry: dict):
+    """Append a run to the results index (matrix workers write concurrently)."""
+    index_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(index_file, "a", encoding="utf-8") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def load_index(index_file: Path) -> list[dict]:
+    """Load the results index; later entries for the same run supersede earlier ones."""
+    if not index_file.exists():
+        return []
+    runs = {}
+    with open(index_file, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            runs[entry.get("result_file")] = entry
+    return list(runs.values())
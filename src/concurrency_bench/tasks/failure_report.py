@@ -0,0 +1,124 @@
+"""Structured failure records written by the Java helpers.
+
+JUnitRunner (real-world tasks) and UnhandledExceptionReporterAgent (SCTBench,
+loaded from the junit-runner jar as a java agent) append one JSON object per
+failure to a file in the Fray output directory. Each record has the shape::
+
+    {"source": "junit5", "iteration": 3, "test": "...",
+     "exception_type": "java.lang.AssertionError", "message": "...",
+     "threads": [{"name": "main", "state": "RUNNABLE", "failing": true,
+                  "frames": ["com.app.Foo.bar(Foo.java:12)"]},
+                 {"name": "worker-1", "state": "WAITING", "failing": false,
+                  "frames": [...]}],
+     "causes": [{"exception_type": "...", "message": "...", "frames": [...]}]}
+
+The failing thread comes first with the frames of the exception, followed
+by the other live threads with their frames at the time of the failure.
+Records of the agent carry iteration 0: outside JUnitRunner there is no
+per-iteration entry point to count.
+"""
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# File name of the failure records inside the Fray output directory
+FAILURE_REPORT_FILE = "failures.jsonl"
+# JVM system property the Java helpers read the record path from
+FAILURE_REPORT_PROPERTY = "concurrency_bench.failure_report"
+# Jar with JUnitRunner, FailureReport and UnhandledExceptionReporterAgent
+HELPERS_JAR = (
+    Path(__file__).resolve().parents[3]
+    / "helpers"
+    / "junit-runner"
+    / "build"
+    / "libs"
+    / "junit-runner-1.0-SNAPSHOT.jar"
+)
+
+
+@dataclass
+class FailureRecord:
+    exception_type: str
+    message: str | None = None
+    source: str = ""
+    test: str | None = None
+    iteration: int = 0
+    threads: list[dict] = field(default_factory=list)
+    causes: list[dict] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FailureRecord":
+        return cls(
+            exception_type=data["exception_type"],
+            message=data.get("message"),
+            source=data.get("source", ""),
+            test=data.get("test"),
+            iteration=data.get("iteration") or 0,
+            threads=data.get("threads", []),
+            causes=data.get("causes", []),
+        )
+
+    def format_stack_trace(self) -> str:
+        """Render the record in the familiar Java stack trace layout."""
+        header = self.exception_type
+        if self.message:
+            header += f": {self.message}"
+        lines = [header]
+        for thread in self.threads:
+            thread_header = f"Thread: {thread.get('name', '?')}"
+            if thread.get("state"):
+                thread_header += f" ({thread['state']})"
+            lines.append(thread_header)
+            lines.extend(f"\tat {frame}" for frame in thread.get("frames", []))
+        for cause in self.causes:
+            cause_header = f"Caused by: {cause.get('exception_type', '?')}"
+            if cause.get("message"):
+                cause_header += f": {cause['message']}"
+            lines.append(cause_header)
+            lines.extend(f"\tat {frame}" for frame in cause.get("frames", []))
+        return "\n".join(lines)
+
+
+def failure_report_path(fray_work_dir: Path) -> Path:
+    """Path of the failure record file for a Fray output directory."""
+    return fray_work_dir / FAILURE_REPORT_FILE
+
+
+def reporter_agent_args(report_path: Path) -> list[str]:
+    """Fray arguments loading UnhandledExceptionReporterAgent with a record file.
+
+    Returns:
+        list[str]: The -J-javaagent argument, or nothing if the helpers are not built.
+    """
+    if not HELPERS_JAR.exists():
+        return []
+    return [f"-J-javaagent:{HELPERS_JAR}={report_path}"]
+
+
+def read_failure_records(report_path: Path) -> list[FailureRecord]:
+    """Read failure records from a JSON lines file.
+
+    Malformed lines (e.g. a record cut short when the JVM was killed) are
+    skipped.
+
+    Args:
+        report_path: Path to the failure record file.
+
+    Returns:
+        list[FailureRecord]: Records in the order they were written.
+    """
+    if not report_path.exists():
+        return []
+
+    records = []
+    with open(report_path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(FailureRecord.from_dict(json.loads(line)))
+            except (json.JSONDecodeError, KeyError):
+                continue
+    return records
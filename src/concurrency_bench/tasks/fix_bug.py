@@ -1,6 +1,13 @@
 import re
 import sys
 
+from concurrency_bench.spans import span
+from concurrency_bench.tasks.failure_report import (
+    FailureRecord,
+    failure_report_path,
+    read_failure_records,
+    reporter_agent_args,
+)
 from concurrency_bench.tasks.loaders.real_world_junit_loader import RealWorldJUnitLoader
 from concurrency_bench.tasks.task import ConcurrencyTask, TaskOutput
 
@@ -8,6 +15,9 @@ from concurrency_bench.tasks.task import ConcurrencyTask, TaskOutput
 def extract_stack_trace(fray_output: str) -> str:
     """Extract the stack trace from Fray output when an assertion fails.
 
+    This is the fallback for runs without structured failure records
+    (see failure_report.py).
+
     Returns:
         The stack trace string or None if not found.
     """
@@ -27,6 +37,7 @@ class FixBugTask(ConcurrencyTask):
         super().__init__(workdir, loader)
         self.stack_trace = ""
         self.stdout = ""
+        self.failure_records: list[FailureRecord] = []
 
     def get_stack_trace(self) -> str:
         return self.stack_trace
@@ -83,32 +94,44 @@ class FixBugTask(ConcurrencyTask):
         """
         # Clone repository if loader supports it (for real-world loaders)
         if hasattr(self._loader, "clone_repo"):
-            self._loader.clone_repo(self._workdir)
+            with span("clone"):
+                self._loader.clone_repo(self._workdir)
 
-        self._loader.build(self._workdir)
+        with span("build"):
+            self._loader.build(self._workdir)
 
         # Real-world loaders handle Fray invocation internally
-        if isinstance(self._loader, RealWorldJUnitLoader):
-            [output, passes] = self._loader.run(self._workdir)
-        else:
-            # SCTBench-style loaders use simple command-line invocation
-            fray_work_dir = self._workdir / ".fray_workdir"
-            [output, passes] = self._loader.run(
-                self._workdir,
-                run_command=[
-                    "fray",
-                    "-cp",
-                    ".",
-                    f"{self._loader._task_name}",
-                    "--",
-                    "--redirect-stdout",
-                    f"--output={fray_work_dir}",
-                ],
-            )
+        with span("fray"):
+            if isinstance(self._loader, RealWorldJUnitLoader):
+                [output, passes] = self._loader.run(self._workdir)
+            else:
+                # SCTBench-style loaders use simple command-line invocation;
+                # the reporter agent writes a failure record for uncaught exceptions
+                fray_work_dir = self._workdir / ".fray_workdir"
+                report_path = failure_report_path(fray_work_dir)
+                report_path.unlink(missing_ok=True)
+                [output, passes] = self._loader.run(
+                    self._workdir,
+                    run_command=[
+                        "fray",
+                        "-cp",
+                        ".",
+                        *reporter_agent_args(report_path),
+                        f"{self._loader._task_name}",
+                        "--",
+                        "--redirect-stdout",
+                        f"--output={fray_work_dir}",
+                    ],
+                )
 
         # Extract stack trace if the test failed
         if not passes:
-            self.stack_trace = extract_stack_trace(output)
+            fray_work_dir = self._workdir / ".fray_workdir"
+            self.failure_records = read_failure_records(failure_report_path(fray_work_dir))
+            if self.failure_records:
+                self.stack_trace = self.failure_records[0].format_stack_trace()
+            else:
+                self.stack_trace = extract_stack_trace(output)
             stdout_file = self._workdir / ".fray_workdir" / "stdout.txt"
             if stdout_file.exists():
                 self.stdout = stdout_file.read_text()
@@ -130,25 +153,27 @@ class FixBugTask(ConcurrencyTask):
         Returns:
             TaskOutput: Result indicating if the fix was successful.
         """
-        self._loader.build(self._workdir)
+        with span("build"):
+            self._loader.build(self._workdir)
 
         # Real-world loaders handle Fray invocation internally
-        if isinstance(self._loader, RealWorldJUnitLoader):
-            [output, passes] = self._loader.run(self._workdir)
-        else:
-            # SCTBench-style loaders use simple command-line invocation
-            [output, passes] = self._loader.run(
-                self._workdir,
-                run_command=[
-                    "fray",
-                    "-cp",
-                    ".",
-                    f"{self._loader._task_name}",
-                    # TODO: Add Fray specific args after testing
-                    # "--scheduler=pos",
-                    # "--iterations=1000",
-                ],
-            )
+        with span("fray"):
+            if isinstance(self._loader, RealWorldJUnitLoader):
+                [output, passes] = self._loader.run(self._workdir)
+            else:
+                # SCTBench-style loaders use simple command-line invocation
+                [output, passes] = self._loader.run(
+                    self._workdir,
+                    run_command=[
+                        "fray",
+                        "-cp",
+                        ".",
+                        f"{self._loader._task_name}",
+                        # TODO: Add Fray specific args after testing
+                        # "--scheduler=pos",
+                        # "--iterations=1000",
+                    ],
+                )
         print("The output of the bug-triggering run:")
         print(output)
         return TaskOutput(success=passes, verify_output=output)
@@ -6,6 +6,10 @@ from pathlib import Path
 from subprocess import PIPE, STDOUT, run
 from typing import List, Optional
 
+from concurrency_bench.tasks.failure_report import (
+    FAILURE_REPORT_PROPERTY,
+    failure_report_path,
+)
 from concurrency_bench.tasks.loaders.task_loader import TaskLoader
 
 
@@ -109,6 +113,12 @@ class RealWorldJUnitLoader(TaskLoader):
         # Add ByteBuddy experimental flag to support newer Java versions
         properties["net.bytebuddy.experimental"] = "true"
 
+        # JUnitRunner appends structured failure records here; drop records
+        # left over from a previous run so only this run is reported
+        report_path = failure_report_path(fray_work_dir)
+        report_path.unlink(missing_ok=True)
+        properties[FAILURE_REPORT_PROPERTY] = str(report_path)
+
         # Build command: fray -cp <classpath> [--system-props "<props>"] org.pastalab.fray.helpers.JUnitRunner <junit_version> <test_class>#<test_method>
         command = [
             "fray",
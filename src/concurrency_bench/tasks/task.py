@@ -1,3 +1,4 @@
+import copy
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -29,3 +30,13 @@ class ConcurrencyTask:
 
     def verify(self) -> TaskOutput:
         pass
+
+    def fork(self, workdir: Path) -> "ConcurrencyTask":
+        """Return a copy of this task bound to a copy of its workdir.
+
+        State collected during setup (e.g. the stack trace) is shared, so the
+        copy can be verified without running setup again.
+        """
+        forked = copy.copy(self)
+        forked._workdir = workdir
+        return forked
@@ -0,0 +1,120 @@
+"""Helpers for keeping tool output and prompts within a token budget."""
+
+# Rough characters-per-token ratio for code and logs. We only need an
+# estimate that is cheap and stable across providers, not an exact count.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of LLM tokens in a piece of text.
+
+    Args:
+        text: The text to measure.
+
+    Returns:
+        int: Approximate token count.
+    """
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def collapse_repeated_lines(text: str) -> str:
+    """Collapse runs of identical consecutive lines.
+
+    Deep recursion and busy-wait loops produce long runs of the same stack
+    frame or log line; only the first one is kept, followed by a count.
+
+    Args:
+        text: The text to collapse.
+
+    Returns:
+        str: Text with repeated lines replaced by a single line and a marker.
+    """
+    lines = text.splitlines()
+    collapsed = []
+    i = 0
+    while i < len(lines):
+        j = i + 1
+        while j < len(lines) and lines[j] == lines[i]:
+            j += 1
+        collapsed.append(lines[i])
+        repeats = j - i - 1
+        if repeats > 0:
+            collapsed.append(f"    ... (previous line repeated {repeats} more times)")
+        i = j
+    return "\n".join(collapsed)
+
+
+def collapse_duplicate_blocks(text: str) -> str:
+    """Drop blank-line separated blocks that already appeared earlier.
+
+    Fray prints a thread dump for every thread on failure, and many threads
+    (e.g. idle pool workers) share exactly the same stack.
+
+    Args:
+        text: The text to deduplicate.
+
+    Returns:
+        str: Text with duplicate blocks replaced by a short marker.
+    """
+    blocks = text.split("\n\n")
+    seen: dict[str, int] = {}
+    result = []
+    for block in blocks:
+        key = block.strip()
+        if not key:
+            result.append(block)
+            continue
+        if key in seen:
+            seen[key] += 1
+            continue
+        seen[key] = 0
+        result.append(block)
+
+    omitted = sum(seen.values())
+    if omitted:
+        result.append(f"[{omitted} duplicate block(s) omitted]")
+    return "\n\n".join(result)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, note: str = "") -> str:
+    """Truncate text to a token budget, keeping its head and tail.
+
+    Args:
+        text: The text to truncate.
+        max_tokens: Maximum number of tokens to keep.
+        note: Extra information appended to the truncation marker.
+
+    Returns:
+        str: The original text if it fits, otherwise head and tail joined by
+        a marker that reports how many lines were dropped.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    max_chars = max(max_tokens, 0) * CHARS_PER_TOKEN
+    head_chars = max_chars // 2
+    tail_chars = max_chars - head_chars
+
+    head = text[:head_chars]
+    tail = text[len(text) - tail_chars :] if tail_chars else ""
+    # Cut on line boundaries so we never show half a stack frame
+    if "\n" in head:
+        head = head[: head.rfind("\n")]
+    if "\n" in tail:
+        tail = tail[tail.find("\n") + 1 :]
+
+    omitted = text.count("\n") - head.count("\n") - tail.count("\n")
+    marker = f"[... {max(omitted, 0)} lines omitted"
+    if note:
+        marker += f"; {note}"
+    marker += " ...]"
+    return f"{head}\n{marker}\n{tail}"
+
+
+def tail_lines(text: str, count: int) -> str:
+    """Return the last `count` lines of text."""
+    if count <= 0:
+        return ""
+    return "\n".join(text.splitlines()[-count:])
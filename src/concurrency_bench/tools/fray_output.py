@@ -0,0 +1,104 @@
+"""Summarize Fray output before it is shown to the LLM."""
+
+import re
+from pathlib import Path
+
+from concurrency_bench.text_budget import (
+    collapse_duplicate_blocks,
+    collapse_repeated_lines,
+    estimate_tokens,
+    truncate_to_tokens,
+)
+
+# Default token budget for a single rerun_fray observation
+FRAY_OUTPUT_TOKEN_BUDGET = 4000
+
+# Lines that start a failure report in Fray, JUnitRunner or plain JVM output
+FAILURE_START_PATTERN = re.compile(
+    r"\[INFO\]: Error: |Exception in thread |Assertion failed: |testHeader: "
+    r"|^\S*(Exception|Error)(: |$)"
+)
+# Longest failure block we keep before the rest of the output is budgeted
+MAX_FAILURE_LINES = 80
+
+
+def extract_first_failure(output: str) -> str:
+    """Extract the first failure (message and stack) from Fray output.
+
+    The block starts at the first line that looks like an error report and
+    ends at the first blank line that follows a stack frame.
+
+    Args:
+        output: Raw Fray output.
+
+    Returns:
+        str: The failure block, or empty string if none was found.
+    """
+    lines = output.splitlines()
+    for start, line in enumerate(lines):
+        if FAILURE_START_PATTERN.search(line):
+            break
+    else:
+        return ""
+
+    block = []
+    seen_frame = False
+    for line in lines[start : start + MAX_FAILURE_LINES]:
+        if not line.strip() and seen_frame:
+            break
+        if line.lstrip().startswith("at "):
+            seen_frame = True
+        block.append(line)
+    return "\n".join(block).strip()
+
+
+def condense_output(output: str) -> str:
+    """Collapse repeated frames and duplicate thread dumps."""
+    return collapse_duplicate_blocks(collapse_repeated_lines(output))
+
+
+def summarize_fray_output(
+    stdout: str,
+    stderr: str,
+    max_tokens: int = FRAY_OUTPUT_TOKEN_BUDGET,
+    log_path: Path | None = None,
+) -> str:
+    """Build a bounded, deduplicated view of a Fray run.
+
+    The first failure is always shown in full (up to MAX_FAILURE_LINES),
+    then stdout and stderr share whatever budget is left.
+
+    Args:
+        stdout: Standard output from the Fray command.
+        stderr: Standard error from the Fray command.
+        max_tokens: Token budget for the whole summary.
+        log_path: Location of the full log, mentioned when output is cut.
+
+    Returns:
+        str: Summary text suitable for the LLM.
+    """
+    note = f"full output in {log_path}" if log_path else ""
+    sections = []
+
+    failure = extract_first_failure(stdout) or extract_first_failure(stderr)
+    if failure:
+        failure = truncate_to_tokens(condense_output(failure), max_tokens // 2, note)
+        sections.append(f"=== FIRST FAILURE ===\n{failure}")
+
+    remaining = max_tokens - sum(estimate_tokens(s) for s in sections)
+    non_empty = [
+        (name, condense_output(text))
+        for name, text in (("STDOUT", stdout), ("STDERR", stderr))
+        if text.strip()
+    ]
+    if not non_empty:
+        sections.append("=== STDOUT ===\n(empty)")
+
+    for name, text in non_empty:
+        budget = max(remaining // len(non_empty), 0)
+        sections.append(f"=== {name} ===\n{truncate_to_tokens(text, budget, note)}")
+
+    summary = "\n\n".join(sections)
+    if log_path and estimate_tokens(stdout) + estimate_tokens(stderr) > max_tokens:
+        summary += f"\n\nOutput was condensed; the full log is at {log_path}"
+    return summary
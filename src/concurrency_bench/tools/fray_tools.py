@@ -1,6 +1,10 @@
 """Fray-specific tools for debugging concurrency bugs."""
 
+import shutil
+import tempfile
+import weakref
 from collections.abc import Sequence
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 from pydantic import Field
@@ -19,6 +23,12 @@ from openhands.sdk.tool import (
 from openhands.tools.terminal.impl import TerminalExecutor
 from openhands.tools.terminal.definition import TerminalAction
 
+from concurrency_bench.resources import admit_agent_command
+from concurrency_bench.tools.fray_output import (
+    FRAY_OUTPUT_TOKEN_BUDGET,
+    summarize_fray_output,
+)
+
 
 class RerunFrayAction(Action):
     """Schema for rerunning Fray to verify the fix."""
@@ -35,6 +45,9 @@ class RerunFrayObservation(Observation):
     exit_code: int = Field(description="The exit code from running the command")
     stdout: str = Field(default="", description="Standard output from the command")
     stderr: str = Field(default="", description="Standard error from the command")
+    log_path: str | None = Field(
+        default=None, description="Path to the file holding the full, untruncated output"
+    )
 
     @property
     def to_llm_content(self) -> Sequence[TextContent | ImageContent]:
@@ -47,15 +60,21 @@ class RerunFrayObservation(Observation):
 
         if self.exit_code == 0:
             result += "✅ Test PASSED - No concurrency bug detected\n\n"
-            if self.stdout:
-                result += f"=== STDOUT ===\n{self.stdout}\n\n"
-            if self.stderr:
-                result += f"=== STDERR ===\n{self.stderr}\n\n"
+            if not self.stdout and not self.stderr:
+                llm_content.append(TextContent(text=result))
+                return llm_content
         else:
             result += "❌ Test FAILED - Concurrency bug still present\n\n"
-            # Always include stdout/stderr on failure for debugging
-            result += f"=== STDOUT ===\n{self.stdout or '(empty)'}\n\n"
-            result += f"=== STDERR ===\n{self.stderr or '(empty)'}\n\n"
+
+        # Fray output can be tens of thousands of tokens of repeated frames,
+        # so only a bounded summary goes into the LLM context.
+        result += summarize_fray_output(
+            self.stdout,
+            self.stderr,
+            max_tokens=FRAY_OUTPUT_TOKEN_BUDGET,
+            log_path=Path(self.log_path) if self.log_path else None,
+        )
+        result += "\n\n"
 
         llm_content.append(TextContent(text=result))
         return llm_content
@@ -64,15 +83,50 @@ class RerunFrayObservation(Observation):
 class RerunFrayExecutor(ToolExecutor):
     """Executor for rerunning Fray tests."""
 
-    def __init__(self, terminal_executor: TerminalExecutor):
+    def __init__(self, terminal_executor: TerminalExecutor, log_dir: Path | None = None):
         self.terminal_executor = terminal_executor
+        self.run_count = 0
+        if log_dir is not None:
+            self.log_dir = log_dir
+            self._remove_logs = None
+        else:
+            # Own temporary directory: removed on close(), or when the executor
+            # is garbage collected or the process exits if close() never runs.
+            # Its prefix is one the response cache normalizes (log paths reach
+            # the prompt, see response_cache.canonical_request).
+            self.log_dir = Path(tempfile.mkdtemp(prefix="concurrency_bench_fray_logs_"))
+            self._remove_logs = weakref.finalize(
+                self, shutil.rmtree, self.log_dir, ignore_errors=True
+            )
+
+    def close(self) -> None:
+        """Remove the log directory if the executor created it."""
+        if self._remove_logs is not None:
+            self._remove_logs()
+
+    def save_log(self, command: str, stdout: str, stderr: str) -> Path:
+        """Write the full output of a Fray run to disk.
+
+        Logs live outside the workspace so they never end up in the patch.
+
+        Returns:
+            Path: Location of the saved log.
+        """
+        self.run_count += 1
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        log_path = self.log_dir / f"rerun_{self.run_count:03d}.log"
+        log_path.write_text(
+            f"Command: {command}\n\n=== STDOUT ===\n{stdout}\n\n=== STDERR ===\n{stderr}\n"
+        )
+        return log_path
 
     def __call__(self, action: RerunFrayAction, conversation=None) -> RerunFrayObservation:
         """Execute Fray rerun."""
         try:
             # Execute the command via terminal (synchronous call)
             terminal_action = TerminalAction(command=action.command)
-            terminal_obs = self.terminal_executor(terminal_action, conversation)
+            with admit_agent_command(action.command):
+                terminal_obs = self.terminal_executor(terminal_action, conversation)
 
             # Extract stdout and stderr from terminal observation metadata
             stdout = getattr(terminal_obs.metadata, 'stdout', '') or ''
@@ -82,12 +136,15 @@ class RerunFrayExecutor(ToolExecutor):
             if not stdout and not stderr:
                 stdout = terminal_obs.text
 
+            log_path = self.save_log(action.command, stdout, stderr)
+
             return RerunFrayObservation(
                 content=[TextContent(text=terminal_obs.text)],
                 command=action.command,
                 exit_code=terminal_obs.metadata.exit_code,
                 stdout=stdout,
                 stderr=stderr,
+                log_path=str(log_path),
                 is_error=terminal_obs.metadata.exit_code != 0,
             )
         except Exception as e:
@@ -116,6 +173,7 @@ Example usage for real-world projects:
 - command: "fray -cp <full-classpath> org.pastalab.fray.helpers.JUnitRunner junit5 org.apache.kafka.streams.KafkaStreamsTest#shouldReturnFalse"
 
 The tool will return whether the test passed (exit code 0, no bug) or failed (non-zero exit code, bug present).
+Long output is condensed to the first failure plus deduplicated stdout/stderr; the path of the full log is included so you can inspect it with the terminal.
 """
 
 
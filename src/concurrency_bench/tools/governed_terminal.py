@@ -0,0 +1,39 @@
+"""Terminal tool whose builds and Fray runs go through the resource governor."""
+
+from typing import TYPE_CHECKING
+
+from openhands.sdk.tool import ToolExecutor, register_tool
+from openhands.tools.terminal import TerminalTool
+
+from concurrency_bench.resources import admit_agent_command
+
+if TYPE_CHECKING:
+    from openhands.sdk.conversation.state import ConversationState
+
+# Registry name of the governed terminal (the tool the LLM sees is still "terminal")
+GOVERNED_TERMINAL = "GovernedTerminal"
+
+
+class GovernedExecutor(ToolExecutor):
+    """Admit heavy commands (see resources.admit_agent_command) before running them."""
+
+    def __init__(self, executor: ToolExecutor):
+        self.executor = executor
+
+    def __call__(self, action, conversation=None):
+        with admit_agent_command(getattr(action, "command", "") or ""):
+            return self.executor(action, conversation)
+
+    def close(self) -> None:
+        self.executor.close()
+
+
+def _make_governed_terminal(conv_state: "ConversationState", **params):
+    """Create the SDK terminal tools with their executors wrapped."""
+    return [
+        tool.model_copy(update={"executor": GovernedExecutor(tool.executor)})
+        for tool in TerminalTool.create(conv_state, **params)
+    ]
+
+
+register_tool(GOVERNED_TERMINAL, _make_governed_terminal)
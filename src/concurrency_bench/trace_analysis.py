@@ -0,0 +1,185 @@
+"""Where a run's time and tokens went, reconstructed from its saved events.
+
+Events carry timestamps but no durations, so the time between consecutive
+events is attributed to whatever the later event finished:
+
+- an agent action or message that starts a new LLM response: LLM latency
+  (actions sharing an llm_response_id are one call)
+- an observation: execution time of its tool (terminal, file_editor,
+  rerun_fray, ...); tools of one response run one after another
+- a condensation: the condenser's summarizing LLM call
+- anything else: idle time (conversation bookkeeping, retries, errors);
+  gaps of at least IDLE_GAP_SECONDS are listed individually
+
+Token counts come from the LLM metrics snapshots attached to agent events
+(accumulated over the conversation, so per-call usage is the difference to
+the previous snapshot). Traces without snapshots report latencies only.
+"""
+
+import statistics
+from datetime import datetime
+from pathlib import Path
+
+from concurrency_bench.event_log import read_events
+
+# Events that do not finish any work (status changes of the conversation)
+IGNORED_KINDS = {"ConversationStateUpdateEvent", "PauseEvent"}
+OBSERVATION_KINDS = {"ObservationEvent", "AgentErrorEvent", "UserRejectObservation"}
+CONDENSATION_KINDS = {"Condensation", "CondensationSummaryEvent"}
+# Unattributed gaps at least this long are listed as idle gaps
+IDLE_GAP_SECONDS = 5.0
+# Upper bounds (seconds) of the histogram buckets; a last bucket takes the rest
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+
+
+def load_trace_events(result_file: Path, trace: dict) -> list[dict]:
+    """Events of a result, inline or from its event log (see event_log.py)."""
+    if "events" in trace:
+        return trace["events"]
+    events_file = trace.get("events_file")
+    if not events_file:
+        return []
+    return read_events(result_file.parent / events_file)
+
+
+def _timestamp(event: dict) -> float | None:
+    try:
+        return datetime.fromisoformat(event["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _accumulated_usage(event: dict) -> dict | None:
+    metrics = event.get("metrics") or {}
+    return metrics.get("accumulated_token_usage")
+
+
+def _is_llm_output(event: dict) -> bool:
+    return event.get("source") == "agent" and event.get("kind") in ("ActionEvent", "MessageEvent")
+
+
+def analyze_events(events: list[dict]) -> dict:
+    """Split a run's time into LLM calls, tool executions and idle gaps.
+
+    Args:
+        events: Serialized conversation events, in order.
+
+    Returns:
+        dict: "llm_calls" (latency_seconds, input_tokens, output_tokens,
+        cached_tokens per call), "tool_calls" (tool, seconds),
+        "condensations" (seconds), "idle_gaps" (seconds, after, before),
+        "idle_seconds" and "wall_seconds".
+    """
+    llm_calls: list[dict] = []
+    tool_calls: list[dict] = []
+    condensations: list[dict] = []
+    idle_gaps: list[dict] = []
+    idle_seconds = 0.0
+    previous = None
+    previous_time = None
+    first_time = None
+    response_id = None
+    last_usage = None
+
+    for event in events:
+        if event.get("kind") in IGNORED_KINDS:
+            continue
+        at = _timestamp(event)
+        if at is None:
+            continue
+        if first_time is None:
+            first_time = at
+        gap = max(at - previous_time, 0.0) if previous_time is not None else 0.0
+        kind = event.get("kind")
+
+        if _is_llm_output(event):
+            event_response = event.get("llm_response_id")
+            if event_response is None or event_response != response_id:
+                llm_calls.append(
+                    {
+                        "latency_seconds": gap,
+                        "input_tokens": None,
+                        "output_tokens": None,
+                        "cached_tokens": None,
+                    }
+                )
+                response_id = event_response
+            usage = _accumulated_usage(event)
+            if usage is not None:
+                before = last_usage or {}
+                call = llm_calls[-1]
+                call["input_tokens"] = usage.get("prompt_tokens", 0) - before.get("prompt_tokens", 0)
+                call["output_tokens"] = usage.get("completion_tokens", 0) - before.get(
+                    "completion_tokens", 0
+                )
+                call["cached_tokens"] = (usage.get("cache_read_tokens") or 0) - (
+                    before.get("cache_read_tokens") or 0
+                )
+                last_usage = usage
+        elif previous is not None and (kind in OBSERVATION_KINDS or "action_id" in event):
+            tool_calls.append({"tool": event.get("tool_name") or "unknown", "seconds": gap})
+        elif previous is not None and kind in CONDENSATION_KINDS:
+            condensations.append({"seconds": gap})
+        elif previous is not None:
+            idle_seconds += gap
+            if gap >= IDLE_GAP_SECONDS:
+                idle_gaps.append(
+                    {"seconds": gap, "after": previous.get("kind"), "before": kind}
+                )
+
+        if not _is_llm_output(event):
+            response_id = None
+        previous = event
+        previous_time = at
+
+    return {
+        "llm_calls": llm_calls,
+        "tool_calls": tool_calls,
+        "condensations": condensations,
+        "idle_gaps": idle_gaps,
+        "idle_seconds": idle_seconds,
+        "wall_seconds": (previous_time - first_time) if first_time is not None else 0.0,
+    }
+
+
+def summarize_analysis(analysis: dict) -> dict:
+    """Per-run totals of an analysis, compact enough for the aggregate output."""
+    latencies = [call["latency_seconds"] for call in analysis["llm_calls"]]
+    tool_seconds: dict[str, float] = {}
+    tool_counts: dict[str, int] = {}
+    for call in analysis["tool_calls"]:
+        tool_seconds[call["tool"]] = tool_seconds.get(call["tool"], 0.0) + call["seconds"]
+        tool_counts[call["tool"]] = tool_counts.get(call["tool"], 0) + 1
+
+    def total(key):
+        values = [call[key] for call in analysis["llm_calls"] if call[key] is not None]
+        return sum(values) if values else None
+
+    return {
+        "wall_seconds": analysis["wall_seconds"],
+        "llm_calls": len(latencies),
+        "llm_seconds": sum(latencies),
+        "llm_latency_median": statistics.median(latencies) if latencies else None,
+        "llm_latency_max": max(latencies) if latencies else None,
+        "input_tokens": total("input_tokens"),
+        "output_tokens": total("output_tokens"),
+        "cached_tokens": total("cached_tokens"),
+        "tool_seconds": tool_seconds,
+        "tool_calls": tool_counts,
+        "condenser_seconds": sum(c["seconds"] for c in analysis["condensations"]),
+        "idle_seconds": analysis["idle_seconds"],
+        "idle_gaps": len(analysis["idle_gaps"]),
+    }
+
+
+def histogram(values: list[float], buckets: tuple = LATENCY_BUCKETS) -> dict:
+    """Counts of values per bucket; "le" holds the upper bounds, None = unbounded."""
+    counts = [0] * (len(buckets) + 1)
+    for value in values:
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    return {"le": list(buckets) + [None], "counts": counts}
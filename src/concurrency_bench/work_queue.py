@@ -0,0 +1,245 @@
+"""File-backed work queue with leases, shared by several harness hosts.
+
+Hosts running the same sweep against a shared directory (e.g. on NFS) claim
+each unit of work before running it, so no unit runs twice at the same time:
+
+    queue_dir/
+        leases/<hash>.lease   held by exactly one host while the unit runs
+        done/<hash>.json      written when the unit's run saved its result (success
+                              or not); a run that crashed is released instead
+                              and retried
+
+Claims use O_CREAT|O_EXCL, which is atomic on local filesystems and NFSv3+.
+The owner refreshes the lease mtime from a heartbeat thread; a lease that was
+not refreshed for `lease_seconds` is considered abandoned (crashed host) and
+may be taken over, which re-queues the unit. Lease ages are measured against
+the file server's clock, so clock skew between hosts does not matter.
+
+A host can lose a lease it still works on (it stalled past lease_seconds,
+or a takeover race replaced it). The runner checks its Lease before saving
+results and leaves the unit to the new holder if the lease is gone.
+"""
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+# Default time after which a lease without heartbeat is considered abandoned
+DEFAULT_LEASE_SECONDS = 600
+
+
+@dataclass(frozen=True)
+class Lease:
+    """One claim on a unit; picklable, so matrix workers can check it too."""
+
+    path: Path
+    token: str
+
+    def held(self) -> bool:
+        """Whether the lease file still carries this claim (no other host took over)."""
+        try:
+            return json.loads(self.path.read_text() or "{}").get("token") == self.token
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+
+
+class FileWorkQueue:
+    """Claim, heartbeat and complete units of work through a shared directory."""
+
+    def __init__(
+        self,
+        queue_dir: Path,
+        lease_seconds: int = DEFAULT_LEASE_SECONDS,
+        heartbeat_interval: float | None = None,
+    ):
+        """Initialize the queue.
+
+        Args:
+            queue_dir: Shared directory holding leases and completion markers.
+            lease_seconds: Age after which an unrefreshed lease expires.
+            heartbeat_interval: Seconds between lease refreshes (default: a
+                third of lease_seconds).
+        """
+        self.queue_dir = queue_dir
+        self.lease_dir = queue_dir / "leases"
+        self.done_dir = queue_dir / "done"
+        self.lease_dir.mkdir(parents=True, exist_ok=True)
+        self.done_dir.mkdir(parents=True, exist_ok=True)
+
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval or lease_seconds / 3
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        # key -> token of the leases this process currently holds
+        self._held: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = threading.Thread(
+            target=self._heartbeat_loop, name="work-queue-heartbeat", daemon=True
+        )
+        self._heartbeat.start()
+
+    @staticmethod
+    def _name(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+    def _lease_path(self, key: str) -> Path:
+        return self.lease_dir / f"{self._name(key)}.lease"
+
+    def _done_path(self, key: str) -> Path:
+        return self.done_dir / f"{self._name(key)}.json"
+
+    def _server_now(self) -> float:
+        """Current time according to the filesystem holding the queue."""
+        clock = self.queue_dir / f".clock-{self._name(self.owner)}"
+        clock.touch()
+        return clock.stat().st_mtime
+
+    def _create_lease(self, key: str) -> bool:
+        token = uuid.uuid4().hex
+        try:
+            fd = os.open(self._lease_path(key), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            json.dump({"key": key, "owner": self.owner, "token": token}, f)
+        with self._lock:
+            self._held[key] = token
+        return True
+
+    def _read_lease(self, path: Path) -> tuple[dict, float] | None:
+        try:
+            mtime = path.stat().st_mtime
+            return json.loads(path.read_text() or "{}"), mtime
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _take_over_expired(self, key: str) -> bool:
+        """Re-queue an abandoned lease by moving it aside, then claim it."""
+        lease_path = self._lease_path(key)
+        current = self._read_lease(lease_path)
+        if current is None:
+            return self._create_lease(key)
+        lease, mtime = current
+        if self._server_now() - mtime < self.lease_seconds:
+            return False
+
+        # Rename is atomic, so only one host moves a given lease file aside.
+        # If another host replaced the expired lease in the meantime, we may
+        # have moved its fresh lease instead; in that case put it back.
+        aside = self.lease_dir / f"{lease_path.name}.expired-{uuid.uuid4().hex}"
+        try:
+            os.rename(lease_path, aside)
+        except FileNotFoundError:
+            return False
+        moved = self._read_lease(aside)
+        if moved is not None and moved[0].get("token") != lease.get("token"):
+            try:
+                os.link(aside, lease_path)
+            except FileExistsError:
+                # A third host claimed the unit meanwhile. The moved lease
+                # stays aside: its owner's heartbeat reports the loss and
+                # removes it, and its runner does not save results.
+                return False
+            aside.unlink(missing_ok=True)
+            return False
+        aside.unlink(missing_ok=True)
+        print(f"Lease for {key} held by {lease.get('owner')} expired, re-queueing")
+        return self._create_lease(key)
+
+    def lease(self, key: str) -> Lease | None:
+        """The lease this process holds on a unit, if any."""
+        with self._lock:
+            token = self._held.get(key)
+        return None if token is None else Lease(self._lease_path(key), token)
+
+    def _discard_aside(self, key: str, token: str):
+        """Remove a lost lease of ours that a takeover left moved aside."""
+        for aside in self.lease_dir.glob(f"{self._lease_path(key).name}.expired-*"):
+            moved = self._read_lease(aside)
+            if moved is not None and moved[0].get("token") == token:
+                aside.unlink(missing_ok=True)
+
+    def is_done(self, key: str) -> bool:
+        """Check whether any host has completed the unit."""
+        return self._done_path(key).exists()
+
+    def try_claim(self, key: str) -> bool:
+        """Try to claim a unit of work.
+
+        Returns:
+            bool: True if this process now holds the lease and should run the
+            unit; False if it is done or leased by a live host.
+        """
+        if self.is_done(key):
+            return False
+        if self._create_lease(key) or self._take_over_expired(key):
+            # The unit may have completed between the check and the claim
+            if self.is_done(key):
+                self.release(key)
+                return False
+            return True
+        return False
+
+    def complete(self, key: str, success: bool | None, error: str | None = None):
+        """Mark a claimed unit as done and drop its lease."""
+        done = {
+            "key": key,
+            "owner": self.owner,
+            "success": success,
+            "error": error,
+            "completed_at": time.time(),
+        }
+        tmp = self._done_path(key).with_suffix(f".tmp-{uuid.uuid4().hex}")
+        tmp.write_text(json.dumps(done))
+        os.replace(tmp, self._done_path(key))
+        self.release(key)
+
+    def release(self, key: str):
+        """Give up a lease without completing, so another host can run the unit."""
+        with self._lock:
+            token = self._held.pop(key, None)
+        if token is None:
+            return
+        current = self._read_lease(self._lease_path(key))
+        if current is not None and current[0].get("token") == token:
+            self._lease_path(key).unlink(missing_ok=True)
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            with self._lock:
+                held = dict(self._held)
+            for key, token in held.items():
+                lease_path = self._lease_path(key)
+                current = self._read_lease(lease_path)
+                if current is None or current[0].get("token") != token:
+                    print(
+                        f"Warning: lost lease for {key} (taken over by another host), "
+                        "its results will not be saved here"
+                    )
+                    with self._lock:
+                        self._held.pop(key, None)
+                    self._discard_aside(key, token)
+                    continue
+                os.utime(lease_path)
+
+    def close(self):
+        """Stop heartbeating and release all leases still held."""
+        self._stop.set()
+        self._heartbeat.join()
+        with self._lock:
+            keys = list(self._held)
+        for key in keys:
+            self.release(key)
+
+    def __enter__(self) -> "FileWorkQueue":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,16 @@
+"""Start method of the worker processes.
+
+Worker processes are started while the parent runs threads (setup
+prefetching, queue heartbeats, RSS samplers, an asyncio loop). A plain
+fork copies whatever locks those threads hold at that moment, which can
+deadlock the child, so workers come from a fork server instead. Shared
+state (governor, rate limiter) has to be created from the same context to
+be passed to them.
+"""
+
+import multiprocessing
+
+
+def worker_context():
+    """Multiprocessing context for worker processes and the state they share."""
+    return multiprocessing.get_context("forkserver")
@@ -0,0 +1,88 @@
+"""fix_sctbench_patches must read and write diffs the way git apply does."""
+
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from fix_sctbench_patches import apply_file_diff, file_diff
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+ORIGINAL = """public class Reorder3Bad {
+
+    static int a = 0;
+
+    static int b = 0;
+
+    public static void main(String[] args) {
+        new Thread(() -> { a = 1; b = -1; }).start();
+
+        new Thread(() -> check()).start();
+    }
+
+    static void check() {
+        if (!((a == 0 && b == 0) || (a == 1 && b == -1))) {
+            throw new AssertionError();
+        }
+    }
+}
+"""
+
+MODIFIED = """public class Reorder3Bad {
+
+    static int a = 0;
+
+    static int b = 0;
+
+    public static void main(String[] args) {
+        new Thread(() -> { synchronized (Reorder3Bad.class) { a = 1; b = -1; } }).start();
+
+        new Thread(() -> check()).start();
+    }
+
+    static synchronized void check() {
+        if (!((a == 0 && b == 0) || (a == 1 && b == -1))) {
+            throw new AssertionError();
+        }
+    }
+}"""
+
+
+def git_diff(tmp_path: Path, original: str, modified: str) -> str:
+    for side, content in (("a", original), ("b", modified)):
+        (tmp_path / side).mkdir()
+        (tmp_path / side / "Reorder3Bad.java").write_text(content)
+    result = subprocess.run(
+        ["git", "diff", "--no-index", "a/Reorder3Bad.java", "b/Reorder3Bad.java"],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout
+
+
+def git_apply(tmp_path: Path, original: str, diff: str) -> str:
+    (tmp_path / "Reorder3Bad.java").write_text(original)
+    (tmp_path / "fix.patch").write_text(diff)
+    subprocess.run(["git", "apply", "fix.patch"], cwd=tmp_path, check=True)
+    return (tmp_path / "Reorder3Bad.java").read_text()
+
+
+def test_file_diff_applies_with_git(tmp_path):
+    diff = file_diff("Reorder3Bad.java", ORIGINAL, MODIFIED)
+    assert git_apply(tmp_path, ORIGINAL, diff) == MODIFIED
+
+
+def test_apply_file_diff_matches_git(tmp_path):
+    diff = git_diff(tmp_path, ORIGINAL, MODIFIED)
+    assert apply_file_diff(ORIGINAL, diff) == MODIFIED
+
+
+def test_apply_file_diff_blank_context_without_space(tmp_path):
+    # Editors and some storage layers strip the space of blank context lines
+    diff = git_diff(tmp_path, ORIGINAL, MODIFIED)
+    stripped = "\n".join(line.rstrip() if not line.strip() else line for line in diff.split("\n"))
+    assert stripped != diff
+    assert apply_file_diff(ORIGINAL, stripped) == MODIFIED
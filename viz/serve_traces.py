@@ -8,10 +8,15 @@ import http.server
 import socketserver
 import json
 import os
+import sqlite3
+import threading
+import time
 from pathlib import Path
 from urllib.parse import urlparse, parse_qs, unquote
 import mimetypes
 
+from concurrency_bench.event_log import read_events
+
 PORT = 8001
 # Use absolute path resolution to avoid issues with working directory changes
 SCRIPT_DIR = Path(__file__).resolve().parent
@@ -21,6 +26,217 @@ VISUALIZER_PATH = SCRIPT_DIR / "traces.html"
 LEADERBOARD_PATH = SCRIPT_DIR / "leaderboard.html"
 BLOG_PATH = SCRIPT_DIR / "blog.html"
 LEADERBOARD_DATA_PATH = SCRIPT_DIR / "leaderboard_data.json"
+SEARCH_INDEX_PATH = RESULTS_DIR / ".trace_search.sqlite"
+# Seconds between scans of the results directory for new or changed traces
+SEARCH_REFRESH_SECONDS = 5.0
+SEARCH_LIMIT = 50
+
+
+def event_text(value):
+    """All string values of an event, space-separated (inline images skipped)."""
+    if isinstance(value, str):
+        return "" if value.startswith("data:") else value
+    if isinstance(value, dict):
+        return " ".join(filter(None, (event_text(v) for v in value.values())))
+    if isinstance(value, list):
+        return " ".join(filter(None, (event_text(v) for v in value)))
+    return ""
+
+
+class TraceSearchIndex:
+    """SQLite FTS5 index over event text, tool names and patches of all traces.
+
+    The index lives next to the results and is updated incrementally: a
+    trace is re-indexed when its result, patch or event log changed since
+    it was indexed, and dropped when its result is gone.
+
+    Refreshes run on a background thread (see start) through the one
+    writing connection, guarded by a lock. Searches never refresh: each
+    request thread reads through its own read-only connection, which WAL
+    mode lets run alongside a refresh.
+    """
+
+    def __init__(self, results_dir, index_path):
+        self.results_dir = results_dir
+        self.index_path = index_path
+        self.db = sqlite3.connect(index_path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS traces (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE,
+                model TEXT,
+                config TEXT,
+                category TEXT,
+                instance_id TEXT,
+                success INTEGER,
+                signature TEXT
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS traces_fts USING fts5(
+                instance_id, tools, events, patch, verify_output
+            );
+        """)
+        self.lock = threading.Lock()
+        self._readers = threading.local()
+        self._stopped = threading.Event()
+
+    @staticmethod
+    def _signature(json_file):
+        mtimes = []
+        for path in (json_file, json_file.with_suffix(".patch"), json_file.with_suffix(".events.jsonl")):
+            mtimes.append(str(path.stat().st_mtime_ns) if path.exists() else "-")
+        return ":".join(mtimes)
+
+    def _index_trace(self, json_file, rel_path, signature):
+        with open(json_file, 'r', encoding='utf-8') as f:
+            trace = json.load(f)
+        events = trace.get("events")
+        if events is None and trace.get("events_file"):
+            events = read_events(json_file.parent / trace["events_file"])
+        events = events or []
+        patch_file = json_file.with_suffix(".patch")
+        patch = patch_file.read_text(encoding='utf-8', errors='replace') if patch_file.exists() else ""
+        tools = sorted({e["tool_name"] for e in events if isinstance(e, dict) and e.get("tool_name")})
+
+        # Layout: {model}/{config}/{rep}/{task_type}/{category}/{id}.json
+        parts = rel_path.parts
+        success = trace.get("success")
+        row = self.db.execute(
+            """INSERT INTO traces (path, model, config, category, instance_id, success, signature)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(path) DO UPDATE SET
+                   model = excluded.model, config = excluded.config,
+                   category = excluded.category, instance_id = excluded.instance_id,
+                   success = excluded.success, signature = excluded.signature
+               RETURNING id""",
+            (
+                str(rel_path),
+                parts[0],
+                parts[1] if len(parts) > 2 else None,
+                trace.get("benchmark_category", parts[-2]),
+                trace.get("instance_id", json_file.stem),
+                None if success is None else int(bool(success)),
+                signature,
+            ),
+        ).fetchone()
+        self.db.execute("DELETE FROM traces_fts WHERE rowid = ?", row)
+        self.db.execute(
+            "INSERT INTO traces_fts (rowid, instance_id, tools, events, patch, verify_output) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                row[0],
+                trace.get("instance_id", json_file.stem),
+                " ".join(tools),
+                "\n".join(event_text(e) for e in events),
+                patch,
+                event_text(trace.get("verify_output")),
+            ),
+        )
+
+    def refresh(self):
+        """Index new and changed traces, drop deleted ones.
+
+        Returns:
+            int: Number of traces (re-)indexed.
+        """
+        with self.lock:
+            return self._refresh()
+
+    def _refresh(self):
+        indexed = dict(self.db.execute("SELECT path, signature FROM traces"))
+        seen = set()
+        updated = 0
+        if self.results_dir.exists():
+            for json_file in self.results_dir.rglob("*.json"):
+                rel_path = json_file.relative_to(self.results_dir)
+                # Top-level files (e.g. durations.json) are bookkeeping, not traces
+                if len(rel_path.parts) < 2:
+                    continue
+                seen.add(str(rel_path))
+                try:
+                    signature = self._signature(json_file)
+                    if indexed.get(str(rel_path)) == signature:
+                        continue
+                    self._index_trace(json_file, rel_path, signature)
+                    updated += 1
+                except (OSError, ValueError, AttributeError) as e:
+                    # Partially written or foreign JSON; retried on the next refresh
+                    print(f"[SEARCH] Skipping {rel_path}: {e}")
+        for path in indexed.keys() - seen:
+            row = self.db.execute("DELETE FROM traces WHERE path = ? RETURNING id", (path,)).fetchone()
+            self.db.execute("DELETE FROM traces_fts WHERE rowid = ?", row)
+        self.db.commit()
+        if updated:
+            print(f"[SEARCH] Indexed {updated} trace(s)")
+        return updated
+
+    def start(self, interval=SEARCH_REFRESH_SECONDS):
+        """Refresh every `interval` seconds on a daemon thread until stop()."""
+        def run():
+            while not self._stopped.wait(interval):
+                try:
+                    self.refresh()
+                except sqlite3.Error as e:
+                    print(f"[SEARCH] Refresh failed: {e}")
+
+        threading.Thread(target=run, name="search-refresh", daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _reader(self):
+        """This thread's read-only connection to the index."""
+        reader = getattr(self._readers, "db", None)
+        if reader is None:
+            reader = sqlite3.connect(f"file:{self.index_path}?mode=ro", uri=True)
+            self._readers.db = reader
+        return reader
+
+    def search(self, query, model=None, config=None, category=None, limit=SEARCH_LIMIT):
+        """Traces matching an FTS5 query, best match first.
+
+        Queries use FTS5 syntax (e.g. `deadlock`, `tools:rerun_fray`,
+        `"wait notify" AND patch:Reorder3Bad`); a query that is not valid
+        FTS5 syntax is searched as plain words.
+        """
+        sql = """SELECT t.path, t.model, t.config, t.category, t.instance_id, t.success,
+                        snippet(traces_fts, -1, '[', ']', '...', 12)
+                 FROM traces_fts JOIN traces t ON t.id = traces_fts.rowid
+                 WHERE traces_fts MATCH ?"""
+        params = []
+        if model:
+            # Accept the model id or its results directory name
+            sql += " AND t.model = ?"
+            params.append(model.replace("/", "_").replace(":", "_"))
+        if config:
+            sql += " AND t.config = ?"
+            params.append(config)
+        if category:
+            sql += " AND t.category = ?"
+            params.append(category)
+        sql += " ORDER BY bm25(traces_fts) LIMIT ?"
+        params.append(limit)
+        db = self._reader()
+        try:
+            rows = db.execute(sql, [query, *params]).fetchall()
+        except sqlite3.OperationalError:
+            quoted = " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+            rows = db.execute(sql, [quoted, *params]).fetchall()
+        return [
+            {
+                "path": path,
+                "model": model_dir,
+                "config": config_dir,
+                "category": category_name,
+                "instance_id": instance_id,
+                "success": None if success is None else bool(success),
+                "snippet": snippet,
+            }
+            for path, model_dir, config_dir, category_name, instance_id, success, snippet in rows
+        ]
+
+
+search_index = None
 
 
 class TraceServerHandler(http.server.SimpleHTTPRequestHandler):
@@ -58,6 +274,11 @@ class TraceServerHandler(http.server.SimpleHTTPRequestHandler):
             self.list_traces(model_filter, category_filter)
             return
 
+        # Full-text search over traces (?q=, optional ?model=, ?config=, ?category=, ?limit=)
+        if path == "/api/search":
+            self.search_traces(parse_qs(parsed_path.query))
+            return
+
         # Serve leaderboard data
         if path == "/leaderboard_data.json":
             self.serve_leaderboard_data()
@@ -350,6 +571,10 @@ class TraceServerHandler(http.server.SimpleHTTPRequestHandler):
                     rel_path = json_file.relative_to(RESULTS_DIR)
                     rel_path_str = str(rel_path)
 
+                    # Top-level files (e.g. durations.json) are bookkeeping, not traces
+                    if len(rel_path.parts) < 2:
+                        continue
+
                     # Apply model filter if provided (filter format: "model_id/config")
                     if model_filter and not rel_path_str.startswith(model_filter + '/'):
                         continue
@@ -381,6 +606,35 @@ class TraceServerHandler(http.server.SimpleHTTPRequestHandler):
         except Exception as e:
             self.send_error(500, f"Error listing traces: {str(e)}")
 
+    def search_traces(self, query):
+        """Search traces through the FTS index."""
+        try:
+            q = query.get('q', [''])[0].strip()
+            if not q:
+                self.send_error(400, "Missing search query ?q=")
+                return
+            start = time.perf_counter()
+            results = search_index.search(
+                q,
+                model=query.get('model', [None])[0],
+                config=query.get('config', [None])[0],
+                category=query.get('category', [None])[0],
+                limit=int(query.get('limit', [SEARCH_LIMIT])[0]),
+            )
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"[API] Search {q!r}: {len(results)} result(s) in {elapsed_ms:.1f} ms")
+
+            response = json.dumps({"query": q, "results": results, "elapsed_ms": elapsed_ms}, indent=2)
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Content-Length', len(response.encode('utf-8')))
+            self.end_headers()
+            self.wfile.write(response.encode('utf-8'))
+        except ValueError as e:
+            self.send_error(400, f"Invalid search: {str(e)}")
+        except Exception as e:
+            self.send_error(500, f"Error searching traces: {str(e)}")
+
     def serve_trace(self, trace_path):
         """Serve a specific trace JSON file."""
         try:
@@ -403,6 +657,12 @@ class TraceServerHandler(http.server.SimpleHTTPRequestHandler):
             with open(full_path, 'r', encoding='utf-8') as f:
                 content = f.read()
 
+            # Newer results stream their events to a separate JSONL file
+            trace = json.loads(content)
+            if "events" not in trace and trace.get("events_file"):
+                trace["events"] = read_events(full_path.parent / trace["events_file"])
+                content = json.dumps(trace)
+
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
             self.send_header('Content-Length', len(content.encode('utf-8')))
@@ -506,6 +766,12 @@ def main():
         print("Creating empty results directory...")
         RESULTS_DIR.mkdir(parents=True, exist_ok=True)
 
+    global search_index
+    search_index = TraceSearchIndex(RESULTS_DIR, SEARCH_INDEX_PATH)
+    print(f"Updating search index {SEARCH_INDEX_PATH}...")
+    search_index.refresh()
+    search_index.start()
+
     # Change to the script directory
     os.chdir(Path(__file__).parent)
 